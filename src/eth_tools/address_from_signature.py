@@ -1,33 +1,151 @@
 #!/usr/bin/env python
+import json
+import os
 import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import IO, Iterator
 
+from eth_keys.backends.base import BaseECCBackend
 from eth_keys.backends.native.ecdsa import ecdsa_raw_recover
-from eth_keys.datatypes import PublicKey
+from eth_keys.datatypes import PublicKey, Signature
+
+# Signatures recovered by a worker per submitted batch in batch mode
+RECOVER_BATCH_SIZE = 1024
 
 
 def print_usage():
     print("Usage:\n{} <Hash> <V> <R> <S>\n".format(sys.argv[0]))
+    print(
+        "{} --batch </path/to/signatures.csv|.jsonl|-> [--workers N]\n".format(
+            sys.argv[0]
+        )
+    )
     exit()
 
 
+def check_parse_hex(val: str) -> bytes:
+    if val.startswith("0x"):
+        val = val[2:]
+    if (len(val) % 2) != 0:
+        val = "0" + val
+    return bytes.fromhex(val)
+
+
+def check_parse_int(val: str | int) -> int:
+    if isinstance(val, int):
+        return val
+    if val.startswith("0x"):
+        return int(val, 16)
+    return int(val)
+
+
+@lru_cache(maxsize=None)
+def get_ecc_backend() -> BaseECCBackend:
+    try:
+        from eth_keys.backends.coincurve import CoinCurveECCBackend
+
+        return CoinCurveECCBackend()
+    except ImportError:
+        from eth_keys.backends.native import NativeECCBackend
+
+        return NativeECCBackend()
+
+
+def recover_batch(batch: list[tuple[str, str, str, str]]) -> list[str]:
+    backend = get_ecc_backend()
+    results = []
+    for h, v, r, s in batch:
+        try:
+            v_int = check_parse_int(v)
+            if v_int >= 27:
+                v_int -= 27
+            signature = Signature(vrs=(v_int, check_parse_int(r), check_parse_int(s)))
+            pk = backend.ecdsa_recover(check_parse_hex(h), signature)
+            results.append("0x" + pk.to_canonical_address().hex())
+        except Exception as ex:
+            results.append(f"error: {ex}")
+    return results
+
+
+def iter_signatures(f: IO[str]) -> Iterator[tuple[str, str, str, str]]:
+    # Each line is either a JSON object with hash/v/r/s keys or a CSV row
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            sig = json.loads(line)
+            yield (sig["hash"], sig["v"], sig["r"], sig["s"])
+            continue
+        row = [v.strip() for v in line.split(",")]
+        if row[0] == "hash":
+            continue
+        if len(row) != 4:
+            raise Exception("Invalid signature line: " + line)
+        yield (row[0], row[1], row[2], row[3])
+
+
+def iter_batches(
+    signatures: Iterator[tuple[str, str, str, str]]
+) -> Iterator[list[tuple[str, str, str, str]]]:
+    batch = []
+    for sig in signatures:
+        batch.append(sig)
+        if len(batch) == RECOVER_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def batch_main(args: list[str]) -> None:
+    workers = os.cpu_count() or 1
+    path = None
+    while args:
+        arg = args.pop(0)
+        if arg == "--workers" and args:
+            workers = int(args.pop(0))
+        elif path is None:
+            path = arg
+        else:
+            print_usage()
+    if path is None:
+        print_usage()
+        raise Exception("Missing path")
+
+    f = sys.stdin if path == "-" else open(path, "r")
+    try:
+        batches = iter_batches(iter_signatures(f))
+        if workers <= 1:
+            for batch in batches:
+                print("\n".join(recover_batch(batch)))
+            return
+        pending: deque[Future] = deque()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Batches are printed in submission order to keep the input order
+            for batch in batches:
+                pending.append(executor.submit(recover_batch, batch))
+                if len(pending) >= workers * 2:
+                    print("\n".join(pending.popleft().result()))
+            while pending:
+                print("\n".join(pending.popleft().result()))
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
 def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        batch_main(sys.argv[2:])
+        return
+
     if len(sys.argv) != 5:
         print_usage()
 
     (_, h, v, r, s) = sys.argv
 
-    def check_parse_hex(val: str) -> bytes:
-        if val.startswith("0x"):
-            val = val[2:]
-        if (len(val) % 2) != 0:
-            val = "0" + val
-        return bytes.fromhex(val)
-
-    def check_parse_int(val: str) -> int:
-        if val.startswith("0x"):
-            return int(val, 16)
-        return int(val)
-
     h = check_parse_hex(h)
     v = check_parse_int(v)
     if v >= 27:
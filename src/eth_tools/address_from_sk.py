@@ -1,16 +1,244 @@
 #!/usr/bin/env python
+import json
+import os
 import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import IO
 
 from eth_keys.backends.native.ecdsa import private_key_to_public_key
+from eth_keys.backends.native.jacobian import fast_multiply
+from eth_keys.constants import SECPK1_G, SECPK1_N, SECPK1_P
 from eth_keys.datatypes import PublicKey
 
+from eth_tools.keccak import keccak_many
+
+# Points advanced together in range mode, sharing one modular inversion
+RANGE_WINDOW_SIZE = 1024
+
+# Keys derived per worker task in range mode, a multiple of the window size
+RANGE_CHUNK_SIZE = 1 << 16
+
+RANGE_FORMATS = ("csv", "jsonl", "bin")
+
+Point = tuple[int, int]
+
 
 def print_usage():
-    print("Usage:\n{} <Secret key>".format(sys.argv[0]))
+    print("Usage:\n{} <Secret key>\n".format(sys.argv[0]))
+    print(
+        "{} --range <first secret key> <last secret key> [--checksum] "
+        "[--format {}] [--output <path>] [--workers N] [--verify]\n".format(
+            sys.argv[0], "|".join(RANGE_FORMATS)
+        )
+    )
     exit()
 
 
+def parse_sk(sk: str) -> int:
+    if sk.startswith("0x"):
+        return int(sk, 16)
+    return int(sk)
+
+
+def batch_add(points: list[Point], addend: Point) -> list[Point]:
+    """
+    Affine sums of every point in `points` with `addend`. The slope
+    denominators are inverted together with Montgomery's trick, so the batch
+    costs one modular inversion plus a few multiplications per point.
+    None of the sums may be the point at infinity.
+    """
+    p = SECPK1_P
+    x2, y2 = addend
+    numerators = []
+    denominators = []
+    for x1, y1 in points:
+        if x1 == x2:
+            if y1 != y2:
+                raise Exception("Sum is the point at infinity")
+            # Doubling: the slope is the tangent's
+            numerators.append(3 * x1 * x1 % p)
+            denominators.append(2 * y1 % p)
+        else:
+            numerators.append(y2 - y1)
+            denominators.append(x2 - x1)
+
+    # prefix[i] is the product of the first i denominators
+    prefix = [1]
+    acc = 1
+    for d in denominators:
+        acc = acc * d % p
+        prefix.append(acc)
+    inverse = pow(acc, -1, p)
+
+    sums: list[Point] = [(0, 0)] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        slope = numerators[i] * inverse * prefix[i] % p
+        inverse = inverse * denominators[i] % p
+        x1, y1 = points[i]
+        x3 = (slope * slope - x1 - x2) % p
+        sums[i] = (x3, (slope * (x1 - x3) - y1) % p)
+    return sums
+
+
+@lru_cache(maxsize=None)
+def get_generator_multiples(count: int) -> tuple[Point, ...]:
+    # [1G, 2G, ..., count*G], doubling the table size with each batch
+    multiples = [SECPK1_G]
+    while len(multiples) < count:
+        multiples += batch_add(multiples[: count - len(multiples)], multiples[-1])
+    return tuple(multiples)
+
+
+def derive_public_keys(first: int, count: int) -> list[Point]:
+    """
+    Public keys of the secret keys `first` to `first + count - 1`. Only
+    `first` is multiplied by G: the window of the next RANGE_WINDOW_SIZE keys
+    is built from a table of small multiples of G, and every following
+    window is the previous one plus RANGE_WINDOW_SIZE * G.
+    """
+    window_size = min(count, RANGE_WINDOW_SIZE)
+    multiples = get_generator_multiples(window_size)
+    start = fast_multiply(SECPK1_G, first)
+    window = [start] + batch_add(list(multiples[: window_size - 1]), start)
+    public_keys = list(window)
+    while len(public_keys) < count:
+        # The last window is cut short, keys past the range may not exist
+        window = batch_add(window[: count - len(public_keys)], multiples[-1])
+        public_keys += window
+    return public_keys
+
+
+def to_checksum_address(address: bytes, digest: bytes) -> str:
+    # EIP-55: hex letters are uppercased where the matching nibble of the
+    # keccak of the lowercase hex address is 8 or more
+    return "0x" + "".join(
+        c.upper() if d >= "8" else c for c, d in zip(address.hex(), digest.hex())
+    )
+
+
+def derive_address_chunk(
+    first: int, count: int, fmt: str, checksum: bool, verify: bool
+) -> bytes:
+    public_keys = derive_public_keys(first, count)
+    addresses = [
+        digest[12:]
+        for digest in keccak_many(
+            x.to_bytes(32, "big") + y.to_bytes(32, "big") for x, y in public_keys
+        )
+    ]
+    if verify:
+        verify_address_chunk(first, addresses)
+
+    if fmt == "bin":
+        # Fixed width records: secret key (32) + address (20)
+        return b"".join(
+            (first + i).to_bytes(32, "big") + address
+            for i, address in enumerate(addresses)
+        )
+    if checksum:
+        digests = keccak_many(address.hex().encode() for address in addresses)
+        formatted = [
+            to_checksum_address(address, digest)
+            for address, digest in zip(addresses, digests)
+        ]
+        if verify:
+            from eth_utils import to_checksum_address as reference_checksum
+
+            for address, text in zip(addresses, formatted):
+                if reference_checksum(address) != text:
+                    raise Exception("Checksum mismatch for 0x" + address.hex())
+    else:
+        formatted = ["0x" + address.hex() for address in addresses]
+    if fmt == "csv":
+        lines = (
+            f"0x{first + i:064x},{address}\n" for i, address in enumerate(formatted)
+        )
+    else:
+        lines = (
+            json.dumps({"sk": f"0x{first + i:064x}", "address": address}) + "\n"
+            for i, address in enumerate(formatted)
+        )
+    return "".join(lines).encode()
+
+
+def verify_address_chunk(first: int, addresses: list[bytes]) -> None:
+    # Differential check against the per key scalar multiplication path
+    for i, address in enumerate(addresses):
+        sk = (first + i).to_bytes(32, "big")
+        expected = PublicKey(private_key_to_public_key(sk)).to_canonical_address()
+        if expected != address:
+            raise Exception(
+                f"Address mismatch for secret key 0x{first + i:064x}: "
+                f"0x{address.hex()} != 0x{expected.hex()}"
+            )
+
+
+def range_main(args: list[str]) -> None:
+    fmt = "csv"
+    output_path = None
+    checksum = False
+    verify = False
+    workers = os.cpu_count() or 1
+    positional = []
+    while args:
+        arg = args.pop(0)
+        if arg == "--format" and args:
+            fmt = args.pop(0)
+        elif arg == "--output" and args:
+            output_path = args.pop(0)
+        elif arg == "--workers" and args:
+            workers = int(args.pop(0))
+        elif arg == "--checksum":
+            checksum = True
+        elif arg == "--verify":
+            verify = True
+        else:
+            positional.append(arg)
+    if len(positional) != 2 or fmt not in RANGE_FORMATS:
+        print_usage()
+
+    first, last = (parse_sk(sk) for sk in positional)
+    if first < 1 or last >= SECPK1_N or first > last:
+        raise Exception("Secret key out of range")
+
+    chunks = [
+        (start, min(RANGE_CHUNK_SIZE, last + 1 - start), fmt, checksum, verify)
+        for start in range(first, last + 1, RANGE_CHUNK_SIZE)
+    ]
+    out: IO[bytes] = open(output_path, "wb") if output_path else sys.stdout.buffer
+    try:
+        if fmt == "csv":
+            out.write(b"sk,address\n")
+        if workers <= 1 or len(chunks) == 1:
+            for chunk in chunks:
+                out.write(derive_address_chunk(*chunk))
+        else:
+            pending: deque[Future] = deque()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Chunks are written in submission order to keep the key order
+                for chunk in chunks:
+                    pending.append(executor.submit(derive_address_chunk, *chunk))
+                    if len(pending) >= workers * 2:
+                        out.write(pending.popleft().result())
+                while pending:
+                    out.write(pending.popleft().result())
+    finally:
+        if output_path:
+            out.close()
+    if verify:
+        print(
+            f"Verified {last - first + 1} address(es) against the per key path",
+            file=sys.stderr,
+        )
+
+
 def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "--range":
+        range_main(sys.argv[2:])
+        return
+
     if len(sys.argv) != 2:
         print_usage()
 
@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+import json
+import platform
+import random
+import sys
+import time
+from typing import Callable
+
+# Format of the JSON results written by `--output`
+RESULTS_VERSION = 1
+
+# Each benchmark is timed this many times and the fastest run is kept
+DEFAULT_REPEAT = 5
+
+# Percentage drop in ops/s reported as a regression by `--compare`
+DEFAULT_THRESHOLD = 10.0
+
+# A benchmark setup takes a seeded RNG and returns (items, function), where
+# `function` processes `items` items per call
+BenchmarkSetup = Callable[[random.Random], tuple[int, Callable[[], object]]]
+
+
+def print_usage():
+    print(
+        "Usage:\n{} [--only name,...] [--repeat N] [--output results.json]\n".format(
+            sys.argv[0]
+        )
+    )
+    print(
+        "{} --compare <baseline.json> <results.json> [--threshold percent]\n".format(
+            sys.argv[0]
+        )
+    )
+    print("{} --list\n".format(sys.argv[0]))
+    exit()
+
+
+def generate_legacy_txs(rng: random.Random, count: int) -> list[bytes]:
+    from eth_tools.get_tx_info import sign_generated_tx
+
+    sk = rng.randbytes(32)
+    fields = [
+        0,
+        10**9,
+        21000,
+        rng.randbytes(20),
+        1,
+        rng.randbytes(rng.randint(0, 64)),
+    ]
+    return [sign_generated_tx(0, fields, 1, sk, ("nonce",), i)[1] for i in range(count)]
+
+
+def generate_withdrawals(rng: random.Random, count: int) -> list[dict]:
+    return [
+        {
+            "index": hex(i),
+            "validatorIndex": hex(rng.getrandbits(20)),
+            "address": "0x" + rng.randbytes(20).hex(),
+            "amount": hex(rng.getrandbits(36)),
+        }
+        for i in range(count)
+    ]
+
+
+def generate_block(rng: random.Random, tx_count: int, withdrawal_count: int) -> dict:
+    from eth_tools.get_block_info import EMPTY_OMMERS_HASH, to_hex
+
+    def h(size: int = 32) -> str:
+        return "0x" + rng.randbytes(size).hex()
+
+    return {
+        "parentHash": h(),
+        "sha3Uncles": to_hex(EMPTY_OMMERS_HASH),
+        "miner": h(20),
+        "stateRoot": h(),
+        "transactions": ["0x" + tx.hex() for tx in generate_legacy_txs(rng, tx_count)],
+        "receiptsRoot": h(),
+        "logsBloom": h(256),
+        "difficulty": "0x0",
+        "number": hex(rng.getrandbits(24)),
+        "gasLimit": "0x1c9c380",
+        "gasUsed": hex(tx_count * 21000),
+        "timestamp": hex(rng.getrandbits(32)),
+        "extraData": h(rng.randint(0, 32)),
+        "mixHash": h(),
+        "nonce": "0x0000000000000000",
+        "baseFeePerGas": "0x7",
+        "withdrawals": generate_withdrawals(rng, withdrawal_count),
+        "blobGasUsed": "0x0",
+        "excessBlobGas": "0x0",
+        "parentBeaconBlockRoot": h(),
+    }
+
+
+def bench_get_block_hash(rng: random.Random):
+    from eth_tools.get_block_info import get_block_hash
+
+    blocks = [generate_block(rng, 0, 0) for _ in range(200)]
+    for block in blocks:
+        # Header only: the transactions root is given instead of computed
+        del block["transactions"], block["withdrawals"]
+        block["transactionsRoot"] = "0x" + rng.randbytes(32).hex()
+        block["withdrawalsRoot"] = "0x" + rng.randbytes(32).hex()
+
+    def run():
+        for block in blocks:
+            get_block_hash(block)
+
+    return len(blocks), run
+
+
+def bench_get_block_rlp(rng: random.Random):
+    from eth_tools.get_block_info import get_block_rlp
+
+    blocks = [generate_block(rng, 50, 16) for _ in range(10)]
+
+    def run():
+        for block in blocks:
+            get_block_rlp(block)
+
+    return len(blocks), run
+
+
+def bench_transactions_root(rng: random.Random):
+    from eth_tools.get_block_info import format_value_for_rlp
+
+    txs = ["0x" + tx.hex() for tx in generate_legacy_txs(rng, 500)]
+    return len(txs), lambda: format_value_for_rlp("transactions", txs)
+
+
+def bench_withdrawals_root(rng: random.Random):
+    from eth_tools.get_block_info import format_value_for_rlp
+
+    withdrawals = generate_withdrawals(rng, 512)
+    return len(withdrawals), lambda: format_value_for_rlp("withdrawals", withdrawals)
+
+
+def bench_legacy_tx_sign(rng: random.Random):
+    from eth_tools.get_tx_info import sign_generated_tx
+
+    sk = rng.randbytes(32)
+    fields = [0, 10**9, 21000, rng.randbytes(20), 1, b""]
+    indexes = range(50)
+    return len(indexes), lambda: [
+        sign_generated_tx(0, fields, 1, sk, ("nonce",), i) for i in indexes
+    ]
+
+
+def bench_legacy_tx_recover(rng: random.Random):
+    from eth_tools.get_tx_info import decode_raw_tx
+
+    txs = generate_legacy_txs(rng, 50)
+
+    def run():
+        for raw in txs:
+            decode_raw_tx(raw)
+
+    return len(txs), run
+
+
+def bench_ssz_decode(rng: random.Random):
+    from eth_tools.parse_ssz_tx import decode_signed_type3_tx, generate_ssz_txs
+
+    txs = generate_ssz_txs(200, rng.randint(100, 1000))
+
+    def run():
+        for ssz_bytes in txs:
+            decode_signed_type3_tx(ssz_bytes).signing_hash()
+
+    return len(txs), run
+
+
+def bench_create_address(rng: random.Random):
+    from eth_tools.create import get_create_address
+
+    addr = rng.randbytes(20)
+    nonces = [rng.getrandbits(rng.randint(0, 64)) for _ in range(10_000)]
+
+    def run():
+        for nonce in nonces:
+            get_create_address(addr, nonce)
+
+    return len(nonces), run
+
+
+def bench_create2_address(rng: random.Random):
+    from eth_tools.create2 import get_create2_preimage, search_salt_range
+
+    preimage = get_create2_preimage(rng.randbytes(20), 0, rng.randbytes(32))
+    start = rng.getrandbits(64)
+    count = 50_000
+    # An impossible prefix, so every salt is hashed and none is reported
+    pattern = bytes(20)
+    return count, lambda: search_salt_range(
+        preimage, start, start + count, pattern, None, b"", None
+    )
+
+
+def bench_sk_address_range(rng: random.Random):
+    from eth_tools.address_from_sk import derive_address_chunk
+
+    first = rng.getrandbits(64)
+    count = 1 << 14
+    return count, lambda: derive_address_chunk(first, count, "bin", False, False)
+
+
+def bench_calldata_cost(rng: random.Random):
+    from eth_tools.calc_tx_data_cost import CHUNK_SIZE, count_bytes
+
+    # Mostly zero calldata, as in typical contract calls
+    data = bytes(b if b < 64 else 0 for b in rng.randbytes(1 << 16)) * 64
+    chunks = [data[i : i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+    return len(data), lambda: count_bytes(chunks)
+
+
+def bench_intrinsic_gas(rng: random.Random):
+    from eth_tools.calc_tx_data_cost import measure_block
+
+    blocks = [generate_block(rng, 50, 0) for _ in range(10)]
+
+    def run():
+        for block in blocks:
+            measure_block(block)
+
+    return sum(len(block["transactions"]) for block in blocks), run
+
+
+BENCHMARKS: dict[str, BenchmarkSetup] = {
+    "get_block_hash": bench_get_block_hash,
+    "get_block_rlp": bench_get_block_rlp,
+    "transactions_root": bench_transactions_root,
+    "withdrawals_root": bench_withdrawals_root,
+    "legacy_tx_sign": bench_legacy_tx_sign,
+    "legacy_tx_recover": bench_legacy_tx_recover,
+    "ssz_decode": bench_ssz_decode,
+    "create_address": bench_create_address,
+    "create2_address": bench_create2_address,
+    "sk_address_range": bench_sk_address_range,
+    "calldata_cost": bench_calldata_cost,
+    "intrinsic_gas": bench_intrinsic_gas,
+}
+
+
+def run_benchmark(name: str, repeat: int) -> dict:
+    # Fixtures are seeded by benchmark name so every run times the same input
+    items, run = BENCHMARKS[name](random.Random(name))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        "items": items,
+        "seconds": best,
+        "ops_per_second": items / best,
+    }
+
+
+def run_benchmarks(names: list[str], repeat: int) -> dict:
+    results = {}
+    print(f"{'benchmark':<20} {'items':>8} {'best (s)':>10} {'ops/s':>14}")
+    for name in names:
+        result = run_benchmark(name, repeat)
+        print(
+            f"{name:<20} {result['items']:>8} {result['seconds']:>10.4f} "
+            f"{result['ops_per_second']:>14.1f}"
+        )
+        results[name] = result
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """
+    Prints the ops/s change of every benchmark present in both result sets
+    and returns the names of those that slowed down by more than `threshold`
+    percent.
+    """
+    regressions = []
+    print(f"{'benchmark':<20} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            print(f"{name:<20} {'-':>14} {result['ops_per_second']:>14.1f}")
+            continue
+        base_ops = baseline["results"][name]["ops_per_second"]
+        ops = result["ops_per_second"]
+        change = (ops / base_ops - 1) * 100
+        flag = ""
+        if change < -threshold:
+            flag = " REGRESSION"
+            regressions.append(name)
+        print(f"{name:<20} {base_ops:>14.1f} {ops:>14.1f} {change:>+7.1f}%{flag}")
+    return regressions
+
+
+def load_results(path: str) -> dict:
+    with open(path, "r") as f:
+        results = json.load(f)
+    if results.get("version") != RESULTS_VERSION:
+        raise Exception("Unsupported results version in " + path)
+    return results
+
+
+def compare_main(args: list[str]) -> None:
+    threshold = DEFAULT_THRESHOLD
+    paths = []
+    while args:
+        arg = args.pop(0)
+        if arg == "--threshold" and args:
+            threshold = float(args.pop(0))
+        else:
+            paths.append(arg)
+    if len(paths) != 2:
+        print_usage()
+
+    regressions = compare_results(
+        load_results(paths[0]), load_results(paths[1]), threshold
+    )
+    if regressions:
+        print(
+            "{} regression(s) beyond {}%: {}".format(
+                len(regressions), threshold, ", ".join(regressions)
+            )
+        )
+        sys.exit(1)
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "--compare":
+        compare_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--list":
+        print("\n".join(BENCHMARKS))
+        return
+
+    names = list(BENCHMARKS)
+    repeat = DEFAULT_REPEAT
+    output = None
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--only" and args:
+            names = args.pop(0).split(",")
+            for name in names:
+                if name not in BENCHMARKS:
+                    raise Exception("Unknown benchmark: " + name)
+        elif arg == "--repeat" and args:
+            repeat = int(args.pop(0))
+        elif arg == "--output" and args:
+            output = args.pop(0)
+        else:
+            print_usage()
+
+    results = run_benchmarks(names, repeat)
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
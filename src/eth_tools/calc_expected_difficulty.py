@@ -1,7 +1,63 @@
 #!/usr/bin/env python
 import json
 import os
+import subprocess
 import sys
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice, repeat
+from typing import IO, Iterable, Iterator
+
+DIFF_FORKS = [
+    "Byzantium",
+    "Constantinople",
+    "MuirGlacier",
+    "London",
+    "ArrowGlacier",
+]
+
+FORK_ACTIVATION_BLOCKS = {
+    "Byzantium": 4370000,
+    "Constantinople": 7280000,
+    "MuirGlacier": 9200000,
+    "London": 12965000,
+    "ArrowGlacier": 13773000,
+}
+
+FORK_PUSHBACK_BLOCK_COUNT = {
+    "Byzantium": 3000000,
+    "Constantinople": 5000000,
+    "MuirGlacier": 9000000,
+    "London": 9700000,
+    "ArrowGlacier": 10700000,
+}
+
+BLOCK_DIFF_FACTOR = 2048
+
+MINIMUM_DIFFICULTY = 131072
+
+EMPTY_OMMERS_HASH = "0x1dcc4de8dec75d7aab85b567b6ccd41ad312451b948a7413f0a142fd40d49347"
+NON_EMPTY_OMMERS_HASH = (
+    "0x1dcc4de8dec75d7aab85b567b6ccd41ad312451b948a7413f0a142fd40d49348"
+)
+
+ALLOC = {
+    "a94f5374fce5edbc8e2a8697c15331677e6ebf0b": {
+        "balance": "0x5ffd4878be161d74",
+        "code": "0x",
+        "nonce": "0xac",
+        "storage": {},
+    },
+    "0x8a8eafb1cf62bfbeb1741769dae1a9dd47996192": {
+        "balance": "0xfeedbead",
+        "nonce": "0x00",
+    },
+}
+
+# Blocks computed per batch in sweep mode
+SWEEP_BATCH_SIZE = 1 << 16
+
+CheckArgs = tuple[int, int, int, int, int, str]
 
 
 def print_usage():
@@ -10,126 +66,87 @@ def print_usage():
             sys.argv[0]
         )
     )
+    print(
+        "{} --batch </path/to/checks.txt|-> [--jobs N] [--evm /path/to/evm]".format(
+            sys.argv[0]
+        )
+    )
+    print(
+        "{} --sweep <First block> <Last block> <Output dir> [--forks A,B] "
+        "[--parent-difficulty D] [--parent-timestamp T] [--block-time S] "
+        "[--timestamps /path/to/timestamps.txt] [--uncles /path/to/uncles.txt]".format(
+            sys.argv[0]
+        )
+    )
 
 
-def main() -> None:
-    if len(sys.argv) == 2 and sys.argv[1] == "-h":
-        print_usage()
-        sys.exit()
-    elif len(sys.argv) != 7:
-        print_usage()
-        raise Exception("Incorrect number of arguments")
+def parse_int(val: str | int) -> int:
+    if isinstance(val, int):
+        return val
+    if val.startswith("0x"):
+        return int(val, 16)
+    return int(val)
 
+
+def parse_check_args(args: list) -> CheckArgs:
+    if len(args) != 6:
+        raise Exception("Incorrect number of arguments")
     (
-        _,
         parent_diff,
         parent_uncle_count,
         parent_timestamp,
         timestamp,
         block,
         fork,
-    ) = sys.argv
-
-    diff_forks = [
-        "Byzantium",
-        "Constantinople",
-        "MuirGlacier",
-        "London",
-        "ArrowGlacier",
-    ]
-
-    if fork not in diff_forks:
+    ) = args
+    if fork not in DIFF_FORKS:
         raise Exception("Incorrect fork")
+    return (
+        parse_int(parent_diff),
+        parse_int(parent_uncle_count),
+        parse_int(parent_timestamp),
+        parse_int(timestamp),
+        parse_int(block),
+        fork,
+    )
 
-    if parent_diff.startswith("0x"):
-        parent_diff = int(parent_diff, 16)
-    else:
-        parent_diff = int(parent_diff)
-
-    if parent_uncle_count.startswith("0x"):
-        parent_uncle_count = int(parent_uncle_count, 16)
-    else:
-        parent_uncle_count = int(parent_uncle_count)
-
-    if parent_timestamp.startswith("0x"):
-        parent_timestamp = int(parent_timestamp, 16)
-    else:
-        parent_timestamp = int(parent_timestamp)
-
-    if timestamp.startswith("0x"):
-        timestamp = int(timestamp, 16)
-    else:
-        timestamp = int(timestamp)
-
-    if block.startswith("0x"):
-        block = int(block, 16)
-    else:
-        block = int(block)
-
-    print(parent_diff, parent_uncle_count, parent_timestamp, timestamp, block, fork)
-
-    fork_activation_blocks = {
-        "Byzantium": 4370000,
-        "Constantinople": 7280000,
-        "MuirGlacier": 9200000,
-        "London": 12965000,
-        "ArrowGlacier": 13773000,
-    }
-
-    fork_pushback_block_count = {
-        "Byzantium": 3000000,
-        "Constantinople": 5000000,
-        "MuirGlacier": 9000000,
-        "London": 9700000,
-        "ArrowGlacier": 10700000,
-    }
-
-    BLOCK_DIFF_FACTOR = 2048
 
+def get_expected_difficulty(
+    parent_diff: int,
+    parent_uncle_count: int,
+    parent_timestamp: int,
+    timestamp: int,
+    block: int,
+    fork: str,
+) -> int:
     adj_factor = max(
         (2 if parent_uncle_count else 1) - ((timestamp - parent_timestamp) // 9), -99
     )
 
     diff_minus_bomb = parent_diff + (parent_diff // BLOCK_DIFF_FACTOR) * adj_factor
 
-    minimum_difficulty = 131072
-
     diff_minus_bomb = (
-        minimum_difficulty if diff_minus_bomb < minimum_difficulty else diff_minus_bomb
+        MINIMUM_DIFFICULTY if diff_minus_bomb < MINIMUM_DIFFICULTY else diff_minus_bomb
     )
 
-    periodCount = (block - fork_pushback_block_count[fork]) // 100000
+    periodCount = (block - FORK_PUSHBACK_BLOCK_COUNT[fork]) // 100000
 
     if periodCount > 0:
         bomb = int(2 ** (periodCount - 2))
     else:
         bomb = 0
 
-    expected_diff = diff_minus_bomb + bomb
-
-    alloc = {
-        "a94f5374fce5edbc8e2a8697c15331677e6ebf0b": {
-            "balance": "0x5ffd4878be161d74",
-            "code": "0x",
-            "nonce": "0xac",
-            "storage": {},
-        },
-        "0x8a8eafb1cf62bfbeb1741769dae1a9dd47996192": {
-            "balance": "0xfeedbead",
-            "nonce": "0x00",
-        },
-    }
+    return diff_minus_bomb + bomb
 
-    txs = []
 
-    emptyOmmersHash = (
-        "0x1dcc4de8dec75d7aab85b567b6ccd41ad312451b948a7413f0a142fd40d49347"
-    )
-    nonEmptyOmmersHash = (
-        "0x1dcc4de8dec75d7aab85b567b6ccd41ad312451b948a7413f0a142fd40d49348"
-    )
-
-    env = {
+def get_t8n_env(
+    parent_diff: int,
+    parent_uncle_count: int,
+    parent_timestamp: int,
+    timestamp: int,
+    block: int,
+) -> dict:
+    return {
         "currentCoinbase": "0xc94f5374fce5edbc8e2a8697c15331677e6ebf0b",
         "currentGasLimit": "0x750a163df65e8a",
         "currentBaseFee": "0x500",
@@ -137,44 +154,290 @@ def main() -> None:
         "currentTimestamp": str(timestamp),
         "parentTimestamp": str(parent_timestamp),
         "parentDifficulty": hex(parent_diff),
-        "parentUncleHash": nonEmptyOmmersHash
+        "parentUncleHash": NON_EMPTY_OMMERS_HASH
         if parent_uncle_count
-        else emptyOmmersHash,
+        else EMPTY_OMMERS_HASH,
     }
 
-    env_out_path = "/dev/shm/env.json"
-    alloc_out_path = "/dev/shm/alloc.json"
-    txs_out_path = "/dev/shm/txs.json"
-    output_path = "/dev/shm/out.json"
-
-    with open(env_out_path, "w") as f:
-        json.dump(env, f)
-    with open(alloc_out_path, "w") as f:
-        json.dump(alloc, f)
-    with open(txs_out_path, "w") as f:
-        json.dump(txs, f)
-
-    if os.path.exists(output_path):
-        os.remove(output_path)
-
-    # Run EVM
-    stream = os.popen(
-        "evm t8n --input.alloc={} --input.txs={} --input.env={} --output.result={} --state.fork={}".format(
-            alloc_out_path, txs_out_path, env_out_path, output_path, fork
-        )
+
+def run_t8n(env: dict, alloc: dict, txs: list, fork: str, evm: str = "evm") -> dict:
+    # All inputs are passed on stdin and all outputs read from stdout, so no
+    # files are shared between concurrent invocations
+    proc = subprocess.run(
+        [
+            evm,
+            "t8n",
+            "--input.alloc=stdin",
+            "--input.txs=stdin",
+            "--input.env=stdin",
+            "--output.result=stdout",
+            "--output.alloc=stdout",
+            "--state.fork={}".format(fork),
+        ],
+        input=json.dumps({"alloc": alloc, "txs": txs, "env": env}),
+        capture_output=True,
+        text=True,
     )
-    output = stream.read()
+    if proc.returncode != 0:
+        raise Exception("evm t8n failed: {}".format(proc.stderr.strip()))
+    return json.loads(proc.stdout).get("result", {})
 
-    data = {}
-    if os.path.exists(output_path):
-        with open(output_path, "r") as f:
-            data = json.load(f)
-    print(data)
 
+def check_difficulty(args: CheckArgs, evm: str = "evm") -> tuple[bool, int, dict]:
+    (parent_diff, parent_uncle_count, parent_timestamp, timestamp, block, fork) = args
+    expected_diff = get_expected_difficulty(*args)
+    env = get_t8n_env(
+        parent_diff, parent_uncle_count, parent_timestamp, timestamp, block
+    )
+    data = run_t8n(env, ALLOC, [], fork, evm)
     if "currentDifficulty" not in data:
         raise Exception("Difficulty not returned")
+    return int(data["currentDifficulty"], 16) == expected_diff, expected_diff, data
+
+
+def iter_checks(f: IO[str]) -> Iterator[CheckArgs]:
+    # One check per line, either a JSON array or whitespace/comma separated values
+    for line in f:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("["):
+            yield parse_check_args(json.loads(line))
+        else:
+            yield parse_check_args(line.replace(",", " ").split())
+
+
+def batch_main(args: list[str]) -> None:
+    jobs = os.cpu_count() or 1
+    evm = os.environ.get("EVM_BIN", "evm")
+    path = None
+    while args:
+        arg = args.pop(0)
+        if arg == "--jobs" and args:
+            jobs = int(args.pop(0))
+        elif arg == "--evm" and args:
+            evm = args.pop(0)
+        elif path is None:
+            path = arg
+        else:
+            print_usage()
+            raise Exception("Incorrect arguments")
+    if path is None:
+        print_usage()
+        raise Exception("Incorrect number of arguments")
+
+    if path == "-":
+        checks = list(iter_checks(sys.stdin))
+    else:
+        with open(path, "r") as f:
+            checks = list(iter_checks(f))
+
+    def run_check(check: CheckArgs) -> str:
+        try:
+            ok, expected_diff, _ = check_difficulty(check, evm)
+        except Exception as ex:
+            return "ERROR: {}".format(ex)
+        if ok:
+            return "OK"
+        return "FAIL: Expected {}".format(hex(expected_diff))
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for check, result in zip(checks, executor.map(run_check, checks)):
+            if result != "OK":
+                failed += 1
+            print(" ".join(str(v) for v in check), result)
+
+    print(f"Checked {len(checks)}: {len(checks) - failed} ok, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+def get_bomb(period_count: int) -> int:
+    # Same as int(2 ** (periodCount - 2)), without going through floats
+    return 1 << (period_count - 2) if period_count >= 2 else 0
+
+
+def sweep_difficulty(
+    first_block: int,
+    last_block: int,
+    fork: str,
+    parent_diff: int,
+    parent_timestamp: int,
+    timestamps: Iterable[int],
+    parent_uncles: Iterable[int],
+) -> Iterator[tuple[range, array, array, list[int], list[int]]]:
+    # Simulates the chain from `first_block`, each block's expected difficulty
+    # being the parent difficulty of the next one. Yields column batches of
+    # (block, timestamp, period count, bomb, difficulty).
+    pushback = FORK_PUSHBACK_BLOCK_COUNT[fork]
+    timestamps_it = iter(timestamps)
+    uncles_it = iter(parent_uncles)
+    for batch_start in range(first_block, last_block + 1, SWEEP_BATCH_SIZE):
+        blocks = range(batch_start, min(batch_start + SWEEP_BATCH_SIZE, last_block + 1))
+        ts = array("Q", islice(timestamps_it, len(blocks)))
+        uncles = list(islice(uncles_it, len(blocks)))
+        if len(ts) != len(blocks) or len(uncles) != len(blocks):
+            raise Exception("Not enough timestamps or uncle flags for the range")
+
+        # Everything but the difficulty itself is independent of the parent
+        # block, so it is computed for the whole batch at once
+        parent_ts = array("Q", [parent_timestamp]) + ts[:-1]
+        adj_factors = [
+            max((2 if u else 1) - ((t - pt) // 9), -99)
+            for t, pt, u in zip(ts, parent_ts, uncles)
+        ]
+        periods = array("q", ((b - pushback) // 100000 for b in blocks))
+        # The bomb only changes every 100000 blocks
+        bomb_by_period = {p: get_bomb(p) for p in set(periods)}
+        bombs = [bomb_by_period[p] for p in periods]
+
+        diffs = []
+        for adj_factor, bomb in zip(adj_factors, bombs):
+            diff_minus_bomb = (
+                parent_diff + (parent_diff // BLOCK_DIFF_FACTOR) * adj_factor
+            )
+            if diff_minus_bomb < MINIMUM_DIFFICULTY:
+                diff_minus_bomb = MINIMUM_DIFFICULTY
+            parent_diff = diff_minus_bomb + bomb
+            diffs.append(parent_diff)
+
+        parent_timestamp = ts[-1]
+        yield blocks, ts, periods, bombs, diffs
+
+
+def iter_file_ints(path: str) -> Iterator[int]:
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield parse_int(line)
+
+
+def to_le_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def to_uint256_column(values: list[int]) -> bytes:
+    # Difficulty and bomb overflow 64 bits once enough periods have passed, so
+    # they are stored as 32 byte words. Batches that fit in 64 bits are packed
+    # in bulk and spread into the low bytes of each word.
+    if max(values) < 1 << 64:
+        packed = to_le_bytes(array("Q", values))
+        column = bytearray(32 * len(values))
+        for i in range(8):
+            column[i::32] = packed[i::8]
+        return bytes(column)
+    return b"".join(v.to_bytes(32, "little") for v in values)
+
+
+def sweep_main(args: list[str]) -> None:
+    forks = DIFF_FORKS
+    parent_diff = MINIMUM_DIFFICULTY
+    parent_timestamp = 0
+    block_time = 13
+    timestamps_path = None
+    uncles_path = None
+    positional = []
+    while args:
+        arg = args.pop(0)
+        if arg.startswith("--") and not args:
+            print_usage()
+            raise Exception("Incorrect arguments")
+        if arg == "--forks":
+            forks = args.pop(0).split(",")
+        elif arg == "--parent-difficulty":
+            parent_diff = parse_int(args.pop(0))
+        elif arg == "--parent-timestamp":
+            parent_timestamp = parse_int(args.pop(0))
+        elif arg == "--block-time":
+            block_time = parse_int(args.pop(0))
+        elif arg == "--timestamps":
+            timestamps_path = args.pop(0)
+        elif arg == "--uncles":
+            uncles_path = args.pop(0)
+        else:
+            positional.append(arg)
+    if len(positional) != 3:
+        print_usage()
+        raise Exception("Incorrect number of arguments")
+    first_block, last_block = parse_int(positional[0]), parse_int(positional[1])
+    output_dir = positional[2]
+    for fork in forks:
+        if fork not in DIFF_FORKS:
+            raise Exception("Incorrect fork")
+
+    columns = {
+        "block": "<u8",
+        "timestamp": "<u8",
+        "period_count": "<i8",
+        "bomb": "<u256",
+        "difficulty": "<u256",
+    }
+    for fork in forks:
+        if timestamps_path:
+            timestamps: Iterable[int] = iter_file_ints(timestamps_path)
+        else:
+            timestamps = (
+                parent_timestamp + block_time * (i + 1)
+                for i in range(last_block - first_block + 1)
+            )
+        uncles: Iterable[int] = (
+            iter_file_ints(uncles_path) if uncles_path else repeat(0)
+        )
+
+        fork_dir = os.path.join(output_dir, fork)
+        os.makedirs(fork_dir, exist_ok=True)
+        files = {c: open(os.path.join(fork_dir, c + ".bin"), "wb") for c in columns}
+        rows = 0
+        try:
+            for blocks, ts, periods, bombs, diffs in sweep_difficulty(
+                first_block,
+                last_block,
+                fork,
+                parent_diff,
+                parent_timestamp,
+                timestamps,
+                uncles,
+            ):
+                files["block"].write(to_le_bytes(array("Q", blocks)))
+                files["timestamp"].write(to_le_bytes(ts))
+                files["period_count"].write(to_le_bytes(periods))
+                files["bomb"].write(to_uint256_column(bombs))
+                files["difficulty"].write(to_uint256_column(diffs))
+                rows += len(blocks)
+        finally:
+            for f in files.values():
+                f.close()
+        with open(os.path.join(fork_dir, "columns.json"), "w") as columns_file:
+            json.dump({"rows": rows, "columns": columns}, columns_file, indent=2)
+        print(f"{fork}: {rows} blocks written to {fork_dir}")
+
+
+def main() -> None:
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print_usage()
+        sys.exit()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        batch_main(sys.argv[2:])
+        return
+    elif len(sys.argv) > 1 and sys.argv[1] == "--sweep":
+        sweep_main(sys.argv[2:])
+        return
+    elif len(sys.argv) != 7:
+        print_usage()
+        raise Exception("Incorrect number of arguments")
+
+    check = parse_check_args(sys.argv[1:])
+    print(*check)
+
+    ok, expected_diff, data = check_difficulty(check, os.environ.get("EVM_BIN", "evm"))
+    print(data)
 
-    if int(data["currentDifficulty"], 16) == expected_diff:
+    if ok:
         print("Verification OK")
     else:
         print("Verification FAIL: Expected {}".format(hex(expected_diff)))
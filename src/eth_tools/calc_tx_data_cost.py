@@ -1,35 +1,561 @@
 #!/usr/bin/env python
+import json
+import os
 import sys
+from typing import IO, TYPE_CHECKING, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from eth_tools.parse_ssz_tx import SignedType3TxView
+
+# Hex characters read per chunk when streaming calldata from a file
+CHUNK_SIZE = 1 << 20
+
+# Blocks measured per worker task by `--blocks`
+BLOCKS_CHUNK_SIZE = 64
+
+# Charged for every tx
+Gtx = 21000
+Gtxdatazero = 4
+Gtxcreate = 32000
+# EIP-2028, 68 before Istanbul
+Gtxdatanonzero = 16
+Gtxdatanonzero_frontier = 68
+# EIP-7623
+TOTAL_COST_FLOOR_PER_TOKEN = 10
+TOKENS_PER_NONZERO_BYTE = 4
+# EIP-3860
+INITCODE_WORD_COST = 2
+# EIP-2930
+ACCESS_LIST_ADDRESS_COST = 2400
+ACCESS_LIST_STORAGE_KEY_COST = 1900
+# EIP-4844
+GAS_PER_BLOB = 1 << 17
+# EIP-7702, charged per authorization
+PER_EMPTY_ACCOUNT_COST = 25000
+
+# Mainnet Istanbul block, for `--blocks --mainnet` headers older than London
+MAINNET_ISTANBUL_BLOCK = 9069000
+
+# Header fields from London on, whose presence means Istanbul is active
+POST_LONDON_HEADER_FIELDS = (
+    "baseFeePerGas",
+    "withdrawalsRoot",
+    "withdrawals",
+    "blobGasUsed",
+    "excessBlobGas",
+    "requestsHash",
+)
+
+# Fixture networks charging Gtxdatanonzero_frontier
+PRE_ISTANBUL_FORKS = (
+    "Frontier",
+    "Homestead",
+    "Dao",
+    "EIP150",
+    "EIP158",
+    "Byzantium",
+    "Constantinople",
+    "ConstantinopleFix",
+    "Petersburg",
+)
+
+# RLP positions of the fields intrinsic gas depends on, per tx type:
+# gas limit, to, data, access list, blob versioned hashes, authorizations
+TX_GAS_FIELD_POSITIONS = {
+    0: (2, 3, 5, None, None, None),
+    1: (3, 4, 6, 7, None, None),
+    2: (4, 5, 7, 8, None, None),
+    3: (4, 5, 7, 8, 10, None),
+    4: (4, 5, 7, 8, None, 9),
+}
+
+# Intrinsic gas components, in the order `get_gas_batch` returns them
+GAS_COMPONENTS = ("base", "create", "initcode", "data", "accessList", "authorizations")
+
+# Percentiles of the gas per tx printed in the summary
+SUMMARY_PERCENTILES = (50, 90, 99)
 
 
 def print_usage():
     print("Usage:\n{} <calldata hex>".format(sys.argv[0]))
+    print("{} -f </path/to/calldata.hex|->".format(sys.argv[0]))
+    print(
+        "{} --blocks </path/to/blocks.jsonl|-> [--workers N] [--mainnet]".format(
+            sys.argv[0]
+        )
+    )
+    print(
+        "{} --fixtures </path/to/fixture.json|/path/to/fixtures> [--workers N]".format(
+            sys.argv[0]
+        )
+    )
+    print("{} --ssz </path/to/ssz_txs.txt|->".format(sys.argv[0]))
     exit()
 
 
-def main() -> None:
-    if len(sys.argv) != 2:
+def iter_calldata_chunks(f: IO[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    pending = ""
+    prefix_checked = False
+    while True:
+        text = f.read(chunk_size)
+        if not text:
+            break
+        text = pending + "".join(text.split())
+        if not prefix_checked:
+            if len(text) < 2:
+                pending = text
+                continue
+            if text[:2] == "0x":
+                text = text[2:]
+            prefix_checked = True
+        cut = len(text) - (len(text) % 2)
+        yield bytes.fromhex(text[:cut])
+        pending = text[cut:]
+    if pending and pending != "0x":
+        raise Exception("Invalid calldata hex: odd length")
+
+
+def count_bytes(chunks: Iterable[bytes]) -> tuple[int, int]:
+    zero_bytes = 0
+    total_bytes = 0
+    for chunk in chunks:
+        zero_bytes += chunk.count(0)
+        total_bytes += len(chunk)
+    return zero_bytes, total_bytes - zero_bytes
+
+
+class TxGas:
+    """
+    The parts of a transaction its intrinsic gas depends on, read from a raw
+    tx, a JSON tx or an SSZ blob tx.
+    """
+
+    __slots__ = (
+        "gas_limit",
+        "create",
+        "zero_bytes",
+        "non_zero_bytes",
+        "access_list_addresses",
+        "access_list_storage_keys",
+        "blobs",
+        "authorizations",
+    )
+
+    gas_limit: int
+    create: bool
+    zero_bytes: int
+    non_zero_bytes: int
+    access_list_addresses: int
+    access_list_storage_keys: int
+    blobs: int
+    authorizations: int
+
+    def set_data(self, data: bytes) -> None:
+        self.zero_bytes = data.count(0)
+        self.non_zero_bytes = len(data) - self.zero_bytes
+
+    @classmethod
+    def from_raw(cls, raw: bytes | memoryview) -> "TxGas":
+        from eth_tools.get_tx_info import rlp_int
+        from eth_tools.rlp_codec import decode_rlp_list
+
+        buf = memoryview(raw)
+        if len(buf) == 0:
+            raise Exception("Invalid tx: empty")
+        tx_type = 0 if buf[0] >= 0xC0 else buf[0]
+        if tx_type not in TX_GAS_FIELD_POSITIONS:
+            raise Exception("Unsupported tx type: {}".format(tx_type))
+        items, _ = decode_rlp_list(buf if tx_type == 0 else buf[1:])
+        if tx_type == 3 and items and type(items[0]) is list:
+            # Network wrapper: [tx_payload_body, blobs, commitments, proofs]
+            items = items[0]
+        gas_pos, to_pos, data_pos, al_pos, blob_pos, auth_pos = TX_GAS_FIELD_POSITIONS[
+            tx_type
+        ]
+        t = cls()
+        t.gas_limit = rlp_int(items[gas_pos])
+        t.create = len(items[to_pos]) == 0
+        t.set_data(items[data_pos].tobytes())
+        access_list = items[al_pos] if al_pos is not None else []
+        t.access_list_addresses = len(access_list)
+        t.access_list_storage_keys = sum(len(keys) for _, keys in access_list)
+        t.blobs = len(items[blob_pos]) if blob_pos is not None else 0
+        t.authorizations = len(items[auth_pos]) if auth_pos is not None else 0
+        return t
+
+    @classmethod
+    def from_dict(cls, tx: dict) -> "TxGas":
+        # Accepts JSON-RPC, fixture and `get_tx_info` field names
+        from eth_tools.get_tx_info import format_int, get_tx_field
+
+        t = cls()
+        t.gas_limit = format_int(get_tx_field(tx, "gasLimit"))
+        to = tx.get("to")
+        t.create = not to or to == "0x"
+        data = get_tx_field(tx, "data")
+        if data.startswith("0x"):
+            data = data[2:]
+        t.set_data(bytes.fromhex(data))
+        access_list = tx.get("accessList") or []
+        t.access_list_addresses = len(access_list)
+        t.access_list_storage_keys = sum(
+            len(entry["storageKeys"]) for entry in access_list
+        )
+        t.blobs = len(tx.get("blobVersionedHashes") or [])
+        t.authorizations = len(tx.get("authorizationList") or [])
+        return t
+
+    @classmethod
+    def from_ssz(cls, tx: "SignedType3TxView") -> "TxGas":
+        t = cls()
+        t.gas_limit = tx.Gas
+        t.create = tx.To is None
+        t.set_data(tx.Data.tobytes())
+        t.access_list_addresses = len(tx.AccessList)
+        t.access_list_storage_keys = sum(len(keys) // 32 for _, keys in tx.AccessList)
+        t.blobs = len(tx.BlobVersionedHashes) // 32
+        t.authorizations = 0
+        return t
+
+
+def get_gas_batch(
+    txs: list[TxGas], istanbul: bool, initcode: bool, floor: bool
+) -> list[tuple[tuple[int, ...], int, int, int]]:
+    """
+    Returns, for each tx: its intrinsic gas components in GAS_COMPONENTS
+    order, its EIP-7623 floor (0 when `floor` is off), the least gas it can
+    use (the larger of its intrinsic gas and floor), and its blob gas.
+    `istanbul` selects the EIP-2028 non-zero byte cost and `initcode`
+    enables the EIP-3860 initcode word cost.
+    """
+    non_zero_byte_cost = Gtxdatanonzero if istanbul else Gtxdatanonzero_frontier
+    results: list[tuple[tuple[int, ...], int, int, int]] = []
+    for t in txs:
+        data_bytes = t.zero_bytes + t.non_zero_bytes
+        components = (
+            Gtx,
+            Gtxcreate if t.create else 0,
+            (data_bytes + 31) // 32 * INITCODE_WORD_COST
+            if t.create and initcode
+            else 0,
+            t.zero_bytes * Gtxdatazero + t.non_zero_bytes * non_zero_byte_cost,
+            t.access_list_addresses * ACCESS_LIST_ADDRESS_COST
+            + t.access_list_storage_keys * ACCESS_LIST_STORAGE_KEY_COST,
+            t.authorizations * PER_EMPTY_ACCOUNT_COST,
+        )
+        floor_gas = 0
+        if floor:
+            tokens = t.zero_bytes + t.non_zero_bytes * TOKENS_PER_NONZERO_BYTE
+            floor_gas = Gtx + tokens * TOTAL_COST_FLOOR_PER_TOKEN
+        results.append(
+            (
+                components,
+                floor_gas,
+                max(sum(components), floor_gas),
+                t.blobs * GAS_PER_BLOB,
+            )
+        )
+    return results
+
+
+def iter_block_txs(block: dict) -> Iterator[TxGas]:
+    if "rlp" in block:
+        from eth_tools.get_block_info import parse_hex, split_block_rlp
+        from eth_tools.rlp_codec import rlp_item_bounds, rlp_list_items
+
+        txs = split_block_rlp(parse_hex(block["rlp"]))[1]
+        for start, end in rlp_list_items(txs, 0):
+            is_list, payload_start, _ = rlp_item_bounds(txs, start)
+            # Typed txs are wrapped in a byte string, legacy txs are lists
+            yield TxGas.from_raw(txs[start:end] if is_list else txs[payload_start:end])
+        return
+    for tx in block.get("transactions", []):
+        if type(tx) is dict:
+            yield TxGas.from_dict(tx)
+        elif len(tx) == 66:
+            raise Exception("Block only has tx hashes, full txs are needed")
+        else:
+            yield TxGas.from_raw(bytes.fromhex(tx[2:] if tx.startswith("0x") else tx))
+
+
+def is_istanbul(header: dict, network: str | None, mainnet: bool) -> bool:
+    """
+    Whether EIP-2028 applies to a block. A fixture `network`, such as
+    "Byzantium" or "PetersburgToIstanbulAt5", decides it when given. Otherwise
+    a header with London fields is after Istanbul. Older headers are compared
+    with the mainnet Istanbul block when `mainnet` is set, and are assumed to
+    be after Istanbul when it is not.
+    """
+    from eth_tools.get_tx_info import format_int
+
+    number = header.get("number", header.get("blockNumber"))
+    if number is not None:
+        number = format_int(number)
+    if network is None:
+        if not mainnet or any(k in header for k in POST_LONDON_HEADER_FIELDS):
+            return True
+        return number is None or number >= MAINNET_ISTANBUL_BLOCK
+    before, _, after = network.partition("To")
+    if after:
+        # "At5" switches at a block number, "AtTime15k" at a timestamp
+        after, _, at = after.partition("At")
+        if at.startswith("Time"):
+            at = at[4:]
+            timestamp = header.get("timestamp")
+            value = format_int(timestamp) if timestamp is not None else None
+        else:
+            value = number
+        if at.endswith("k"):
+            boundary = int(at[:-1]) * 1000
+        else:
+            boundary = int(at)
+        network = after if value is None or value >= boundary else before
+    return network not in PRE_ISTANBUL_FORKS
+
+
+def measure_block(
+    block: dict,
+    header: dict | None = None,
+    network: str | None = None,
+    mainnet: bool = False,
+) -> tuple[dict, list[int]]:
+    """
+    Intrinsic gas of every tx of a block, checked against the header's
+    gasUsed and blobGasUsed. Fork rules follow the header: the calldata cost
+    from Istanbul (see `is_istanbul`), the initcode cost from Shanghai
+    (withdrawals) and the floor from Prague (requests).
+    Returns the block result and the least gas used by each tx.
+    """
+    from eth_tools.get_tx_info import format_int
+
+    if header is None:
+        header = block
+    result: dict = {}
+    for k in ("number", "blockNumber"):
+        if k in header:
+            result["number"] = format_int(header[k])
+            break
+    try:
+        istanbul = is_istanbul(header, network, mainnet)
+        initcode = "withdrawalsRoot" in header or "withdrawals" in header
+        floor = "requestsHash" in header
+        txs = list(iter_block_txs(block))
+        gas = get_gas_batch(txs, istanbul, initcode, floor)
+    except Exception as ex:
+        result["error"] = str(ex)
+        result["ok"] = False
+        return result, []
+
+    totals = [0] * len(GAS_COMPONENTS)
+    for components, _, _, _ in gas:
+        for i, v in enumerate(components):
+            totals[i] += v
+    min_gas_used = sum(g for _, _, g, _ in gas)
+    blob_gas = sum(b for _, _, _, b in gas)
+    result["txs"] = len(gas)
+    result["intrinsicGas"] = sum(totals)
+    result["components"] = dict(zip(GAS_COMPONENTS, totals))
+    result["floorBoundTxs"] = sum(1 for c, f, _, _ in gas if f > sum(c))
+    result["minGasUsed"] = min_gas_used
+    # A tx whose gas limit does not cover its intrinsic gas is invalid
+    result["gasLimits_ok"] = all(t.gas_limit >= g for t, (_, _, g, _) in zip(txs, gas))
+    if "gasUsed" in header:
+        result["gasUsed"] = format_int(header["gasUsed"])
+        result["gasUsed_ok"] = min_gas_used <= result["gasUsed"]
+    if "blobGasUsed" in header:
+        result["blobGasUsed"] = format_int(header["blobGasUsed"])
+        result["blobGas_ok"] = blob_gas == result["blobGasUsed"]
+    result["ok"] = all(v for k, v in result.items() if k.endswith("_ok"))
+    return result, [g for _, _, g, _ in gas]
+
+
+def measure_fixture_file(path: str) -> list[tuple[dict, list[int]]]:
+    from eth_tools.get_block_info import iter_fixture_blocks
+
+    try:
+        with open(path, "r") as f:
+            fixture = json.load(f)
+        if type(fixture) is not dict:
+            raise Exception("not a JSON object")
+    except Exception as ex:
+        return [({"file": path, "error": f"invalid fixture: {ex}", "ok": False}, [])]
+    results = []
+    for test, index, header, block_rlp in iter_fixture_blocks(fixture):
+        if header is None or block_rlp is None or index == "genesis":
+            continue
+        network = fixture[test].get("network")
+        result, gas = measure_block({"rlp": block_rlp}, header, network)
+        results.append(({"file": path, "test": test, "block": index, **result}, gas))
+    return results
+
+
+def print_gas_summary(gas: list[int], components: list[int]) -> None:
+    if not gas:
+        print("No transactions")
+        return
+    gas = sorted(gas)
+    percentiles = ", ".join(
+        f"p{p} {gas[min(len(gas) - 1, len(gas) * p // 100)]}"
+        for p in SUMMARY_PERCENTILES
+    )
+    print(
+        f"Gas per tx over {len(gas)} txs: min {gas[0]}, {percentiles}, "
+        f"max {gas[-1]}, mean {sum(gas) / len(gas):.0f}"
+    )
+    print(
+        "Intrinsic gas by component: "
+        + ", ".join(f"{k} {v}" for k, v in zip(GAS_COMPONENTS, components))
+    )
+
+
+def report_block_results(results: Iterable[tuple[dict, list[int]]]) -> None:
+    all_gas: list[int] = []
+    components = [0] * len(GAS_COMPONENTS)
+    blocks = failed = 0
+    for result, gas in results:
+        blocks += 1
+        if not result["ok"]:
+            failed += 1
+        all_gas += gas
+        for i, k in enumerate(GAS_COMPONENTS):
+            components[i] += result.get("components", {}).get(k, 0)
+        print(json.dumps(result, separators=(",", ":")))
+    print(f"Measured {blocks} blocks: {blocks - failed} ok, {failed} failed")
+    print_gas_summary(all_gas, components)
+    if failed:
+        sys.exit(1)
+
+
+def parse_mode_args(args: list[str]) -> tuple[str, int]:
+    workers = os.cpu_count() or 1
+    path = None
+    while args:
+        arg = args.pop(0)
+        if arg == "--workers" and args:
+            workers = int(args.pop(0))
+        elif path is None:
+            path = arg
+        else:
+            print_usage()
+    if path is None:
         print_usage()
+        raise Exception("Missing path")
+    return path, workers
 
-    (_, calldatahex) = sys.argv
 
-    if calldatahex[:2] == "0x":
-        calldatahex = calldatahex[2:]
+def blocks_main(args: list[str]) -> None:
+    from functools import partial
 
-    Gtxdatazero = 4
-    Gtxdatanonzero = 16
+    from eth_tools.get_block_info import iter_blocks
+    from eth_tools.parallel import iter_chunk_results
 
-    calldata = bytes.fromhex(calldatahex)
+    # Pre-London headers only tell their fork by their mainnet block number
+    mainnet = "--mainnet" in args
+    path, workers = parse_mode_args([arg for arg in args if arg != "--mainnet"])
+    f = sys.stdin if path == "-" else open(path, "r")
+    try:
+        measure = partial(measure_block, mainnet=mainnet)
+        report_block_results(
+            result
+            for _, result in iter_chunk_results(
+                measure, iter_blocks(f), workers, BLOCKS_CHUNK_SIZE
+            )
+        )
+    finally:
+        if f is not sys.stdin:
+            f.close()
 
-    zero_bytes = 0
-    non_zero_bytes = 0
 
-    for b in calldata:
-        if b == 0:
-            zero_bytes += 1
+def fixtures_main(args: list[str]) -> None:
+    from concurrent.futures import ProcessPoolExecutor
+
+    from eth_tools.get_block_info import get_fixture_paths
+
+    path, workers = parse_mode_args(args)
+    paths = get_fixture_paths(path) if os.path.isdir(path) else [path]
+    if workers > 1 and len(paths) > 1:
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            report_block_results(
+                r
+                for results in executor.map(
+                    measure_fixture_file, paths, chunksize=chunksize
+                )
+                for r in results
+            )
+    else:
+        report_block_results(r for p in paths for r in measure_fixture_file(p))
+
+
+def ssz_main(args: list[str]) -> None:
+    from eth_tools.parse_ssz_tx import decode_signed_type3_tx, iter_ssz_txs
+
+    if len(args) != 1:
+        print_usage()
+    path = args[0]
+    f = sys.stdin if path == "-" else open(path, "r")
+    try:
+        # Blob txs are valid from Cancun, so the initcode cost applies
+        txs = [
+            TxGas.from_ssz(decode_signed_type3_tx(memoryview(ssz_bytes)[1:]))
+            for ssz_bytes in iter_ssz_txs(f)
+        ]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    gas = get_gas_batch(txs, True, True, False)
+    components = [0] * len(GAS_COMPONENTS)
+    for i, (tx_components, _, min_gas, blob_gas) in enumerate(gas):
+        for j, v in enumerate(tx_components):
+            components[j] += v
+        print(
+            json.dumps(
+                {
+                    "index": i,
+                    "intrinsicGas": min_gas,
+                    "blobGas": blob_gas,
+                    "gasLimit_ok": txs[i].gas_limit >= min_gas,
+                },
+                separators=(",", ":"),
+            )
+        )
+    print_gas_summary([g for _, _, g, _ in gas], components)
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "--blocks":
+        blocks_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--fixtures":
+        fixtures_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--ssz":
+        ssz_main(sys.argv[2:])
+        return
+
+    if len(sys.argv) == 3 and sys.argv[1] == "-f":
+        path = sys.argv[2]
+        if path == "-":
+            zero_bytes, non_zero_bytes = count_bytes(iter_calldata_chunks(sys.stdin))
         else:
-            non_zero_bytes += 1
+            with open(path, "r") as f:
+                zero_bytes, non_zero_bytes = count_bytes(iter_calldata_chunks(f))
+    elif len(sys.argv) == 2:
+        (_, calldatahex) = sys.argv
+
+        if calldatahex[:2] == "0x":
+            calldatahex = calldatahex[2:]
+
+        zero_bytes, non_zero_bytes = count_bytes([bytes.fromhex(calldatahex)])
+    else:
+        print_usage()
+
+    tokens = zero_bytes + non_zero_bytes * TOKENS_PER_NONZERO_BYTE
+    words = (zero_bytes + non_zero_bytes + 31) // 32
 
     print(f"Zero bytes = {zero_bytes}")
     print(f"Non zero bytes = {non_zero_bytes}")
     print(f"Total cost = {zero_bytes * Gtxdatazero + non_zero_bytes * Gtxdatanonzero}")
+    print(f"Tokens = {tokens}")
+    print(f"Floor cost (EIP-7623) = {Gtx + tokens * TOTAL_COST_FLOOR_PER_TOKEN}")
+    print(f"Initcode word cost (EIP-3860) = {words * INITCODE_WORD_COST}")
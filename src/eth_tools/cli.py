@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+import base64
+import contextlib
+import importlib
+import io
+import json
+import os
+import socketserver
+import sys
+from typing import IO, Callable
+
+# Subcommand -> module implementing it. Modules are only imported when their
+# subcommand is first run, so one-shot invocations pay for a single tool.
+COMMANDS = {
+    "address_from_signature": "eth_tools.address_from_signature",
+    "address_from_sk": "eth_tools.address_from_sk",
+    "calc_expected_difficulty": "eth_tools.calc_expected_difficulty",
+    "calc_tx_data_cost": "eth_tools.calc_tx_data_cost",
+    "create": "eth_tools.create",
+    "create2": "eth_tools.create2",
+    "eth_tools_bench": "eth_tools.benchmarks",
+    "get_block_info": "eth_tools.get_block_info",
+    "get_tx_info": "eth_tools.get_tx_info",
+    "keccak_bench": "eth_tools.keccak",
+    "ordered_trie_bench": "eth_tools.ordered_trie",
+    "parse_ssz_tx": "eth_tools.parse_ssz_tx",
+    "state_root": "eth_tools.state_root",
+}
+
+
+def print_usage():
+    print("Usage:\n{} <command> [args...]".format(sys.argv[0]))
+    print("{} --serve [--socket /path/to/socket]\n".format(sys.argv[0]))
+    print("Commands:\n    {}\n".format("\n    ".join(COMMANDS)))
+    print(
+        'Server requests are newline-delimited JSON objects: {"command": '
+        '"create", "args": ["0x...", "1"], "stdin": "...", "id": 1}'
+    )
+
+
+def get_command(command: str) -> Callable[[], None]:
+    if command not in COMMANDS:
+        raise Exception("Unknown command: " + command)
+    return importlib.import_module(COMMANDS[command]).main
+
+
+def run_command(command: str, args: list[str]) -> int:
+    sys.argv = [command] + args
+    try:
+        get_command(command)()
+    except SystemExit as ex:
+        if ex.code is None:
+            return 0
+        if type(ex.code) is int:
+            return ex.code
+        print(ex.code, file=sys.stderr)
+        return 1
+    return 0
+
+
+def handle_request(line: str) -> dict:
+    """
+    Runs one request with its own stdin, stdout and stderr. The streams are
+    text wrappers over byte buffers, so tools writing binary output through
+    `sys.stdout.buffer` work too. Output that is not valid UTF-8 is returned
+    base64 encoded in `stdout_base64` instead of `stdout`.
+    """
+    response: dict = {}
+    stdout = io.BytesIO()
+    stderr = io.StringIO()
+    stdout_writer = io.TextIOWrapper(stdout, encoding="utf-8", write_through=True)
+    saved_argv, saved_stdin = sys.argv, sys.stdin
+    try:
+        request = json.loads(line)
+        if "id" in request:
+            response["id"] = request["id"]
+        # Tools read `-` inputs from stdin and `exit()` closes it, so each
+        # request gets its own
+        sys.stdin = io.TextIOWrapper(
+            io.BytesIO(request.get("stdin", "").encode()), encoding="utf-8"
+        )
+        with contextlib.redirect_stdout(stdout_writer), contextlib.redirect_stderr(
+            stderr
+        ):
+            try:
+                exit_code = run_command(
+                    request["command"], [str(a) for a in request.get("args", [])]
+                )
+            except Exception as ex:
+                print("{}: {}".format(type(ex).__name__, ex), file=sys.stderr)
+                exit_code = 1
+            stdout_writer.flush()
+    except Exception as ex:
+        stderr.write("Invalid request: {}\n".format(ex))
+        exit_code = 1
+    finally:
+        sys.argv, sys.stdin = saved_argv, saved_stdin
+    output = stdout.getvalue()
+    response["exit_code"] = exit_code
+    try:
+        response["stdout"] = output.decode("utf-8")
+    except UnicodeDecodeError:
+        response["stdout"] = ""
+        response["stdout_base64"] = base64.b64encode(output).decode()
+    response["stderr"] = stderr.getvalue()
+    return response
+
+
+def serve(reader: IO[str], writer: IO[str]) -> None:
+    for line in reader:
+        if not line.strip():
+            continue
+        writer.write(json.dumps(handle_request(line)) + "\n")
+        writer.flush()
+
+
+class CommandRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        reader = io.TextIOWrapper(self.rfile, encoding="utf-8")
+        writer = io.TextIOWrapper(self.wfile, encoding="utf-8")
+        serve(reader, writer)
+
+
+def main() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print_usage()
+        sys.exit()
+
+    if sys.argv[1] == "--serve":
+        if len(sys.argv) == 4 and sys.argv[2] == "--socket":
+            socket_path = sys.argv[3]
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            # Requests are handled one at a time since each one redirects the
+            # process-wide stdout/stderr
+            with socketserver.UnixStreamServer(
+                socket_path, CommandRequestHandler
+            ) as server:
+                server.serve_forever()
+        elif len(sys.argv) == 2:
+            serve(sys.stdin, sys.stdout)
+        else:
+            print_usage()
+            raise Exception("Incorrect arguments")
+        return
+
+    (_, command, *args) = sys.argv
+    sys.exit(run_command(command, args))
+
+
+if __name__ == "__main__":
+    main()
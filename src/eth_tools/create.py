@@ -1,16 +1,132 @@
 #!/usr/bin/env python
+import json
 import sys
+from typing import IO
 
 import rlp
-from Crypto.Hash import keccak
+
+from eth_tools.keccak import keccak_256, keccak_many
+
+# Nonces derived per batch in range mode
+RANGE_BATCH_SIZE = 1 << 16
+
+RANGE_FORMATS = ("csv", "jsonl", "bin")
 
 
 def print_usage():
     print("Usage:\n{} <address> <nonce>".format(sys.argv[0]))
+    print(
+        "{} --range <first nonce> <last nonce> <address>... [--format {}] "
+        "[--output <path>]".format(sys.argv[0], "|".join(RANGE_FORMATS))
+    )
     exit()
 
 
+def encode_nonce(nonce: int) -> bytes:
+    # RLP of the nonce as an integer: 0 is the empty string and values below
+    # 0x80 are their own single byte encoding
+    if nonce == 0:
+        return b"\x80"
+    if nonce < 0x80:
+        return bytes([nonce])
+    nonce_bytes = nonce.to_bytes((nonce.bit_length() + 7) // 8, "big")
+    return bytes([0x80 + len(nonce_bytes)]) + nonce_bytes
+
+
+def get_create_preimage(addr: bytes, nonce: int) -> bytes:
+    # rlp([addr, nonce]) is always shorter than 56 bytes, so both prefixes are
+    # single bytes
+    payload = b"\x94" + addr + encode_nonce(nonce)
+    return bytes([0xC0 + len(payload)]) + payload
+
+
+def get_create_address(addr: bytes, nonce: int) -> bytes:
+    return keccak_256(get_create_preimage(addr, nonce))[12:]
+
+
+def write_address_batch(
+    out: IO[bytes], fmt: str, addr: bytes, nonces: range, addresses: list[bytes]
+) -> None:
+    if fmt == "bin":
+        # Fixed width records: deployer (20) + nonce (8) + address (20)
+        out.write(
+            b"".join(
+                addr + nonce.to_bytes(8, "big") + address
+                for nonce, address in zip(nonces, addresses)
+            )
+        )
+        return
+    deployer = "0x" + addr.hex()
+    if fmt == "csv":
+        lines = (
+            f"{deployer},{nonce},0x{address.hex()}\n"
+            for nonce, address in zip(nonces, addresses)
+        )
+    else:
+        lines = (
+            json.dumps(
+                {"deployer": deployer, "nonce": nonce, "address": "0x" + address.hex()}
+            )
+            + "\n"
+            for nonce, address in zip(nonces, addresses)
+        )
+    out.write("".join(lines).encode())
+
+
+def range_main(args: list[str]) -> None:
+    fmt = "csv"
+    output_path = None
+    positional = []
+    while args:
+        arg = args.pop(0)
+        if arg == "--format" and args:
+            fmt = args.pop(0)
+        elif arg == "--output" and args:
+            output_path = args.pop(0)
+        else:
+            positional.append(arg)
+    if len(positional) < 3 or fmt not in RANGE_FORMATS:
+        print_usage()
+
+    first, last = (int(n, 16) if n.startswith("0x") else int(n) for n in positional[:2])
+    addrs = []
+    for addr_hex in positional[2:]:
+        if addr_hex.startswith("0x"):
+            addr_hex = addr_hex[2:]
+        if (len(addr_hex) % 2) != 0:
+            addr_hex = "0" + addr_hex
+        if len(addr_hex) != 40:
+            raise Exception("Invalid address length: " + addr_hex)
+        addrs.append(bytes.fromhex(addr_hex))
+    if first < 0 or last >= 2**64:
+        raise Exception("Nonce out of range")
+
+    out = open(output_path, "wb") if output_path else sys.stdout.buffer
+    try:
+        if fmt == "csv":
+            out.write(b"deployer,nonce,address\n")
+        for addr in addrs:
+            for batch_start in range(first, last + 1, RANGE_BATCH_SIZE):
+                nonces = range(
+                    batch_start, min(batch_start + RANGE_BATCH_SIZE, last + 1)
+                )
+                addresses = [
+                    digest[12:]
+                    for digest in keccak_many(
+                        get_create_preimage(addr, nonce) for nonce in nonces
+                    )
+                ]
+                write_address_batch(out, fmt, addr, nonces, addresses)
+    finally:
+        if output_path:
+            out.close()
+
+
 def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "--range":
+        range_main(sys.argv[2:])
+        return
+
     if len(sys.argv) != 3:
         print_usage()
 
@@ -34,5 +150,5 @@ def main() -> None:
     if nonce == bytes.fromhex("00"):
         nonce = ""
 
-    kec = keccak.new(data=rlp.encode([addr, nonce]), digest_bits=256).digest()
+    kec = keccak_256(rlp.encode([addr, nonce]))
     print("0x" + kec[12:].hex())
@@ -1,15 +1,205 @@
 #!/usr/bin/env python
+import os
+import struct
 import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 
-from Crypto.Hash import keccak
+from eth_tools.keccak import keccak_256
+
+# Salts checked by a worker per submitted batch in search mode
+SEARCH_BATCH_SIZE = 1 << 16
+
+MASK_64 = (1 << 64) - 1
 
 
 def print_usage():
     print("Usage:\n{} <address> <salt> <init_code>".format(sys.argv[0]))
+    print(
+        "{} --search <address> <init_code> [--prefix <hex>] [--suffix <hex>] "
+        "[--zeros <leading zero bytes>] [--start <salt>] [--matches <count>] "
+        "[--workers <count>]".format(sys.argv[0])
+    )
     exit()
 
 
+def get_create2_preimage(addr: bytes, salt: int, init_code_hash: bytes) -> bytes:
+    return b"\xff" + addr + salt.to_bytes(32, "big") + init_code_hash
+
+
+def address_matches(
+    digest: bytes,
+    prefix: bytes,
+    prefix_nibble: int | None,
+    suffix: bytes,
+    suffix_nibble: int | None,
+) -> bool:
+    # The address is digest[12:]
+    if not digest.startswith(prefix, 12) or not digest.endswith(suffix):
+        return False
+    if prefix_nibble is not None and digest[12 + len(prefix)] >> 4 != prefix_nibble:
+        return False
+    if suffix_nibble is not None and digest[31 - len(suffix)] & 0x0F != suffix_nibble:
+        return False
+    return True
+
+
+def search_salt_range(
+    preimage: bytes,
+    start: int,
+    end: int,
+    prefix: bytes,
+    prefix_nibble: int | None,
+    suffix: bytes,
+    suffix_nibble: int | None,
+) -> list[tuple[int, bytes]]:
+    # The preimage buffer is reused for every salt: only the low 8 bytes of the
+    # salt are rewritten in place, the high bytes when they carry over
+    buf = bytearray(preimage)
+    buf[21:45] = (start >> 64).to_bytes(24, "big")
+    pack_into = struct.pack_into
+    hash = keccak_256
+    found = []
+    for salt in range(start, end):
+        low = salt & MASK_64
+        if low == 0:
+            buf[21:45] = (salt >> 64).to_bytes(24, "big")
+        pack_into(">Q", buf, 45, low)
+        digest = hash(buf)
+        if address_matches(digest, prefix, prefix_nibble, suffix, suffix_nibble):
+            found.append((salt, digest[12:]))
+    return found
+
+
+def parse_hex_pattern(pattern: str, is_suffix: bool) -> tuple[bytes, int | None]:
+    # Returns the whole bytes of the pattern plus its odd nibble, if any, which
+    # is the one closest to the middle of the address
+    if pattern.startswith("0x"):
+        pattern = pattern[2:]
+    if len(pattern) % 2 == 0:
+        return bytes.fromhex(pattern), None
+    if is_suffix:
+        return bytes.fromhex(pattern[1:]), int(pattern[0], 16)
+    return bytes.fromhex(pattern[:-1]), int(pattern[-1], 16)
+
+
+def parse_int(val: str) -> int:
+    if val.startswith("0x"):
+        return int(val, 16)
+    return int(val)
+
+
+def parse_hex(val: str) -> bytes:
+    if val.startswith("0x"):
+        val = val[2:]
+    if (len(val) % 2) != 0:
+        val = "0" + val
+    return bytes.fromhex(val)
+
+
+def search_main(args: list[str]) -> None:
+    if len(args) < 2:
+        print_usage()
+    addr = parse_hex(args.pop(0))
+    init_code = parse_hex(args.pop(0))
+    # The salt is rewritten at fixed offsets of the preimage
+    if len(addr) != 20:
+        raise Exception("Invalid address length: 0x" + addr.hex())
+
+    prefix, prefix_nibble = b"", None
+    suffix, suffix_nibble = b"", None
+    zeros = 0
+    start = 0
+    max_matches = 1
+    workers = os.cpu_count() or 1
+    while args:
+        arg = args.pop(0)
+        if not args:
+            print_usage()
+        val = args.pop(0)
+        if arg == "--prefix":
+            prefix, prefix_nibble = parse_hex_pattern(val, False)
+        elif arg == "--suffix":
+            suffix, suffix_nibble = parse_hex_pattern(val, True)
+        elif arg == "--zeros":
+            zeros = int(val)
+        elif arg == "--start":
+            start = parse_int(val)
+        elif arg == "--matches":
+            max_matches = int(val)
+        elif arg == "--workers":
+            workers = int(val)
+        else:
+            print_usage()
+
+    if zeros:
+        if prefix or prefix_nibble is not None:
+            raise Exception("--zeros and --prefix are mutually exclusive")
+        prefix = bytes(zeros)
+
+    init_code_hash = keccak_256(init_code)
+    preimage = get_create2_preimage(addr, 0, init_code_hash)
+    pattern = (prefix, prefix_nibble, suffix, suffix_nibble)
+
+    matches: list[tuple[int, bytes]] = []
+    pending: deque[Future] = deque()
+    next_salt = start
+    searched_until = start
+    start_time = time.perf_counter()
+    last_report = start_time
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            # Batches are collected in submission order so matches are reported
+            # in salt order and `searched_until` is a safe resume offset
+            while len(matches) < max_matches:
+                while len(pending) < workers * 2:
+                    end = next_salt + SEARCH_BATCH_SIZE
+                    pending.append(
+                        executor.submit(
+                            search_salt_range, preimage, next_salt, end, *pattern
+                        )
+                    )
+                    next_salt = end
+                searched_until += SEARCH_BATCH_SIZE
+                for salt, address in pending.popleft().result():
+                    if len(matches) == max_matches:
+                        # Resume from the first match that was not reported
+                        searched_until = salt
+                        break
+                    matches.append((salt, address))
+                    print(
+                        "salt = 0x{:064x} address = 0x{}".format(salt, address.hex()),
+                        flush=True,
+                    )
+                now = time.perf_counter()
+                if now - last_report > 5:
+                    last_report = now
+                    rate = (searched_until - start) / (now - start_time)
+                    print(
+                        f"{rate:.0f} hashes/s, resume with --start {searched_until}",
+                        file=sys.stderr,
+                    )
+        finally:
+            for f in pending:
+                f.cancel()
+
+    elapsed = time.perf_counter() - start_time
+    print(
+        "Searched {} salts in {:.2f}s ({:.0f} hashes/s), resume with --start {}".format(
+            searched_until - start,
+            elapsed,
+            (searched_until - start) / elapsed,
+            searched_until,
+        )
+    )
+
+
 def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "--search":
+        search_main(sys.argv[2:])
+        return
+
     if len(sys.argv) != 4:
         print_usage()
 
@@ -34,6 +224,6 @@ def main() -> None:
     salt = bytes.fromhex(salt)
     init_code = bytes.fromhex(init_code)
 
-    init_kec = keccak.new(data=init_code, digest_bits=256).digest()
-    kec = keccak.new(data=(ff + addr + salt + init_kec), digest_bits=256)
-    print("0x" + kec.digest()[12:].hex())
+    init_kec = keccak_256(init_code)
+    kec = keccak_256(ff + addr + salt + init_kec)
+    print("0x" + kec[12:].hex())
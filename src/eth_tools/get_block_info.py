@@ -1,18 +1,68 @@
 #!/usr/bin/env python
 import json
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from hashlib import sha256
 from pprint import pprint
+from typing import IO, Iterator
 
 import rlp
-from Crypto.Hash import keccak
-from trie import HexaryTrie
 
-EMPTY_TRIE_HASH = HexaryTrie(db={}).root_hash
-EMPTY_OMMERS_HASH = keccak.new(data=rlp.encode([]), digest_bits=256).digest()
+from eth_tools.keccak import keccak_256
+from eth_tools.ordered_trie import EMPTY_TRIE_ROOT, ordered_trie_root
+from eth_tools.parallel import iter_chunk_results
+from eth_tools.rlp_codec import rlp_item_bounds, rlp_length_prefix, rlp_list_items
+
+EMPTY_TRIE_HASH = EMPTY_TRIE_ROOT
+EMPTY_OMMERS_HASH = keccak_256(rlp.encode([]))
 EMPTY_LOGS_BLOOM = bytes([0] * 256)
 EMPTY_NONCE = bytes([0] * 8)
 EMPTY_MIX_HASH = bytes([0] * 32)
 
+READ_CHUNK_SIZE = 1 << 16
+
+# Blocks verified per worker task by `--batch`
+BATCH_CHUNK_SIZE = 64
+
+# Cache of `--corpus` results, written in the corpus directory by default
+CORPUS_CACHE_NAME = ".get_block_info_cache.json"
+
+# Source files of the `--corpus` verification, hashed into the cache version
+CORPUS_MODULES = (
+    "get_block_info.py",
+    "ordered_trie.py",
+    "rlp_codec.py",
+    "keccak.py",
+)
+
+# Headers encoded by `--benchmark-headers`, and distinct headers cycled through
+HEADER_BENCHMARK_COUNT = 1_000_000
+HEADER_BENCHMARK_POOL_SIZE = 1024
+
+# Optional header fields introduced by each fork, cumulative
+HEADER_FORK_FIELDS = {
+    "London": ("baseFeePerGas",),
+    "Shanghai": ("baseFeePerGas", "withdrawalsRoot"),
+    "Cancun": (
+        "baseFeePerGas",
+        "withdrawalsRoot",
+        "blobGasUsed",
+        "excessBlobGas",
+        "parentBeaconBlockRoot",
+    ),
+    "Prague": (
+        "baseFeePerGas",
+        "withdrawalsRoot",
+        "blobGasUsed",
+        "excessBlobGas",
+        "parentBeaconBlockRoot",
+        "requestsHash",
+    ),
+}
+
 
 def to_hex(b: bytes | str) -> str:
     if type(b) is bytes:
@@ -43,23 +93,9 @@ def bytes_equal(b1: bytes | str, b2: bytes | str) -> bool:
 
 def format_value_for_rlp(k, v) -> bytes:
     if k == "transactions":
-        t = HexaryTrie(db={})
-        for i, tx in enumerate(v):
-            id = rlp.encode(i)
-            txBytes = bytes.fromhex(tx[2:])
-            t.set(id, txBytes)
-        v = t.root_hash
+        v = ordered_trie_root([bytes.fromhex(tx[2:]) for tx in v])
     elif k == "withdrawals":
-        t = HexaryTrie(db={})
-        for id, withdrawal in enumerate(v):
-            fields = ("index", "validatorIndex", "address", "amount")
-            rlp_array = []
-            for field in fields:
-                if field not in withdrawal:
-                    raise Exception(f"Required withdrawal key not found: {field}")
-                rlp_array.append(format_value_for_rlp(field, withdrawal[field]))
-            t.set(rlp.encode(id), rlp.encode(rlp_array))
-        v = t.root_hash
+        v = ordered_trie_root([Withdrawal.from_dict(w).encode() for w in v])
     elif k == "extraData":
         if type(v) is str:
             if v.startswith("0x"):
@@ -91,80 +127,111 @@ def format_value_for_rlp(k, v) -> bytes:
     return v
 
 
-def get_header_rlp_array(block: dict) -> list:
-    rlp_array = []
+HEADER_REQUIRED_FIELDS = (
+    "parentHash",
+    "ommers/ommersHash/sha3Uncles/uncleHash",
+    "coinbase/miner/feeRecipient",
+    "stateRoot",
+    "transactions/transactionsTrie/transactionsRoot",
+    "receiptRoot/receiptsRoot/receiptTrie",
+    "bloom/logsBloom",
+    "difficulty",
+    "blockNumber/number",
+    "gasLimit",
+    "gasUsed",
+    "timestamp",
+    "extraData",
+    "mixHash/prevRandao",
+    "nonce",
+)
 
-    required_fields = (
-        "parentHash",
-        "ommers/ommersHash/sha3Uncles/uncleHash",
-        "coinbase/miner/feeRecipient",
-        "stateRoot",
-        "transactions/transactionsTrie/transactionsRoot",
-        "receiptRoot/receiptsRoot/receiptTrie",
-        "bloom/logsBloom",
-        "difficulty",
-        "blockNumber/number",
-        "gasLimit",
-        "gasUsed",
-        "timestamp",
-        "extraData",
-        "mixHash/prevRandao",
-        "nonce",
-    )
+HEADER_FIELDS_WITH_DEFAULT = {
+    "ommers/ommersHash/sha3Uncles/uncleHash": EMPTY_OMMERS_HASH,
+    "difficulty": "0x0",
+    "nonce": EMPTY_NONCE,
+}
 
-    fields_with_default = {
-        "ommers/ommersHash/sha3Uncles/uncleHash": EMPTY_OMMERS_HASH,
-        "difficulty": "0x0",
-        "nonce": EMPTY_NONCE,
-    }
+# London and later, in activation order
+HEADER_OPTIONAL_FIELDS = (
+    "baseFeePerGas",
+    "withdrawals/withdrawalsRoot",
+    "blobGasUsed",
+    "excessBlobGas",
+    "parentBeaconBlockRoot",
+    "requestsHash",
+)
 
-    optional_fields = (
-        "baseFeePerGas",
-        "withdrawals/withdrawalsRoot",
-        "blobGasUsed",
-        "excessBlobGas",
-        "parentBeaconBlockRoot",
-    )
 
-    for k in required_fields:
-        v = None
-        found = False
+@lru_cache(maxsize=None)
+def compile_header_layout(keys: frozenset) -> tuple:
+    """
+    Resolves, once per distinct set of block keys, which key provides each
+    header field. Returns (key, default, optional) entries: `key` is None for
+    fields that take their pre-formatted `default` value.
+    """
+    layout: list[tuple[str | None, bytes | None, bool]] = []
+    for k in HEADER_REQUIRED_FIELDS:
+        # The last alias present wins
+        found = None
         for kk in k.split("/"):
-            if kk in block:
-                v = block[kk]
-                k = kk
-                found = True
-        if not found:
-            if k in fields_with_default:
-                v = fields_with_default[k]
-            else:
-                raise Exception("Required key not found: " + k)
-        rlp_array.append(format_value_for_rlp(k, v))
-
-    for k in optional_fields:
-        v = None
-        found = False
+            if kk in keys:
+                found = kk
+        if found is not None:
+            layout.append((found, None, False))
+        elif k in HEADER_FIELDS_WITH_DEFAULT:
+            default = format_value_for_rlp(k, HEADER_FIELDS_WITH_DEFAULT[k])
+            layout.append((None, default, False))
+        else:
+            raise Exception("Required key not found: " + k)
+    for k in HEADER_OPTIONAL_FIELDS:
+        found = None
         for kk in k.split("/"):
-            if kk in block:
-                v = block[kk]
-                k = kk
-                found = True
-        if not found:
-            continue
-        if v is not None:
-            rlp_array.append(format_value_for_rlp(k, v))
+            if kk in keys:
+                found = kk
+        if found is not None:
+            layout.append((found, None, True))
+    return tuple(layout)
+
 
+def get_header_rlp_array(block: dict) -> list:
+    rlp_array = []
+    for k, default, optional in compile_header_layout(frozenset(block)):
+        if k is None:
+            rlp_array.append(default)
+            continue
+        v = block[k]
+        # Optional fields explicitly set to null are skipped
+        if optional and v is None:
+            continue
+        rlp_array.append(format_value_for_rlp(k, v))
     return rlp_array
 
 
+def encode_rlp_bytes_list(items: list[bytes]) -> bytes:
+    """
+    Same output as `rlp.encode` for a flat list of byte strings, without its
+    per-item type dispatch.
+    """
+    parts = []
+    for item in items:
+        if len(item) == 1 and item[0] < 0x80:
+            parts.append(item)
+        else:
+            parts.append(rlp_length_prefix(len(item), 0x80))
+            parts.append(item)
+    payload = b"".join(parts)
+    return rlp_length_prefix(len(payload), 0xC0) + payload
+
+
 def get_header_rlp(block: dict) -> bytes:
-    return rlp.encode(get_header_rlp_array(block))
+    return encode_rlp_bytes_list(get_header_rlp_array(block))
 
 
 def get_block_rlp(block: dict) -> bytes:
-    rlp_array = []
-    rlp_array.append(get_header_rlp_array(block))
+    return rlp.encode([get_header_rlp_array(block), *get_block_body(block)])
+
 
+def get_block_body(block: dict) -> tuple[list, list]:
     txs_rlp_array = []
     if "transactions" in block:
         for t in block["transactions"]:
@@ -172,7 +239,6 @@ def get_block_rlp(block: dict) -> bytes:
     elif "transactionsTrie" in block:
         if not bytes_equal(block["transactionsTrie"], EMPTY_TRIE_HASH):
             raise Exception("Cannot get the block rlp without the actual transactions")
-    rlp_array.append(txs_rlp_array)
 
     ommers_rlp_array = []
     if "ommmers" in block:
@@ -187,9 +253,8 @@ def get_block_rlp(block: dict) -> bytes:
     elif "uncleHash" in block:
         if not bytes_equal(block["uncleHash"], EMPTY_OMMERS_HASH):
             raise Exception("Cannot get the block rlp without the actual ommers")
-    rlp_array.append(ommers_rlp_array)
 
-    return rlp.encode(rlp_array)
+    return txs_rlp_array, ommers_rlp_array
 
 
 def can_get_block_rlp(block: dict) -> bool:
@@ -208,7 +273,942 @@ def can_get_block_rlp(block: dict) -> bool:
 
 def get_block_hash(block: dict) -> bytes:
     rlp = get_header_rlp(block)
-    return keccak.new(data=rlp, digest_bits=256).digest()
+    return keccak_256(rlp)
+
+
+def get_expected_hash(block: dict) -> bytes | str | None:
+    if "blockHash" in block:
+        return block["blockHash"]
+    elif "hash" in block:
+        return block["hash"]
+    return None
+
+
+def parse_hex(v: bytes | str) -> bytes:
+    if type(v) is str:
+        if v.startswith("0x"):
+            v = v[2:]
+        return bytes.fromhex(v)
+    if type(v) is not bytes:
+        raise Exception("invalid type")
+    return v
+
+
+class Withdrawal:
+    """
+    Withdrawal with its fields parsed once into the bytes they are RLP encoded
+    as.
+    """
+
+    __slots__ = ("index", "validator_index", "address", "amount")
+
+    index: bytes
+    validator_index: bytes
+    address: bytes
+    amount: bytes
+
+    @classmethod
+    def from_dict(cls, withdrawal: dict) -> "Withdrawal":
+        fields = []
+        for field in ("index", "validatorIndex", "address", "amount"):
+            if field not in withdrawal:
+                raise Exception(f"Required withdrawal key not found: {field}")
+            fields.append(format_value_for_rlp(field, withdrawal[field]))
+        w = cls()
+        w.index, w.validator_index, w.address, w.amount = fields
+        return w
+
+    def encode(self) -> bytes:
+        return encode_rlp_bytes_list(
+            [self.index, self.validator_index, self.address, self.amount]
+        )
+
+
+class Block:
+    """
+    Block JSON parsed once: header fields are kept as the bytes they are RLP
+    encoded as, in header order, and transactions as raw tx bytes, so hashing,
+    encoding and comparisons do not go back to the hex strings.
+    """
+
+    __slots__ = (
+        "header",
+        "transactions",
+        "ommers",
+        "number",
+        "expected_hash",
+        "expected_rlp",
+        "_hash",
+    )
+
+    header: list[bytes]
+    # None when the block only has the roots of its body
+    transactions: list[bytes] | None
+    ommers: list[bytes] | None
+    number: int | None
+    expected_hash: bytes | None
+    expected_rlp: bytes | None
+    _hash: bytes | None
+
+    @classmethod
+    def from_dict(cls, block: dict) -> "Block":
+        b = cls()
+        b.header = get_header_rlp_array(block)
+        b.transactions = b.ommers = None
+        if can_get_block_rlp(block):
+            b.transactions, b.ommers = get_block_body(block)
+        b.number = get_block_number(block)
+        expected_hash = get_expected_hash(block)
+        b.expected_hash = None if expected_hash is None else parse_hex(expected_hash)
+        b.expected_rlp = parse_hex(block["rlp"]) if "rlp" in block else None
+        b._hash = None
+        return b
+
+    @property
+    def parent_hash(self) -> bytes:
+        return self.header[0]
+
+    def has_body(self) -> bool:
+        return self.transactions is not None
+
+    def get_header_rlp(self) -> bytes:
+        return encode_rlp_bytes_list(self.header)
+
+    def get_hash(self) -> bytes:
+        if self._hash is None:
+            self._hash = keccak_256(self.get_header_rlp())
+        return self._hash
+
+    def get_rlp(self) -> bytes:
+        if not self.has_body():
+            raise Exception("Cannot get the block rlp without the actual body")
+        return rlp.encode([self.header, self.transactions, self.ommers])
+
+
+@lru_cache(maxsize=1 << 16)
+def get_bloom_bits(item: bytes) -> int:
+    """
+    The three bloom bits of a log address or topic, as a 2048-bit integer.
+    Cached, since the same contracts and event signatures repeat across logs.
+    """
+    h = keccak_256(item)
+    return (
+        1 << ((h[0] << 8 | h[1]) & 2047)
+        | 1 << ((h[2] << 8 | h[3]) & 2047)
+        | 1 << ((h[4] << 8 | h[5]) & 2047)
+    )
+
+
+def parse_int(v: int | str) -> int:
+    if isinstance(v, int):
+        return v
+    if v.startswith("0x"):
+        return int(v, 16) if len(v) > 2 else 0
+    return int(v)
+
+
+class Receipt:
+    """
+    Receipt JSON parsed once. `outcome` is the post-state root of
+    pre-Byzantium receipts, or the status otherwise.
+    """
+
+    __slots__ = ("type", "outcome", "cumulative_gas_used", "logs", "_bloom")
+
+    type: int
+    outcome: bytes | int
+    cumulative_gas_used: int
+    # (address, topics, data)
+    logs: list[tuple[bytes, list[bytes], bytes]]
+    _bloom: int | None
+
+    @classmethod
+    def from_dict(cls, receipt: dict) -> "Receipt":
+        r = cls()
+        r.type = parse_int(receipt.get("type") or 0)
+        root = parse_hex(receipt.get("root") or "0x")
+        r.outcome = root if root else parse_int(receipt["status"])
+        r.cumulative_gas_used = parse_int(receipt["cumulativeGasUsed"])
+        r.logs = [
+            (
+                parse_hex(log["address"]),
+                [parse_hex(topic) for topic in log["topics"]],
+                parse_hex(log["data"]),
+            )
+            for log in receipt.get("logs") or []
+        ]
+        r._bloom = None
+        return r
+
+    def get_bloom(self) -> int:
+        if self._bloom is None:
+            bloom = 0
+            for address, topics, _ in self.logs:
+                bloom |= get_bloom_bits(address)
+                for topic in topics:
+                    bloom |= get_bloom_bits(topic)
+            self._bloom = bloom
+        return self._bloom
+
+    def encode(self) -> bytes:
+        encoded = rlp.encode(
+            [
+                self.outcome,
+                self.cumulative_gas_used,
+                self.get_bloom().to_bytes(256, "big"),
+                [list(log) for log in self.logs],
+            ]
+        )
+        if self.type:
+            return bytes([self.type]) + encoded
+        return encoded
+
+
+def load_receipts(path: str) -> list[Receipt]:
+    # A list of receipts, or an object with a `receipts` list as in t8n results
+    with open(path, "r") as f:
+        receipts = json.load(f)
+    if type(receipts) is dict:
+        receipts = receipts["receipts"]
+    return [Receipt.from_dict(receipt) for receipt in receipts]
+
+
+def get_receipts_root(receipts: list[Receipt]) -> bytes:
+    return ordered_trie_root([receipt.encode() for receipt in receipts])
+
+
+def get_logs_bloom(receipts: list[Receipt]) -> bytes:
+    bloom = 0
+    for receipt in receipts:
+        bloom |= receipt.get_bloom()
+    return bloom.to_bytes(256, "big")
+
+
+def verify_receipts(
+    block: Block, receipts_root: bytes, logs_bloom: bytes, gas_used: int | None
+) -> list[str]:
+    # Describes each header field that does not match the values computed from
+    # the receipts
+    failures = []
+    for name, value in (("receiptsRoot", receipts_root), ("logsBloom", logs_bloom)):
+        expected = block.header[HEADER_FIELD_NAMES.index(name)]
+        if value != expected:
+            failures.append(
+                f"{name}: {to_hex(value)} / {to_hex(expected)} (receipts / header)"
+            )
+    if gas_used is not None:
+        expected_gas_used = int.from_bytes(
+            block.header[HEADER_FIELD_NAMES.index("gasUsed")], "big"
+        )
+        if gas_used != expected_gas_used:
+            failures.append(
+                f"gasUsed: {gas_used} / {expected_gas_used} (receipts / header)"
+            )
+    return failures
+
+
+def verify_block(block: dict) -> dict:
+    result: dict = {}
+    for k in ("number", "blockNumber"):
+        if k in block:
+            result["number"] = block[k]
+            break
+    try:
+        parsed = Block.from_dict(block)
+        block_hash = parsed.get_hash()
+        result["hash"] = to_hex(block_hash)
+        if parsed.expected_hash is not None:
+            result["hash_ok"] = block_hash == parsed.expected_hash
+        if parsed.expected_rlp is not None and parsed.has_body():
+            result["rlp_ok"] = parsed.get_rlp() == parsed.expected_rlp
+    except Exception as ex:
+        result["error"] = str(ex)
+    result["ok"] = (
+        "error" not in result
+        and result.get("hash_ok", True)
+        and result.get("rlp_ok", True)
+    )
+    return result
+
+
+def iter_blocks(f: IO[str]) -> Iterator[dict]:
+    # Accepts a JSON array, JSONL, or any sequence of concatenated JSON objects.
+    # Anything but an array is decoded incrementally while reading.
+    text = f.read(READ_CHUNK_SIZE).lstrip()
+    if text.startswith("["):
+        yield from json.loads(text + f.read())
+        return
+    decoder = json.JSONDecoder()
+    pos = 0
+    eof = False
+    while True:
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+        if pos < len(text):
+            try:
+                block, pos = decoder.raw_decode(text, pos)
+                yield block
+                continue
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+        elif eof:
+            return
+        # Grow reads with the pending object, so a block spanning many chunks
+        # is not re-decoded once per chunk
+        chunk = f.read(max(READ_CHUNK_SIZE, len(text) - pos))
+        eof = not chunk
+        text = text[pos:] + chunk
+        pos = 0
+
+
+def generate_header(fork: str, i: int) -> dict:
+    """
+    Deterministic header for `fork`, with fields named as in fixtures on even
+    `i` and as in JSON-RPC responses on odd `i`.
+    """
+
+    def h(tag: int, size: int = 32) -> str:
+        return "0x" + ((i << 8) | tag).to_bytes(size, "big").hex()
+
+    rpc = i % 2 == 1
+    header = {
+        "parentHash": h(1),
+        "sha3Uncles" if rpc else "uncleHash": to_hex(EMPTY_OMMERS_HASH),
+        "miner" if rpc else "coinbase": h(2, 20),
+        "stateRoot": h(3),
+        "transactionsRoot" if rpc else "transactionsTrie": h(4),
+        "receiptsRoot" if rpc else "receiptTrie": h(5),
+        "logsBloom" if rpc else "bloom": h(6, 256),
+        "difficulty": "0x0",
+        "number": hex(i + 1),
+        "gasLimit": "0x1c9c380",
+        "gasUsed": hex(i * 21000 % 30_000_000),
+        "timestamp": hex(1_700_000_000 + i * 12),
+        "extraData": "0x" + bytes(i % 33).hex(),
+        "mixHash": h(7),
+        "nonce": to_hex(EMPTY_NONCE),
+    }
+    for field in HEADER_FORK_FIELDS[fork]:
+        if field in ("baseFeePerGas", "blobGasUsed", "excessBlobGas"):
+            header[field] = hex(7 + i)
+        else:
+            header[field] = h(8 + len(header))
+    return header
+
+
+def benchmark_header_encoding(count: int) -> None:
+    forks = list(HEADER_FORK_FIELDS)
+    pool = [
+        generate_header(forks[i % len(forks)], i)
+        for i in range(HEADER_BENCHMARK_POOL_SIZE)
+    ]
+    compile_header_layout.cache_clear()
+    start = time.perf_counter()
+    for i in range(count):
+        get_header_rlp(pool[i % len(pool)])
+    elapsed = time.perf_counter() - start
+    layouts = compile_header_layout.cache_info().currsize
+    print(
+        "Encoded {} headers ({} layouts) in {:.2f}s: {:.0f} headers/s".format(
+            count, layouts, elapsed, count / elapsed
+        )
+    )
+
+
+def benchmark_main(args: list[str]) -> None:
+    if len(args) > 1:
+        print_usage()
+        raise Exception("Incorrect number of arguments")
+    count = int(args[0]) if args else HEADER_BENCHMARK_COUNT
+    benchmark_header_encoding(count)
+
+
+def print_batch_usage():
+    print(
+        "Usage:\n{} --batch </path/to/blocks.jsonl|-> [--workers N] [--pprint]\n".format(
+            sys.argv[0]
+        )
+    )
+    print("{} --chain </path/to/blocks.jsonl|->\n".format(sys.argv[0]))
+    print("{} --rlp <block rlp hex|/path/to/block.rlp>\n".format(sys.argv[0]))
+    print(
+        "{} --corpus </path/to/fixtures> [--workers N] [--cache path|--no-cache] "
+        "[--report failures.jsonl]\n".format(sys.argv[0])
+    )
+    print(
+        "{} --rpc <url> <first block> <last block> [--full-transactions] "
+        "[--batch-size N] [--max-in-flight N]\n".format(sys.argv[0])
+    )
+    print("{} --benchmark-headers [count]\n".format(sys.argv[0]))
+
+
+def get_block_number(block: dict) -> int | None:
+    for k in ("number", "blockNumber"):
+        if k in block:
+            v = format_value_for_rlp(k, block[k])
+            return int.from_bytes(v, "big") if type(v) is bytes else int(v)
+    return None
+
+
+def verify_chain(blocks: Iterator[dict]) -> tuple[int, str | None]:
+    # Returns the number of linked blocks and a description of the first break
+    prev_hash: bytes | None = None
+    prev_number: int | None = None
+    count = 0
+    for i, block in enumerate(blocks):
+        try:
+            parsed = Block.from_dict(block)
+        except Exception as ex:
+            return count, f"block {i} (number {get_block_number(block)}): {ex}"
+        number = parsed.number
+        block_hash = parsed.get_hash()
+        context = (
+            f"block {i} (number {number}, hash {to_hex(block_hash)}), "
+            f"previous block number {prev_number}, hash "
+            f"{to_hex(prev_hash) if prev_hash is not None else None}"
+        )
+        expected_hash = parsed.expected_hash
+        if expected_hash is not None and block_hash != expected_hash:
+            return count, f"hash mismatch, expected {to_hex(expected_hash)}: {context}"
+        if prev_hash is not None:
+            if parsed.parent_hash != prev_hash:
+                return (
+                    count,
+                    f"parentHash {to_hex(parsed.parent_hash)} does not match: "
+                    + context,
+                )
+            if number is not None and prev_number is not None:
+                if number != prev_number + 1:
+                    return count, f"non-consecutive block number: {context}"
+        prev_hash = block_hash
+        prev_number = number
+        count += 1
+    return count, None
+
+
+def chain_main(args: list[str]) -> None:
+    if len(args) != 1:
+        print_batch_usage()
+        raise Exception("Incorrect number of arguments")
+    (path,) = args
+    if path == "-":
+        count, error = verify_chain(iter_blocks(sys.stdin))
+    else:
+        with open(path, "r") as f:
+            count, error = verify_chain(iter_blocks(f))
+    if error is not None:
+        print(f"Chain broken after {count} linked blocks: {error}")
+        sys.exit(1)
+    print(f"Chain ok: {count} linked blocks")
+
+
+def batch_main(args: list[str]) -> None:
+    workers = os.cpu_count() or 1
+    print_blocks = False
+    path = None
+    while args:
+        arg = args.pop(0)
+        if arg == "--workers" and args:
+            workers = int(args.pop(0))
+        elif arg == "--pprint":
+            print_blocks = True
+        elif path is None:
+            path = arg
+        else:
+            print_batch_usage()
+            raise Exception("Incorrect arguments")
+    if path is None:
+        print_batch_usage()
+        raise Exception("Incorrect number of arguments")
+
+    f = sys.stdin if path == "-" else open(path, "r")
+    verified = failed = 0
+    try:
+        for block, result in iter_chunk_results(
+            verify_block, iter_blocks(f), workers, BATCH_CHUNK_SIZE
+        ):
+            if print_blocks:
+                pprint(block)
+            if not result["ok"]:
+                failed += 1
+            print(json.dumps({"index": verified, **result}, separators=(",", ":")))
+            verified += 1
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+    print(f"Verified {verified} blocks: {verified - failed} ok, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+# Canonical names of the header fields, in RLP order
+HEADER_FIELD_NAMES = (
+    "parentHash",
+    "ommersHash",
+    "coinbase",
+    "stateRoot",
+    "transactionsRoot",
+    "receiptsRoot",
+    "logsBloom",
+    "difficulty",
+    "number",
+    "gasLimit",
+    "gasUsed",
+    "timestamp",
+    "extraData",
+    "mixHash",
+    "nonce",
+    "baseFeePerGas",
+    "withdrawalsRoot",
+    "blobGasUsed",
+    "excessBlobGas",
+    "parentBeaconBlockRoot",
+    "requestsHash",
+)
+
+BLOCK_BODY_NAMES = ("header", "transactions", "ommers", "withdrawals")
+
+
+def split_block_rlp(block_rlp: bytes) -> list[memoryview]:
+    # Slices of the header, transactions, ommers and (if present) withdrawals
+    buf = memoryview(block_rlp)
+    _, _, end = rlp_item_bounds(buf, 0)
+    if end != len(buf):
+        raise Exception("Invalid RLP: trailing bytes after block")
+    parts = [buf[start:end] for start, end in rlp_list_items(buf, 0)]
+    if len(parts) < 3 or len(parts) > len(BLOCK_BODY_NAMES):
+        raise Exception("Invalid block RLP: unexpected number of elements")
+    return parts
+
+
+def get_header_fields_from_rlp(header: memoryview) -> list[memoryview]:
+    # Full RLP encoding of each header field
+    return [header[start:end] for start, end in rlp_list_items(header, 0)]
+
+
+def get_block_hash_from_rlp(block_rlp: bytes) -> bytes:
+    header = split_block_rlp(block_rlp)[0]
+    return keccak_256(header)
+
+
+def diff_header_rlp(block: Block, header_rlp: memoryview) -> list[str]:
+    # Names the header fields that differ between the block JSON and the
+    # expected header RLP
+    rlp_fields = get_header_fields_from_rlp(header_rlp)
+    json_fields = [rlp.encode(v) for v in block.header]
+    diffs = []
+    if len(rlp_fields) != len(json_fields):
+        diffs.append(
+            f"header field count: {len(json_fields)} / {len(rlp_fields)} (json / rlp)"
+        )
+    for i, (json_field, rlp_field) in enumerate(zip(json_fields, rlp_fields)):
+        if json_field != rlp_field:
+            name = HEADER_FIELD_NAMES[i] if i < len(HEADER_FIELD_NAMES) else str(i)
+            diffs.append(
+                f"{name}: {to_hex(json_field)} / {to_hex(bytes(rlp_field))} "
+                "(json / rlp, rlp encoded)"
+            )
+    return diffs
+
+
+def diff_block_rlp(block: Block, block_rlp: bytes) -> list[str]:
+    # Names the header fields and body elements that differ between the
+    # block JSON and the expected block RLP
+    parts = split_block_rlp(block_rlp)
+    diffs = diff_header_rlp(block, parts[0])
+    if block.has_body():
+        json_parts = split_block_rlp(block.get_rlp())
+        for name, json_part, rlp_part in zip(
+            BLOCK_BODY_NAMES[1:], json_parts[1:], parts[1:]
+        ):
+            if json_part != rlp_part:
+                diffs.append(f"block {name} differ")
+        if len(json_parts) != len(parts):
+            diffs.append(
+                f"block element count: {len(json_parts)} / {len(parts)} (json / rlp)"
+            )
+    return diffs
+
+
+def print_rlp_block_info(block_rlp: bytes) -> None:
+    parts = split_block_rlp(block_rlp)
+    header = parts[0]
+    print("block hash = " + to_hex(keccak_256(header)))
+    print("header rlp = " + to_hex(bytes(header)))
+    for i, field in enumerate(get_header_fields_from_rlp(header)):
+        name = HEADER_FIELD_NAMES[i] if i < len(HEADER_FIELD_NAMES) else str(i)
+        _, start, end = rlp_item_bounds(field, 0)
+        print(f"    {name} = {to_hex(bytes(field[start:end]))}")
+    for name, part in zip(BLOCK_BODY_NAMES[1:], parts[1:]):
+        print(f"{name}: {len(rlp_list_items(part, 0))} items, {len(part)} bytes")
+
+
+def decode_hex_text(text: bytes) -> bytes | None:
+    # Bytes of ASCII hex `text`, with or without 0x, or None if it is not hex
+    text = text.strip()
+    if text[:2] in (b"0x", b"0X"):
+        text = text[2:]
+    try:
+        return bytes.fromhex(text.decode("ascii"))
+    except ValueError:
+        return None
+
+
+def rlp_main(args: list[str]) -> None:
+    if len(args) != 1:
+        print_batch_usage()
+        raise Exception("Incorrect number of arguments")
+    (source,) = args
+    if os.path.isfile(source):
+        with open(source, "rb") as f:
+            data = f.read()
+        # Files hold the RLP either as hex text or as raw bytes
+        block_rlp = decode_hex_text(data)
+        if block_rlp is None:
+            block_rlp = data
+    else:
+        block_rlp = decode_hex_text(source.encode())
+        if block_rlp is None:
+            raise Exception("Neither a file nor hex: " + source)
+    print_rlp_block_info(block_rlp)
+
+
+@lru_cache(maxsize=None)
+def get_tool_version() -> str:
+    # Cached corpus results are dropped whenever a module verifying them changes
+    digest = sha256()
+    for name in CORPUS_MODULES:
+        with open(os.path.join(os.path.dirname(__file__), name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def iter_fixture_blocks(
+    fixture: dict,
+) -> Iterator[tuple[str, str, dict | None, str | None]]:
+    # Yields (test name, block index, header, block rlp) for the genesis and
+    # every block of each blockchain test in the fixture
+    for name, test in fixture.items():
+        if type(test) is not dict:
+            continue
+        if "genesisBlockHeader" in test:
+            yield name, "genesis", test["genesisBlockHeader"], test.get("genesisRLP")
+        for i, block in enumerate(test.get("blocks", [])):
+            yield name, str(i), block.get("blockHeader"), block.get("rlp")
+
+
+def verify_fixture_block(header: dict, block_rlp: str | None) -> list[str]:
+    parsed = Block.from_dict(header)
+    block_hash = parsed.get_hash()
+    failures = []
+    if parsed.expected_hash is not None and block_hash != parsed.expected_hash:
+        failures.append(
+            f"hash: {to_hex(block_hash)} / {to_hex(parsed.expected_hash)} "
+            "(json / fixture)"
+        )
+    if block_rlp is not None:
+        header_rlp = split_block_rlp(parse_hex(block_rlp))[0]
+        if keccak_256(header_rlp) != block_hash:
+            failures += diff_header_rlp(parsed, header_rlp) or ["header rlp differs"]
+    return failures
+
+
+def scan_fixture_file(path: str, cached_digest: str | None) -> tuple[str, dict | None]:
+    """
+    Verifies every block header of a fixture file against its hash and rlp.
+    Returns the file's content hash, and None instead of the result when it
+    is still `cached_digest`.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = sha256(data).hexdigest()
+    if digest == cached_digest:
+        return digest, None
+
+    result: dict = {"blocks": 0, "skipped": 0, "failures": []}
+    try:
+        fixture = json.loads(data)
+        if type(fixture) is not dict:
+            raise Exception("not a JSON object")
+    except Exception as ex:
+        result["failures"].append({"error": f"invalid fixture: {ex}"})
+        return digest, result
+    for test, index, header, block_rlp in iter_fixture_blocks(fixture):
+        if header is None:
+            # Invalid blocks only carry their rlp
+            result["skipped"] += 1
+            continue
+        result["blocks"] += 1
+        try:
+            failures = verify_fixture_block(header, block_rlp)
+        except Exception as ex:
+            failures = [str(ex)]
+        if failures:
+            result["failures"].append(
+                {
+                    "test": test,
+                    "block": index,
+                    "number": header.get("number"),
+                    "failures": failures,
+                }
+            )
+    return digest, result
+
+
+def get_fixture_paths(root: str) -> list[str]:
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(".json") and filename != CORPUS_CACHE_NAME:
+                paths.append(os.path.join(dirpath, filename))
+    return paths
+
+
+def load_corpus_cache(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        cache = json.load(f)
+    if cache.get("version") != get_tool_version():
+        return {}
+    return cache["files"]
+
+
+def save_corpus_cache(path: str, files: dict) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": get_tool_version(), "files": files}, f)
+    os.replace(tmp_path, path)
+
+
+def corpus_main(args: list[str]) -> None:
+    workers = os.cpu_count() or 1
+    cache_path = None
+    use_cache = True
+    report_path = None
+    root = None
+    while args:
+        arg = args.pop(0)
+        if arg == "--workers" and args:
+            workers = int(args.pop(0))
+        elif arg == "--cache" and args:
+            cache_path = args.pop(0)
+        elif arg == "--no-cache":
+            use_cache = False
+        elif arg == "--report" and args:
+            report_path = args.pop(0)
+        elif root is None:
+            root = arg
+        else:
+            print_batch_usage()
+            raise Exception("Incorrect arguments")
+    if root is None:
+        print_batch_usage()
+        raise Exception("Incorrect number of arguments")
+    if cache_path is None:
+        cache_path = os.path.join(root, CORPUS_CACHE_NAME)
+
+    paths = get_fixture_paths(root)
+    names = [os.path.relpath(path, root) for path in paths]
+    cached = load_corpus_cache(cache_path) if use_cache else {}
+    digests = [cached.get(name, {}).get("sha256") for name in names]
+    if workers > 1 and len(paths) > 1:
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(scan_fixture_file, paths, digests, chunksize=chunksize)
+            )
+    else:
+        results = [scan_fixture_file(p, d) for p, d in zip(paths, digests)]
+
+    files = {}
+    cache_hits = blocks = skipped = failed = 0
+    report = open(report_path, "w") if report_path else sys.stdout
+    try:
+        for name, (digest, result) in zip(names, results):
+            if result is None:
+                result = cached[name]["result"]
+                cache_hits += 1
+            files[name] = {"sha256": digest, "result": result}
+            blocks += result["blocks"]
+            skipped += result["skipped"]
+            failed += len(result["failures"])
+            for failure in result["failures"]:
+                report.write(
+                    json.dumps({"file": name, **failure}, separators=(",", ":")) + "\n"
+                )
+    finally:
+        if report_path:
+            report.close()
+    if use_cache:
+        save_corpus_cache(cache_path, files)
+
+    print(
+        f"Scanned {len(paths)} files ({cache_hits} cached): {blocks} blocks, "
+        f"{failed} failed, {skipped} skipped"
+    )
+    if failed:
+        sys.exit(1)
+
+
+def verify_rpc_block(block: dict, full_transactions: bool) -> dict:
+    """
+    Checks an `eth_getBlockByNumber` result: the hash against the header
+    fields, the withdrawals root, and with full transactions the hash of each
+    transaction and the transactions root.
+    """
+    result: dict = {"number": block.get("number")}
+    try:
+        result["number"] = parse_int(block["number"])
+        header = {
+            k: v
+            for k, v in block.items()
+            if k not in ("transactions", "withdrawals", "uncles")
+        }
+        block_hash = Block.from_dict(header).get_hash()
+        result["hash"] = to_hex(block_hash)
+        result["hash_ok"] = block_hash == parse_hex(block["hash"])
+        if full_transactions:
+            from eth_tools.get_tx_info import encode_tx
+
+            txs = [encode_tx(tx) for tx in block["transactions"]]
+            result["tx_hashes_ok"] = all(
+                keccak_256(raw) == parse_hex(tx["hash"])
+                for raw, tx in zip(txs, block["transactions"])
+            )
+            result["transactions_root_ok"] = ordered_trie_root(txs) == parse_hex(
+                block["transactionsRoot"]
+            )
+        if "withdrawals" in block:
+            withdrawals_root = format_value_for_rlp("withdrawals", block["withdrawals"])
+            result["withdrawals_root_ok"] = withdrawals_root == parse_hex(
+                block["withdrawalsRoot"]
+            )
+    except Exception as ex:
+        result["error"] = str(ex)
+    result["ok"] = "error" not in result and all(
+        v for k, v in result.items() if k.endswith("_ok")
+    )
+    return result
+
+
+async def fetch_and_verify_blocks(
+    url: str,
+    first: int,
+    last: int,
+    full_transactions: bool,
+    batch_size: int,
+    max_in_flight: int,
+) -> tuple[int, int, dict[int, tuple[bytes, bytes]]]:
+    """
+    Fetches blocks `first` to `last` in batches, verifying and printing each
+    batch as it arrives, so results are printed in completion order. Returns
+    the verified and failed counts, and the hash and parent hash of each
+    fetched block.
+    """
+    import asyncio
+
+    from eth_tools.rpc import RpcClient
+
+    client = RpcClient(url, max_in_flight)
+    batch_starts = iter(range(first, last + 1, batch_size))
+    links: dict[int, tuple[bytes, bytes]] = {}
+    counts = [0, 0]
+
+    async def worker() -> None:
+        # Workers share `batch_starts`, so each batch is fetched once
+        for start in batch_starts:
+            numbers = range(start, min(start + batch_size, last + 1))
+            calls = [
+                ("eth_getBlockByNumber", [hex(n), full_transactions]) for n in numbers
+            ]
+            try:
+                blocks = await client.batch(calls)
+            except Exception as ex:
+                blocks = [ex] * len(numbers)
+            for n, block in zip(numbers, blocks):
+                result: dict
+                if isinstance(block, Exception):
+                    result = {"number": n, "error": f"RPC error: {block}"}
+                elif block is None:
+                    result = {"number": n, "error": "block not found"}
+                else:
+                    result = verify_rpc_block(block, full_transactions)
+                    if "hash" in result:
+                        links[n] = (
+                            parse_hex(result["hash"]),
+                            parse_hex(block["parentHash"]),
+                        )
+                result["ok"] = result.get("ok", False)
+                counts[0 if result["ok"] else 1] += 1
+                print(json.dumps(result, separators=(",", ":")))
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max_in_flight)))
+    finally:
+        await client.close()
+    return counts[0], counts[1], links
+
+
+def rpc_main(args: list[str]) -> None:
+    import asyncio
+
+    from eth_tools.rpc import DEFAULT_BATCH_SIZE, DEFAULT_MAX_IN_FLIGHT
+
+    full_transactions = False
+    batch_size = DEFAULT_BATCH_SIZE
+    max_in_flight = DEFAULT_MAX_IN_FLIGHT
+    positional = []
+    while args:
+        arg = args.pop(0)
+        if arg == "--full-transactions":
+            full_transactions = True
+        elif arg == "--batch-size" and args:
+            batch_size = int(args.pop(0))
+        elif arg == "--max-in-flight" and args:
+            max_in_flight = int(args.pop(0))
+        else:
+            positional.append(arg)
+    if len(positional) != 3:
+        print_batch_usage()
+        raise Exception("Incorrect number of arguments")
+    url = positional[0]
+    first, last = (parse_int(n) for n in positional[1:])
+
+    start_time = time.perf_counter()
+    ok, failed, links = asyncio.run(
+        fetch_and_verify_blocks(
+            url, first, last, full_transactions, batch_size, max_in_flight
+        )
+    )
+    elapsed = time.perf_counter() - start_time
+
+    # Blocks arrive out of order, so the chain is only linked once all are in
+    breaks = 0
+    for n in range(first + 1, last + 1):
+        if n in links and n - 1 in links and links[n][1] != links[n - 1][0]:
+            breaks += 1
+            print(
+                json.dumps(
+                    {
+                        "number": n,
+                        "error": f"parentHash {to_hex(links[n][1])} does not "
+                        f"match the hash of block {n - 1}",
+                        "ok": False,
+                    },
+                    separators=(",", ":"),
+                )
+            )
+
+    print(
+        f"Verified {ok + failed} blocks in {elapsed:.2f}s: {ok} ok, {failed} failed, "
+        f"{breaks} chain break(s)"
+    )
+    if failed or breaks:
+        sys.exit(1)
 
 
 def print_usage():
@@ -238,40 +1238,61 @@ def print_usage():
         "blockHash": "{EXAMPLE_BLOCK_HASH}"
     }}
     """
-    print("Usage:\n{} /path/to/block.json\n".format(sys.argv[0]))
+    print(
+        "Usage:\n{} /path/to/block.json [--receipts /path/to/receipts.json]\n".format(
+            sys.argv[0]
+        )
+    )
+    print_batch_usage()
     print("Json file format example:\n{}".format(FORMAT_EXAMPLE))
 
 
 def main() -> None:
-    if len(sys.argv) != 2:
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        batch_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--chain":
+        chain_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--rlp":
+        rlp_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--corpus":
+        corpus_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--rpc":
+        rpc_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark-headers":
+        benchmark_main(sys.argv[2:])
+        return
+
+    receipts_path = None
+    if len(sys.argv) == 4 and sys.argv[2] == "--receipts":
+        receipts_path = sys.argv[3]
+    elif len(sys.argv) != 2:
         print_usage()
         raise Exception("Incorrect number of arguments")
 
-    (_, block_json_path) = sys.argv
+    block_json_path = sys.argv[1]
 
     block = None
     with open(block_json_path, "r") as f:
         block = json.load(f)
 
     pprint(block)
-    block_hash = get_block_hash(block)
-    print("header rlp = " + to_hex(get_header_rlp(block)))
-    if can_get_block_rlp(block):
-        print("block rlp = " + to_hex(get_block_rlp(block)))
+    parsed = Block.from_dict(block)
+    block_hash = parsed.get_hash()
+    print("header rlp = " + to_hex(parsed.get_header_rlp()))
+    block_rlp = None
+    if parsed.has_body():
+        block_rlp = parsed.get_rlp()
+        print("block rlp = " + to_hex(block_rlp))
     print("block hash = " + to_hex(block_hash))
-    expected_hash = None
-
-    if "blockHash" in block:
-        expected_hash = block["blockHash"]
-    elif "hash" in block:
-        expected_hash = block["hash"]
+    expected_hash = parsed.expected_hash
 
     if expected_hash is not None:
-        if type(expected_hash) == str and expected_hash.startswith("0x"):
-            # Convert to bytes
-            expected_hash = bytes.fromhex(expected_hash[2:])
-
-        if not bytes_equal(block_hash, expected_hash):
+        if block_hash != expected_hash:
             print(
                 f"""
                 Fail: Block hash is different than expected
@@ -279,21 +1300,43 @@ def main() -> None:
             )
         else:
             print("Block hash is ok")
-    if "rlp" in block and can_get_block_rlp(block):
-        block_rlp = get_block_rlp(block)
-        expected_rlp: str = block["rlp"]
-        if expected_rlp.startswith("0x"):
-            expected_rlp = expected_rlp[2:]
-        if not bytes_equal(block_rlp, expected_rlp):
+    expected_rlp = parsed.expected_rlp
+    if expected_rlp is not None:
+        if block_rlp is None:
+            # Only the header can be compared
+            if get_block_hash_from_rlp(expected_rlp) != block_hash:
+                print("Fail: Block RLP header is different than expected")
+                for diff in diff_block_rlp(parsed, expected_rlp):
+                    print("    " + diff)
+            else:
+                print("Block RLP header is ok")
+        elif block_rlp != expected_rlp:
             print(
                 f"""
                 Fail: Block RLP is different than expected
                 {to_hex(block_rlp)} / {to_hex(expected_rlp)}
                 """
             )
+            for diff in diff_block_rlp(parsed, expected_rlp):
+                print("    " + diff)
         else:
             print("Block RLP is ok")
 
+    if receipts_path is not None:
+        receipts = load_receipts(receipts_path)
+        receipts_root = get_receipts_root(receipts)
+        logs_bloom = get_logs_bloom(receipts)
+        print("receipts root = " + to_hex(receipts_root))
+        print("logs bloom = " + to_hex(logs_bloom))
+        gas_used = receipts[-1].cumulative_gas_used if receipts else None
+        failures = verify_receipts(parsed, receipts_root, logs_bloom, gas_used)
+        if failures:
+            print("Fail: Receipts do not match the header")
+            for failure in failures:
+                print("    " + failure)
+        else:
+            print("Receipts are ok")
+
 
 if __name__ == "__main__":
     main()
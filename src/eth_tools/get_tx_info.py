@@ -1,17 +1,368 @@
 #!/usr/bin/env python
 import json
+import os
 import sys
+import time
+from functools import partial
 from pprint import pprint
-from typing import Tuple
+from typing import IO, Iterator
 
 import rlp
-from Crypto.Hash import keccak
 from eth_keys.backends.native.ecdsa import ecdsa_raw_recover, ecdsa_raw_sign
 from eth_keys.datatypes import PublicKey
 
+from eth_tools.keccak import keccak_256, new_keccak_256
+from eth_tools.parallel import iter_chunk_results
+from eth_tools.rlp_codec import (
+    RlpItem,
+    decode_rlp_list,
+    rlp_item_bounds,
+    rlp_length_prefix,
+)
 
-def keccak_256(data: bytes) -> bytes:
-    return keccak.new(digest_bits=256, data=data).digest()
+LEGACY_TX_FIELDS = ("nonce", "gasPrice", "gasLimit", "to", "value", "data")
+
+TYPED_TX_FIELDS = {
+    1: (
+        "chainId",
+        "nonce",
+        "gasPrice",
+        "gasLimit",
+        "to",
+        "value",
+        "data",
+        "accessList",
+    ),
+    2: (
+        "chainId",
+        "nonce",
+        "maxPriorityFeePerGas",
+        "maxFeePerGas",
+        "gasLimit",
+        "to",
+        "value",
+        "data",
+        "accessList",
+    ),
+    3: (
+        "chainId",
+        "nonce",
+        "maxPriorityFeePerGas",
+        "maxFeePerGas",
+        "gasLimit",
+        "to",
+        "value",
+        "data",
+        "accessList",
+        "maxFeePerBlobGas",
+        "blobVersionedHashes",
+    ),
+}
+
+# Txs signed per worker task by `--generate`
+GENERATE_CHUNK_SIZE = 256
+
+# Names JSON-RPC uses for tx fields that are named differently above
+TX_FIELD_ALIASES = {"gasLimit": "gas", "data": "input"}
+
+
+def rlp_int(item: RlpItem) -> int:
+    if type(item) is not memoryview:
+        raise Exception("Invalid RLP: expected a byte string")
+    return int.from_bytes(item, "big")
+
+
+def format_rlp_field(k: str, item: RlpItem) -> str | list | None:
+    if isinstance(item, list):
+        if k == "accessList":
+            return [
+                {
+                    "address": "0x" + address.hex(),
+                    "storageKeys": ["0x" + key.hex() for key in keys],
+                }
+                for address, keys in item
+            ]
+        if k == "blobVersionedHashes":
+            return ["0x" + h.hex() for h in item]
+        raise Exception("Invalid RLP: expected a byte string for " + k)
+    if k in ("accessList", "blobVersionedHashes"):
+        raise Exception("Invalid RLP: expected a list for " + k)
+    if k == "to":
+        return "0x" + bytes(item).hex() if len(item) else None
+    if k == "data":
+        return "0x" + item.hex()
+    return hex(rlp_int(item))
+
+
+def decode_raw_tx(raw: bytes | memoryview, recover_sender: bool = True) -> dict:
+    buf = memoryview(raw)
+    if len(buf) == 0:
+        raise Exception("Invalid tx: empty")
+
+    signing_hash = new_keccak_256()
+    tx_hash = new_keccak_256()
+    if buf[0] >= 0xC0:
+        tx_type = 0
+        items, offsets = decode_rlp_list(buf)
+        if len(items) != 9:
+            raise Exception("Invalid legacy tx: expected 9 fields")
+        fields: tuple[str, ...] = LEGACY_TX_FIELDS
+        v = rlp_int(items[6])
+        payload = buf[offsets[0] : offsets[6]]
+        if v in (27, 28):
+            signing_hash.update(rlp_length_prefix(len(payload), 0xC0))
+            signing_hash.update(payload)
+            y_parity = v - 27
+        else:
+            # EIP-155
+            chain_id = (v - 35) // 2
+            y_parity = v - chain_id * 2 - 35
+            suffix = rlp.encode([chain_id, 0, 0])[1:]
+            signing_hash.update(rlp_length_prefix(len(payload) + len(suffix), 0xC0))
+            signing_hash.update(payload)
+            signing_hash.update(suffix)
+    else:
+        tx_type = buf[0]
+        if tx_type not in TYPED_TX_FIELDS:
+            raise Exception("Unsupported tx type: {}".format(tx_type))
+        envelope = buf[1:]
+        items, offsets = decode_rlp_list(envelope)
+        if tx_type == 3 and items and type(items[0]) is list:
+            # Network wrapper: [tx_payload_body, blobs, commitments, proofs]
+            start = offsets[0]
+            _, _, end = rlp_item_bounds(envelope, start)
+            envelope = envelope[start:end]
+            items, offsets = decode_rlp_list(envelope)
+            # The tx hash only covers the type and the payload body
+            buf = envelope
+            tx_hash.update(bytes([tx_type]))
+        fields = TYPED_TX_FIELDS[tx_type]
+        if len(items) != len(fields) + 3:
+            raise Exception(
+                "Invalid type {} tx: expected {} fields".format(
+                    tx_type, len(fields) + 3
+                )
+            )
+        v = y_parity = rlp_int(items[len(fields)])
+        payload = envelope[offsets[0] : offsets[len(fields)]]
+        signing_hash.update(bytes([tx_type]) + rlp_length_prefix(len(payload), 0xC0))
+        signing_hash.update(payload)
+
+    r = rlp_int(items[-2])
+    s = rlp_int(items[-1])
+    tx: dict = {"type": hex(tx_type)}
+    for k, item in zip(fields, items):
+        tx[k] = format_rlp_field(k, item)
+    tx["v"] = hex(v)
+    tx["r"] = hex(r)
+    tx["s"] = hex(s)
+    msg_hash = signing_hash.digest()
+    tx["signingHash"] = "0x" + msg_hash.hex()
+    tx_hash.update(buf)
+    tx["hash"] = "0x" + tx_hash.digest().hex()
+    if recover_sender:
+        pk = PublicKey(ecdsa_raw_recover(msg_hash, (y_parity, r, s)))
+        tx["sender"] = "0x" + pk.to_canonical_address().hex()
+    return tx
+
+
+def get_tx_field(tx: dict, k: str):
+    if k in tx:
+        return tx[k]
+    if k in TX_FIELD_ALIASES and TX_FIELD_ALIASES[k] in tx:
+        return tx[TX_FIELD_ALIASES[k]]
+    raise Exception("malformed tx: missing " + k)
+
+
+def encode_tx_field(k: str, v) -> bytes | int | list:
+    if k == "to":
+        return format_value_for_rlp(v) if v else b""
+    if k == "data":
+        return format_value_for_rlp(v)
+    if k == "accessList":
+        return [
+            [
+                format_value_for_rlp(entry["address"]),
+                [format_value_for_rlp(key) for key in entry["storageKeys"]],
+            ]
+            for entry in v
+        ]
+    if k == "blobVersionedHashes":
+        return [format_value_for_rlp(h) for h in v]
+    return format_int(v)
+
+
+def get_tx_fields(tx_type: int) -> tuple[str, ...]:
+    if tx_type == 0:
+        return LEGACY_TX_FIELDS
+    if tx_type in TYPED_TX_FIELDS:
+        return TYPED_TX_FIELDS[tx_type]
+    raise Exception("Unsupported tx type: {}".format(tx_type))
+
+
+def encode_unsigned_tx(tx: dict) -> tuple[int, list]:
+    # Type and RLP items of a tx given as JSON, without its signature
+    tx_type = format_int(tx.get("type") or 0)
+    fields = get_tx_fields(tx_type)
+    return tx_type, [encode_tx_field(k, get_tx_field(tx, k)) for k in fields]
+
+
+def encode_signed_tx(tx_type: int, items: list, v: int, r: int, s: int) -> bytes:
+    if tx_type == 0:
+        return rlp.encode(items + [v, r, s])
+    return bytes([tx_type]) + rlp.encode(items + [v, r, s])
+
+
+def get_signing_hash(tx_type: int, items: list, chain_id: int | None) -> bytes:
+    # Legacy txs with a chain id are signed as in EIP-155
+    if tx_type != 0:
+        return keccak_256(bytes([tx_type]) + rlp.encode(items))
+    if chain_id is None:
+        return keccak_256(rlp.encode(items))
+    return keccak_256(rlp.encode(items + [chain_id, 0, 0]))
+
+
+def sign_tx(tx_type: int, items: list, chain_id: int | None, sk: bytes) -> bytes:
+    # Raw encoding of the unsigned tx `items` signed with `sk`
+    v, r, s = ecdsa_raw_sign(get_signing_hash(tx_type, items, chain_id), sk)
+    if tx_type == 0:
+        v += 27 if chain_id is None else chain_id * 2 + 35
+    return encode_signed_tx(tx_type, items, v, r, s)
+
+
+def encode_tx(tx: dict) -> bytes:
+    """
+    Raw encoding of a signed tx given as JSON, either as decoded by
+    `decode_raw_tx` or as returned by JSON-RPC.
+    """
+    tx_type, items = encode_unsigned_tx(tx)
+    v = format_int(tx["yParity"] if tx_type and "yParity" in tx else tx["v"])
+    return encode_signed_tx(tx_type, items, v, format_int(tx["r"]), format_int(tx["s"]))
+
+
+def format_value_for_rlp(v):
+    if type(v) is list:
+        v = v[0]
+    if type(v) is str:
+        if v.startswith("0x"):
+            v = v[2:]
+            if (len(v) % 2) != 0:
+                v = "0" + v
+            v = bytes.fromhex(v)
+    return v
+
+
+def format_int(v) -> int:
+    v = format_value_for_rlp(v)
+    if type(v) is bytes:
+        return int.from_bytes(v, "big")
+    return int(v)
+
+
+def sign_generated_tx(
+    tx_type: int,
+    items: list,
+    chain_id: int | None,
+    sk: bytes,
+    vary: tuple[str, ...],
+    index: int,
+) -> tuple[bytes, bytes]:
+    # Returns (tx hash, raw tx rlp) of the template tx `index`, where varied
+    # fields hold their value for index 0
+    fields = get_tx_fields(tx_type)
+    tx_items = list(items)
+    for k in vary:
+        pos = fields.index(k)
+        tx_items[pos] += index
+        if k == "to":
+            tx_items[pos] = tx_items[pos].to_bytes(20, "big")
+    raw = sign_tx(tx_type, tx_items, chain_id, sk)
+    return keccak_256(raw), raw
+
+
+def generate_main(args: list[str]) -> None:
+    count = 1
+    vary: tuple[str, ...] = ("nonce",)
+    fmt = "jsonl"
+    output_path = None
+    workers = os.cpu_count() or 1
+    template_path = None
+    while args:
+        arg = args.pop(0)
+        if arg.startswith("--") and not args:
+            print_usage()
+            raise Exception("Incorrect arguments")
+        if arg == "--count":
+            count = int(args.pop(0))
+        elif arg == "--vary":
+            vary = tuple(args.pop(0).split(","))
+        elif arg == "--format":
+            fmt = args.pop(0)
+        elif arg == "--output":
+            output_path = args.pop(0)
+        elif arg == "--workers":
+            workers = int(args.pop(0))
+        elif template_path is None:
+            template_path = arg
+        else:
+            print_usage()
+            raise Exception("Incorrect arguments")
+    if template_path is None or fmt not in ("jsonl", "bin"):
+        print_usage()
+        raise Exception("Incorrect arguments")
+    for k in vary:
+        if k not in ("nonce", "to", "value"):
+            raise Exception("Cannot vary field: " + k)
+
+    with open(template_path, "r") as f:
+        template = json.load(f)
+    if "secretKey" not in template:
+        raise Exception("Template has no secretKey")
+    sk = format_value_for_rlp(template["secretKey"])
+    tx_type, items = encode_unsigned_tx(template)
+    chain_id = format_int(template["chainId"]) if "chainId" in template else None
+    fields = get_tx_fields(tx_type)
+    for k in vary:
+        if k == "to":
+            if not items[fields.index(k)]:
+                raise Exception("Cannot vary the recipient of a create tx")
+            items[fields.index(k)] = int.from_bytes(items[fields.index(k)], "big")
+
+    sign = partial(sign_generated_tx, tx_type, items, chain_id, sk, vary)
+    out = open(output_path, "wb") if output_path else sys.stdout.buffer
+    start_time = time.perf_counter()
+    try:
+        for i, (tx_hash, raw) in iter_chunk_results(
+            sign, range(count), workers, GENERATE_CHUNK_SIZE
+        ):
+            if fmt == "bin":
+                # Records: tx hash (32) + rlp length (4) + raw tx rlp
+                out.write(tx_hash + len(raw).to_bytes(4, "big") + raw)
+            else:
+                record = {
+                    "index": i,
+                    "hash": "0x" + tx_hash.hex(),
+                    "rlp": "0x" + raw.hex(),
+                }
+                out.write((json.dumps(record) + "\n").encode())
+    finally:
+        if output_path:
+            out.close()
+    elapsed = time.perf_counter() - start_time
+    print(
+        f"Signed {count} txs in {elapsed:.2f}s ({count / elapsed:.0f} txs/s)",
+        file=sys.stderr,
+    )
+
+
+def iter_raw_txs(f: IO[str]) -> Iterator[bytes]:
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("0x"):
+            line = line[2:]
+        yield bytes.fromhex(line)
 
 
 format_example = """
@@ -31,129 +382,63 @@ format_example = """
 
 def print_usage():
     print("Usage:\n{} /path/to/tx.json\n".format(sys.argv[0]))
+    print("{} <raw tx hex>\n".format(sys.argv[0]))
+    print("{} --raw-file </path/to/raw_txs.txt|->\n".format(sys.argv[0]))
+    print(
+        "{} --generate /path/to/template.json [--count N] [--vary nonce,to,value] "
+        "[--format jsonl|bin] [--output /path/to/output] [--workers N]\n".format(
+            sys.argv[0]
+        )
+    )
     print("Json file format example:\n{}".format(format_example))
 
 
 def main() -> None:
+    if len(sys.argv) == 3 and sys.argv[1] == "--raw-file":
+        path = sys.argv[2]
+        f = sys.stdin if path == "-" else open(path, "r")
+        try:
+            for raw in iter_raw_txs(f):
+                print(json.dumps(decode_raw_tx(raw)))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--generate":
+        generate_main(sys.argv[2:])
+        return
+
     if len(sys.argv) != 2:
         print_usage()
         raise Exception("Incorrect number of arguments")
 
-    def format_value_for_rlp(v):
-        if type(v) is list:
-            v = v[0]
-        if type(v) is str:
-            if v.startswith("0x"):
-                v = v[2:]
-                if (len(v) % 2) != 0:
-                    v = "0" + v
-                v = bytes.fromhex(v)
-        return v
-
-    def get_msg_rlp(tx: dict) -> bytes:
-        rlp_array = []
-
-        for k in ("nonce", "gasPrice", "gasLimit", "to", "value", "data"):
-            if k not in tx:
-                raise Exception("malformed tx")
-            rlp_array.append(format_value_for_rlp(tx[k]))
-
-        if "chainId" in tx:
-            rlp_array.append(format_value_for_rlp(tx["chainId"]))
-            rlp_array.append(0)
-            rlp_array.append(0)
-        return rlp.encode(rlp_array)
-
-    def get_msg_hash(tx: dict) -> bytes:
-        rlp = get_msg_rlp(tx)
-        return keccak_256(rlp)
-
-    def get_secret_key_bytes(sk: str) -> bytes:
-        return format_value_for_rlp(sk)
-
-    def get_vsr_from_tx_with_secret_key(tx: dict) -> Tuple[str, str, str]:
-        msg_hash = get_msg_hash(tx)
-        v, r, s = ecdsa_raw_sign(msg_hash, get_secret_key_bytes(tx["secretKey"]))
-        return v, hex(r), hex(s)
-
-    def get_tx_rlp(tx: dict) -> bytes:
-        rlp_array = []
-        if "secretKey" in tx:
-            v, r, s = get_vsr_from_tx_with_secret_key(tx)
-            if "chainId" in tx:
-                tx["v"] = v + tx["chainId"] * 2 + 35
-            else:
-                tx["v"] = v + 27
-            tx["r"] = r
-            tx["s"] = s
-        if "v" in tx and "r" in tx and "s" in tx:
-            for k in (
-                "nonce",
-                "gasPrice",
-                "gasLimit",
-                "to",
-                "value",
-                "data",
-                "v",
-                "r",
-                "s",
-            ):
-                if k not in tx:
-                    raise Exception("malformed tx")
-                rlp_array.append(format_value_for_rlp(tx[k]))
-        else:
-            raise Exception("Unsupported tx type")
-
-        return rlp.encode(rlp_array)
-
-    def get_rlp_hash(rlp: bytes) -> bytes:
-        return keccak_256(rlp)
-
-    def get_tx_hash(tx: dict) -> bytes:
-        rlp = get_tx_rlp(tx)
-        print(rlp.hex())
-        return keccak_256(rlp)
-
-    def get_vrs(tx: dict) -> tuple[int, int, int]:
-        vrs = []
-        for k in ("v", "r", "s"):
-            if k not in tx:
-                raise Exception("tx has no signature")
-            val = tx[k]
-            if type(val) is str:
-                if val.startswith("0x"):
-                    val = int(val, 16)
-                else:
-                    val = int(val)
-            if k == "v":
-                if "chainId" in tx:
-                    val -= tx["chainId"] * 2 + 35
-                else:
-                    val -= 27
-            vrs.append(val)
-        return tuple(vrs)
-
-    def get_sender(tx: dict) -> bytes:
-        vrs = get_vrs(tx)
-        pk = PublicKey(ecdsa_raw_recover(get_msg_hash(tx), vrs))
-        return pk.to_canonical_address()
-
-    def get_raw_txn_rlp(tx: dict) -> bytes:
-        pass
-
     (_, tx_json_path) = sys.argv
 
     if tx_json_path[:2] == "0x":
         rlp_hex = tx_json_path
         rlp_bytes = bytes.fromhex(rlp_hex[2:])
-        print("tx hash = " + get_rlp_hash(rlp_bytes).hex())
+        decoded = decode_raw_tx(rlp_bytes)
+        pprint(decoded)
+        print("msg hash = " + decoded["signingHash"][2:])
+        print("tx hash = " + decoded["hash"][2:])
+        print("sender = " + decoded["sender"])
     else:
-        tx = None
         with open(tx_json_path, "r") as f:
             tx = json.load(f)
 
         pprint(tx)
-        print("msg hash = " + get_msg_hash(tx).hex())
-        print("tx hash = " + get_tx_hash(tx).hex())
-        print("sender = 0x" + get_sender(tx).hex())
-        print("raw tx rlp = 0x" + get_tx_rlp(tx).hex())
+        tx_type, items = encode_unsigned_tx(tx)
+        chain_id = format_int(tx["chainId"]) if "chainId" in tx else None
+        print("msg hash = " + get_signing_hash(tx_type, items, chain_id).hex())
+        if "secretKey" in tx:
+            # Signed once, the hash and sender are read back from the raw tx
+            sk = format_value_for_rlp(tx["secretKey"])
+            tx_rlp = sign_tx(tx_type, items, chain_id, sk)
+        else:
+            tx_rlp = encode_tx(tx)
+        decoded = decode_raw_tx(tx_rlp)
+        print(tx_rlp.hex())
+        print("tx hash = " + decoded["hash"][2:])
+        print("sender = " + decoded["sender"])
+        print("raw tx rlp = 0x" + tx_rlp.hex())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+import os
+import sys
+import time
+from typing import Callable, Iterable, Protocol
+
+# Backends in order of preference, fastest first
+BACKENDS = ("pysha3", "pycryptodome", "eth-hash")
+
+# Forces a backend instead of the fastest one available
+BACKEND_ENV_VAR = "ETH_TOOLS_KECCAK_BACKEND"
+
+# Input sizes timed by the benchmark: a hash, a CREATE2 preimage, 1 MiB
+BENCHMARK_SIZES = (32, 85, 1 << 20)
+
+# Bytes hashed per backend and input size by the benchmark
+BENCHMARK_TOTAL_BYTES = 1 << 25
+
+
+class KeccakHasher(Protocol):
+    def update(self, data: bytes | memoryview) -> object:
+        ...
+
+    def digest(self) -> bytes:
+        ...
+
+
+def print_usage():
+    print("Usage:\n{} [backend...]\n".format(sys.argv[0]))
+    print("Backends: {}".format(", ".join(BACKENDS)))
+    exit()
+
+
+class KeccakBackend:
+    """
+    Keccak-256 functions of one hashing library: `hash` digests one buffer,
+    `hash_many` a sequence of them, and `new` returns an incremental hasher.
+    """
+
+    __slots__ = ("name", "hash", "hash_many", "new")
+
+    name: str
+    hash: Callable[[bytes | memoryview], bytes]
+    hash_many: Callable[[Iterable[bytes | memoryview]], list[bytes]]
+    new: Callable[[], KeccakHasher]
+
+    def __init__(self, name: str):
+        self.name = name
+        if name == "pysha3":
+            from sha3 import keccak_256  # type: ignore
+
+            self.hash = lambda data: keccak_256(data).digest()
+            self.hash_many = lambda buffers: [keccak_256(b).digest() for b in buffers]
+            self.new = keccak_256
+        elif name == "pycryptodome":
+            from Crypto.Hash.keccak import Keccak_Hash
+
+            # The hash class is built directly, `keccak.new` parses keyword
+            # arguments on every call
+            self.hash = lambda data: Keccak_Hash(data, 32, False).digest()
+            self.hash_many = lambda buffers: [
+                Keccak_Hash(b, 32, False).digest() for b in buffers
+            ]
+            self.new = lambda: Keccak_Hash(None, 32, False)
+        elif name == "eth-hash":
+            from eth_hash.auto import keccak as eth_hash_keccak
+
+            # eth-hash only accepts bytes and bytearray
+            self.hash = lambda data: eth_hash_keccak(bytes(data))
+            self.hash_many = lambda buffers: [
+                eth_hash_keccak(bytes(b)) for b in buffers
+            ]
+            self.new = lambda: eth_hash_keccak.new(b"")
+        else:
+            raise Exception("Unknown keccak backend: " + name)
+
+
+def get_available_backends() -> list[KeccakBackend]:
+    backends = []
+    for name in BACKENDS:
+        try:
+            backends.append(KeccakBackend(name))
+        except ImportError:
+            pass
+    return backends
+
+
+def select_backend() -> KeccakBackend:
+    name = os.environ.get(BACKEND_ENV_VAR)
+    if name:
+        return KeccakBackend(name)
+    backends = get_available_backends()
+    if not backends:
+        raise Exception("No keccak backend available, install pycryptodome")
+    return backends[0]
+
+
+BACKEND = select_backend()
+
+keccak_256 = BACKEND.hash
+keccak_many = BACKEND.hash_many
+new_keccak_256 = BACKEND.new
+
+
+def benchmark_backend(backend: KeccakBackend, size: int) -> tuple[float, float]:
+    # Returns (hashes/s, MiB/s) hashing BENCHMARK_TOTAL_BYTES in `size` chunks
+    count = max(8, BENCHMARK_TOTAL_BYTES // size)
+    buffers = [
+        i.to_bytes(8, "big") * (size // 8) + bytes(size % 8) for i in range(count)
+    ]
+    start = time.perf_counter()
+    backend.hash_many(buffers)
+    elapsed = time.perf_counter() - start
+    return count / elapsed, count * size / elapsed / (1 << 20)
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] in ("-h", "--help"):
+        print_usage()
+
+    if len(sys.argv) > 1:
+        backends = [KeccakBackend(name) for name in sys.argv[1:]]
+    else:
+        backends = get_available_backends()
+
+    # All backends must agree before they are compared
+    sample: list[bytes | memoryview] = [
+        bytes(i % 256 for i in range(size)) for size in (0, 1, 85, 300)
+    ]
+    sample.append(memoryview(sample[-1])[7:200])
+    expected = backends[0].hash_many(sample)
+    for backend in backends[1:]:
+        if backend.hash_many(sample) != expected:
+            raise Exception("Backend digests differ: " + backend.name)
+
+    print(f"Default backend: {BACKEND.name}")
+    print(f"{'backend':<14} {'size':>8} {'hashes/s':>12} {'MiB/s':>10}")
+    for backend in backends:
+        for size in BENCHMARK_SIZES:
+            hashes_per_second, mib_per_second = benchmark_backend(backend, size)
+            print(
+                f"{backend.name:<14} {size:>8} {hashes_per_second:>12.0f} "
+                f"{mib_per_second:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
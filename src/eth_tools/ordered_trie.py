@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+import random
+import sys
+import time
+from typing import Iterable, Sequence
+
+import rlp
+
+from eth_tools.keccak import keccak_256
+from eth_tools.rlp_codec import rlp_length_prefix
+
+# Root of a trie containing no values, equal to `HexaryTrie(db={}).root_hash`
+EMPTY_TRIE_ROOT = keccak_256(rlp.encode(b""))
+
+BENCHMARK_SIZES = (1, 100, 1_000, 10_000)
+
+
+def print_usage():
+    print("Usage:\n{} [Item count...]".format(sys.argv[0]))
+    exit()
+
+
+# Nibbles are converted to and from hex digits with bytes.translate
+HEX_TO_NIBBLES = bytes.maketrans(b"0123456789abcdef", bytes(range(16)))
+NIBBLES_TO_HEX = bytes.maketrans(bytes(range(16)), b"0123456789abcdef")
+
+
+def to_nibbles(key: bytes) -> bytes:
+    return key.hex().encode().translate(HEX_TO_NIBBLES)
+
+
+def hex_prefix_encode(nibbles: bytes, is_leaf: bool) -> bytes:
+    flag = 2 if is_leaf else 0
+    if len(nibbles) % 2:
+        prefixed = bytes([flag + 1]) + nibbles
+    else:
+        prefixed = bytes([flag, 0]) + nibbles
+    return bytes.fromhex(prefixed.translate(NIBBLES_TO_HEX).decode())
+
+
+def encode_node(node: list | bytes) -> bytes:
+    # Same output as `rlp.encode` for the nested lists of bytes trie nodes are
+    # made of
+    if isinstance(node, list):
+        payload = b"".join([encode_node(item) for item in node])
+        return rlp_length_prefix(len(payload), 0xC0) + payload
+    if len(node) == 1 and node[0] < 0x80:
+        return node
+    return rlp_length_prefix(len(node), 0x80) + node
+
+
+def node_reference(node: list) -> bytes | list:
+    # Nodes shorter than 32 bytes are embedded in their parent instead of hashed
+    encoded = encode_node(node)
+    if len(encoded) < 32:
+        return node
+    return keccak_256(encoded)
+
+
+def build_node(items: Sequence[tuple[bytes, bytes]], depth: int) -> list:
+    if len(items) == 1:
+        key, value = items[0]
+        return [hex_prefix_encode(key[depth:], True), value]
+
+    # Keys are sorted, so the prefix shared by all of them is the one shared by
+    # the first and the last
+    first, last = items[0][0], items[-1][0]
+    end = depth
+    limit = min(len(first), len(last))
+    while end < limit and first[end] == last[end]:
+        end += 1
+    if end > depth:
+        return [
+            hex_prefix_encode(first[depth:end], False),
+            node_reference(build_node(items, end)),
+        ]
+
+    branch: list = [b""] * 17
+    i = 0
+    if len(first) == depth:
+        branch[16] = items[0][1]
+        i = 1
+    while i < len(items):
+        nibble = items[i][0][depth]
+        j = i + 1
+        while j < len(items) and items[j][0][depth] == nibble:
+            j += 1
+        branch[nibble] = node_reference(build_node(items[i:j], depth + 1))
+        i = j
+    return branch
+
+
+def ordered_trie_root(values: Sequence[bytes]) -> bytes:
+    """
+    Root of the trie mapping `rlp(i)` to `values[i]`, as used by the
+    transactions and withdrawals roots. Built bottom-up in a single pass
+    without a node database.
+    """
+    if not values:
+        return EMPTY_TRIE_ROOT
+    items = sorted((to_nibbles(rlp.encode(i)), v) for i, v in enumerate(values))
+    root = encode_node(build_node(items, 0))
+    return keccak_256(root)
+
+
+def finalize_node(node: tuple, parent_depth: int) -> list:
+    # `node` is ("leaf", key, value) or ("branch", key, depth, children); its
+    # path starts right after the nibble consumed by its parent branch
+    start = parent_depth + 1
+    if node[0] == "leaf":
+        _, key, value = node
+        return [hex_prefix_encode(key[start:], True), value]
+    _, key, depth, branch = node
+    if depth > start:
+        return [hex_prefix_encode(key[start:depth], False), node_reference(branch)]
+    return branch
+
+
+def attach_child(frame: tuple, node: tuple) -> None:
+    depth, branch = frame
+    branch[node[1][depth]] = node_reference(finalize_node(node, depth))
+
+
+def sorted_trie_root(items: Iterable[tuple[bytes, bytes]]) -> bytes:
+    """
+    Root of the trie of `items`, which must be sorted by key, with distinct
+    keys of the same length (such as hashed keys). The trie is built while
+    iterating: only the branches along the path of the last key are kept, so
+    memory does not depend on the number of items.
+    """
+    # Open branches as (depth, children), with increasing depths
+    stack: list[tuple[int, list]] = []
+    # The last node seen, attached to its parent once the next key is known
+    pending: tuple | None = None
+    prev = b""
+    for key, value in items:
+        key = to_nibbles(key)
+        if pending is None:
+            pending = ("leaf", key, value)
+            prev = key
+            continue
+        if key <= prev:
+            raise Exception("Keys are not sorted: 0x" + key.hex())
+        common = 0
+        while prev[common] == key[common]:
+            common += 1
+        # Branches below the one where the keys diverge are complete
+        while stack and stack[-1][0] > common:
+            attach_child(stack[-1], pending)
+            depth, branch = stack.pop()
+            pending = ("branch", prev, depth, branch)
+        if not stack or stack[-1][0] < common:
+            stack.append((common, [b""] * 17))
+        attach_child(stack[-1], pending)
+        pending = ("leaf", key, value)
+        prev = key
+    if pending is None:
+        return EMPTY_TRIE_ROOT
+    while stack:
+        attach_child(stack[-1], pending)
+        depth, branch = stack.pop()
+        pending = ("branch", prev, depth, branch)
+    root = encode_node(finalize_node(pending, -1))
+    return keccak_256(root)
+
+
+def hexary_trie_root(values: Sequence[bytes]) -> bytes:
+    from trie import HexaryTrie
+
+    t = HexaryTrie(db={})
+    for i, v in enumerate(values):
+        t.set(rlp.encode(i), v)
+    return t.root_hash
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "-h":
+        print_usage()
+
+    sizes = [int(n) for n in sys.argv[1:]] or BENCHMARK_SIZES
+
+    print(f"{'items':>8} {'py-trie (s)':>12} {'ordered (s)':>12} {'speedup':>8}")
+    for n in sizes:
+        rng = random.Random(n)
+        values = [rng.randbytes(rng.randint(100, 200)) for _ in range(n)]
+
+        start = time.perf_counter()
+        expected = hexary_trie_root(values)
+        hexary_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        root = ordered_trie_root(values)
+        ordered_time = time.perf_counter() - start
+
+        if root != expected:
+            raise Exception(
+                "Root mismatch for {} items: 0x{} / 0x{}".format(
+                    n, root.hex(), expected.hex()
+                )
+            )
+        print(
+            f"{n:>8} {hexary_time:>12.4f} {ordered_time:>12.4f} "
+            f"{hexary_time / ordered_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
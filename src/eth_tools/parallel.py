@@ -0,0 +1,40 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_chunk(fn: Callable[[T], R], chunk: list[T]) -> list[R]:
+    return [fn(item) for item in chunk]
+
+
+def iter_chunk_results(
+    fn: Callable[[T], R], items: Iterable[T], workers: int, chunk_size: int
+) -> Iterator[tuple[T, R]]:
+    """
+    Yields each of `items` with `fn` of it, in order, computing chunks of
+    `chunk_size` items on `workers` processes. Items are read as workers free
+    up, so at most two chunks per worker are pending at once. `fn` must be
+    picklable, a module level function or a partial of one.
+    """
+    items = iter(items)
+    chunks = iter(lambda: list(islice(items, chunk_size)), [])
+    first: list[T] = next(chunks, [])
+    if workers <= 1 or len(first) < chunk_size:
+        # A single chunk is not worth starting the pool for
+        for item in chain(first, items):
+            yield item, fn(item)
+        return
+    pending: deque[tuple[list[T], Future]] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in chain([first], chunks):
+            pending.append((chunk, executor.submit(map_chunk, fn, chunk)))
+            if len(pending) >= workers * 2:
+                chunk, future = pending.popleft()
+                yield from zip(chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from zip(chunk, future.result())
@@ -1,24 +1,20 @@
 #!/usr/bin/env python
+import json
+import random
 import sys
+import time
+from typing import IO, Iterator
 
-from Crypto.Hash import keccak
-from eth2spec.utils.ssz.ssz_typing import (
-    ByteList,
-    Bytes20,
-    Bytes32,
-    Container,
-    List,
-    Union,
-    uint8,
-    uint64,
-    uint256,
-)
 from eth_keys.backends.native.ecdsa import ecdsa_raw_recover
 from eth_keys.datatypes import PublicKey
 
+from eth_tools.keccak import keccak_256, new_keccak_256
+
 
 def print_usage():
-    print("Usage:\n{} <SSZ Transaction Hex>\n".format(sys.argv[0]))
+    print("Usage:\n{} <SSZ Transaction Hex> [--root]\n".format(sys.argv[0]))
+    print("{} --file </path/to/ssz_txs.txt|-> [--root]\n".format(sys.argv[0]))
+    print("{} --benchmark [Tx count] [Calldata size]\n".format(sys.argv[0]))
     exit()
 
 
@@ -29,48 +25,369 @@ MAX_ACCESS_LIST_SIZE = 1 << 24
 MAX_ACCESS_LIST_STORAGE_KEYS = 1 << 24
 MAX_VERSIONED_HASHES_LIST_SIZE = 1 << 24
 
+BLOB_TX_TYPE = bytes([3])
 
-# Types
+# Fixed-size parts of the containers in `ssz_tx_types`, variable-size fields
+# being replaced by 4 byte offsets
+SIGNED_TX_FIXED_SIZE = 4 + 1 + 32 + 32
+MESSAGE_FIXED_SIZE = 32 + 8 + 32 + 32 + 8 + 4 + 32 + 4 + 4 + 32 + 4
+ACCESS_TUPLE_FIXED_SIZE = 20 + 4
 
 
-class ECDSASignature(Container):
-    v: uint8
-    r: uint256
-    s: uint256
+class SignedType3TxView:
+    """
+    SignedType3Tx decoded without building SSZ backing trees. Byte fields are
+    memoryview slices of the encoded transaction; `StorageKeys` and
+    `BlobVersionedHashes` are kept as a single slice of concatenated 32 byte
+    items.
+    """
 
+    __slots__ = (
+        "ChainID",
+        "Nonce",
+        "GasTipCap",
+        "GasFeeCap",
+        "Gas",
+        "To",
+        "Value",
+        "Data",
+        "AccessList",
+        "MaxFeePerDataGas",
+        "BlobVersionedHashes",
+        "v",
+        "r",
+        "s",
+        "message",
+    )
 
-class AccessTuple(Container):
-    Address: Bytes20
-    StorageKeys: List[Bytes32, MAX_ACCESS_LIST_STORAGE_KEYS]
+    ChainID: int
+    Nonce: int
+    GasTipCap: int
+    GasFeeCap: int
+    Gas: int
+    To: memoryview | None
+    Value: int
+    Data: memoryview
+    AccessList: list[tuple[memoryview, memoryview]]
+    MaxFeePerDataGas: int
+    BlobVersionedHashes: memoryview
+    v: int
+    r: int
+    s: int
+    # Encoded Type3TxMessage
+    message: memoryview
 
+    def signing_hash(self) -> bytes:
+        # The message is hashed from its original bytes, not re-encoded
+        k = new_keccak_256()
+        k.update(BLOB_TX_TYPE)
+        k.update(self.message)
+        return k.digest()
 
-class Type3TxMessage(Container):
-    ChainID: uint256
-    Nonce: uint64
-    GasTipCap: uint256
-    GasFeeCap: uint256
-    Gas: uint64
-    To: Union[None, Bytes20]
-    Value: uint256
-    Data: ByteList[MAX_CALLDATA_SIZE]
-    AccessList: List[AccessTuple, MAX_ACCESS_LIST_SIZE]
-    MaxFeePerDataGas: uint256
-    BlobVersionedHashes: List[Bytes32, MAX_VERSIONED_HASHES_LIST_SIZE]
+    def to_dict(self) -> dict:
+        return {
+            "ChainID": self.ChainID,
+            "Nonce": self.Nonce,
+            "GasTipCap": self.GasTipCap,
+            "GasFeeCap": self.GasFeeCap,
+            "Gas": self.Gas,
+            "To": None if self.To is None else "0x" + self.To.hex(),
+            "Value": self.Value,
+            "Data": "0x" + self.Data.hex(),
+            "AccessList": [
+                {
+                    "Address": "0x" + address.hex(),
+                    "StorageKeys": split_bytes32(storage_keys),
+                }
+                for address, storage_keys in self.AccessList
+            ],
+            "MaxFeePerDataGas": self.MaxFeePerDataGas,
+            "BlobVersionedHashes": split_bytes32(self.BlobVersionedHashes),
+            "Signature": {"v": self.v, "r": self.r, "s": self.s},
+        }
 
 
-class SignedType3Tx(Container):
-    Message: Type3TxMessage
-    Signature: ECDSASignature
+def split_bytes32(buf: memoryview) -> list[str]:
+    return ["0x" + buf[i : i + 32].hex() for i in range(0, len(buf), 32)]
 
 
-BLOB_TX_TYPE = bytes([3])
+def read_uint(buf: memoryview, start: int, size: int) -> int:
+    return int.from_bytes(buf[start : start + size], "little")
+
+
+def read_offsets(buf: memoryview, positions: tuple[int, ...], fixed_size: int) -> list:
+    # Offsets of the variable-size fields, plus the end of the container
+    offsets = [read_uint(buf, p, 4) for p in positions] + [len(buf)]
+    if offsets[0] != fixed_size:
+        raise Exception("Invalid SSZ: first offset does not match fixed size")
+    for start, end in zip(offsets, offsets[1:]):
+        if start > end:
+            raise Exception("Invalid SSZ: offsets out of order")
+    return offsets
+
+
+def decode_bytes32_list(buf: memoryview, limit: int) -> memoryview:
+    if len(buf) % 32 or len(buf) // 32 > limit:
+        raise Exception("Invalid SSZ: bad Bytes32 list length")
+    return buf
+
+
+def decode_access_list(buf: memoryview) -> list[tuple[memoryview, memoryview]]:
+    if len(buf) == 0:
+        return []
+    first_offset = read_uint(buf, 0, 4)
+    if first_offset == 0 or first_offset % 4:
+        raise Exception("Invalid SSZ: bad access list offset")
+    count = first_offset // 4
+    if count > MAX_ACCESS_LIST_SIZE:
+        raise Exception("Invalid SSZ: access list too long")
+    offsets = read_offsets(buf, tuple(range(0, first_offset, 4)), first_offset)
+    access_list = []
+    for start, end in zip(offsets, offsets[1:]):
+        item = buf[start:end]
+        if len(item) < ACCESS_TUPLE_FIXED_SIZE:
+            raise Exception("Invalid SSZ: access tuple too short")
+        read_offsets(item, (20,), ACCESS_TUPLE_FIXED_SIZE)
+        access_list.append(
+            (
+                item[:20],
+                decode_bytes32_list(
+                    item[ACCESS_TUPLE_FIXED_SIZE:], MAX_ACCESS_LIST_STORAGE_KEYS
+                ),
+            )
+        )
+    return access_list
+
+
+def decode_signed_type3_tx(ssz_bytes: bytes | memoryview) -> SignedType3TxView:
+    buf = memoryview(ssz_bytes)
+    if len(buf) < SIGNED_TX_FIXED_SIZE:
+        raise Exception("Invalid SSZ length: too short")
+    read_offsets(buf, (0,), SIGNED_TX_FIXED_SIZE)
+
+    tx = SignedType3TxView()
+    tx.v = buf[4]
+    tx.r = read_uint(buf, 5, 32)
+    tx.s = read_uint(buf, 37, 32)
+
+    msg = buf[SIGNED_TX_FIXED_SIZE:]
+    if len(msg) < MESSAGE_FIXED_SIZE:
+        raise Exception("Invalid SSZ length: message too short")
+    tx.message = msg
+    tx.ChainID = read_uint(msg, 0, 32)
+    tx.Nonce = read_uint(msg, 32, 8)
+    tx.GasTipCap = read_uint(msg, 40, 32)
+    tx.GasFeeCap = read_uint(msg, 72, 32)
+    tx.Gas = read_uint(msg, 104, 8)
+    tx.Value = read_uint(msg, 116, 32)
+    tx.MaxFeePerDataGas = read_uint(msg, 156, 32)
+
+    to_offset, data_offset, access_list_offset, hashes_offset, end = read_offsets(
+        msg, (112, 148, 152, 188), MESSAGE_FIXED_SIZE
+    )
+
+    to = msg[to_offset:data_offset]
+    if len(to) == 1 and to[0] == 0:
+        tx.To = None
+    elif len(to) == 21 and to[0] == 1:
+        tx.To = to[1:]
+    else:
+        raise Exception("Invalid SSZ: bad To union")
+
+    tx.Data = msg[data_offset:access_list_offset]
+    if len(tx.Data) > MAX_CALLDATA_SIZE:
+        raise Exception("Invalid SSZ: calldata too long")
+    tx.AccessList = decode_access_list(msg[access_list_offset:hashes_offset])
+    tx.BlobVersionedHashes = decode_bytes32_list(
+        msg[hashes_offset:end], MAX_VERSIONED_HASHES_LIST_SIZE
+    )
+    return tx
+
+
+def recover_address(message_hash: bytes, v: int, r: int, s: int) -> bytes:
+    pk = PublicKey(ecdsa_raw_recover(bytes(message_hash), (v, r, s)))
+    return pk.to_canonical_address()
+
+
+def iter_ssz_txs(f: IO[str]) -> Iterator[bytes]:
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("0x"):
+            line = line[2:]
+        yield bytes.fromhex(line)
+
+
+def decode_eth2spec(ssz_bytes: bytes) -> tuple[dict, bytes]:
+    from eth_tools.ssz_tx_types import SignedType3Tx
+
+    tx = SignedType3Tx.decode_bytes(ssz_bytes)
+    message_hash = keccak_256(BLOB_TX_TYPE + tx.Message.encode_bytes())
+    msg = tx.Message
+    to = msg.To.value()
+    fields = {
+        "ChainID": int(msg.ChainID),
+        "Nonce": int(msg.Nonce),
+        "GasTipCap": int(msg.GasTipCap),
+        "GasFeeCap": int(msg.GasFeeCap),
+        "Gas": int(msg.Gas),
+        "To": None if to is None else "0x" + bytes(to).hex(),
+        "Value": int(msg.Value),
+        "Data": "0x" + bytes(msg.Data).hex(),
+        "AccessList": [
+            {
+                "Address": "0x" + bytes(t.Address).hex(),
+                "StorageKeys": ["0x" + bytes(k).hex() for k in t.StorageKeys],
+            }
+            for t in msg.AccessList
+        ],
+        "MaxFeePerDataGas": int(msg.MaxFeePerDataGas),
+        "BlobVersionedHashes": ["0x" + bytes(h).hex() for h in msg.BlobVersionedHashes],
+        "Signature": {
+            "v": int(tx.Signature.v),
+            "r": int(tx.Signature.r),
+            "s": int(tx.Signature.s),
+        },
+    }
+    return fields, message_hash
+
+
+def generate_ssz_txs(count: int, calldata_size: int) -> list[bytes]:
+    from eth_tools.ssz_tx_types import (
+        AccessTuple,
+        ECDSASignature,
+        SignedType3Tx,
+        Type3TxMessage,
+    )
+
+    rng = random.Random(calldata_size)
+    to_type = Type3TxMessage.fields()["To"]
+    txs = []
+    for i in range(count):
+        to = to_type(selector=0, value=None)
+        if i % 2:
+            to = to_type(selector=1, value=rng.randbytes(20))
+        access_list = [
+            AccessTuple(
+                Address=rng.randbytes(20),
+                StorageKeys=[rng.randbytes(32) for _ in range(rng.randint(0, 4))],
+            )
+            for _ in range(rng.randint(0, 3))
+        ]
+        tx = SignedType3Tx(
+            Message=Type3TxMessage(
+                ChainID=1,
+                Nonce=i,
+                GasTipCap=rng.getrandbits(64),
+                GasFeeCap=rng.getrandbits(64),
+                Gas=rng.getrandbits(32),
+                To=to,
+                Value=rng.getrandbits(256),
+                Data=rng.randbytes(calldata_size),
+                AccessList=access_list,
+                MaxFeePerDataGas=rng.getrandbits(64),
+                BlobVersionedHashes=[
+                    b"\x01" + rng.randbytes(31) for _ in range(rng.randint(1, 4))
+                ],
+            ),
+            Signature=ECDSASignature(
+                v=rng.randint(0, 1), r=rng.getrandbits(256), s=rng.getrandbits(256)
+            ),
+        )
+        txs.append(tx.encode_bytes())
+    return txs
+
+
+def benchmark(count: int, calldata_size: int) -> None:
+    from eth_tools.ssz_merkle import (
+        access_list_roots,
+        data_roots,
+        type3_tx_message_root,
+    )
+    from eth_tools.ssz_tx_types import SignedType3Tx
+
+    txs = generate_ssz_txs(count, calldata_size)
+
+    start = time.perf_counter()
+    for ssz_bytes in txs:
+        decode_eth2spec(ssz_bytes)
+    eth2spec_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for ssz_bytes in txs:
+        decode_signed_type3_tx(ssz_bytes).signing_hash()
+    fast_time = time.perf_counter() - start
+
+    print(
+        f"{count} txs with {calldata_size} bytes of calldata: "
+        f"eth2spec {eth2spec_time:.4f}s, native {fast_time:.4f}s "
+        f"({eth2spec_time / fast_time:.1f}x)"
+    )
+
+    start = time.perf_counter()
+    for ssz_bytes in txs:
+        SignedType3Tx.decode_bytes(ssz_bytes).Message.hash_tree_root()
+    eth2spec_time = time.perf_counter() - start
+
+    data_roots.clear()
+    access_list_roots.clear()
+    start = time.perf_counter()
+    for ssz_bytes in txs:
+        type3_tx_message_root(decode_signed_type3_tx(ssz_bytes))
+    fast_time = time.perf_counter() - start
+
+    print(
+        f"{count} message roots with {calldata_size} bytes of calldata: "
+        f"eth2spec {eth2spec_time:.4f}s, native {fast_time:.4f}s "
+        f"({eth2spec_time / fast_time:.1f}x)"
+    )
 
 
 def main() -> None:
-    if len(sys.argv) != 2:
+    if len(sys.argv) >= 2 and sys.argv[1] == "--benchmark":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+        if len(sys.argv) > 3:
+            benchmark(count, int(sys.argv[3]))
+        else:
+            for calldata_size in (0, 1 << 10, 1 << 17):
+                benchmark(count, calldata_size)
+        return
+
+    from eth_tools.ssz_merkle import type3_tx_message_root
+
+    if len(sys.argv) in (3, 4) and sys.argv[1] == "--file":
+        path = sys.argv[2]
+        # The hash_tree_root is only computed when asked for
+        with_root = sys.argv[3:] == ["--root"]
+        if len(sys.argv) == 4 and not with_root:
+            print_usage()
+        f = sys.stdin if path == "-" else open(path, "r")
+        try:
+            for ssz_bytes in iter_ssz_txs(f):
+                if len(ssz_bytes) < 1:
+                    raise Exception("Invalid SSZ length: empty")
+                tx = decode_signed_type3_tx(memoryview(ssz_bytes)[1:])
+                message_hash = tx.signing_hash()
+                result = tx.to_dict()
+                result["SigningMessageHash"] = "0x" + message_hash.hex()
+                if with_root:
+                    root = type3_tx_message_root(tx)
+                    result["MessageHashTreeRoot"] = "0x" + root.hex()
+                result["RecoveredAddress"] = (
+                    "0x" + recover_address(message_hash, tx.v, tx.r, tx.s).hex()
+                )
+                print(json.dumps(result))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        return
+
+    with_root = sys.argv[2:] == ["--root"]
+    if len(sys.argv) != 2 and not with_root:
         print_usage()
 
-    (_, ssz_hex) = sys.argv
+    ssz_hex = sys.argv[1]
 
     if ssz_hex.startswith("0x"):
         ssz_hex = ssz_hex[2:]
@@ -80,20 +397,15 @@ def main() -> None:
         raise Exception("Invalid SSZ length: empty")
 
     tx_type, ssz_bytes = ssz_bytes[0], ssz_bytes[1:]
-    tx = SignedType3Tx.decode_bytes(ssz_bytes)
-    print("Signed Transaction", tx)
+    tx = decode_signed_type3_tx(ssz_bytes)
+    print("Signed Transaction", tx.to_dict())
 
     # This will change with https://eips.ethereum.org/EIPS/eip-6493
-    messageHash = keccak.new(
-        data=BLOB_TX_TYPE + tx.Message.encode_bytes(), digest_bits=256
-    ).digest()
+    messageHash = tx.signing_hash()
 
     print("Signing Message Hash", messageHash.hex())
+    if with_root:
+        print("Message Hash Tree Root", type3_tx_message_root(tx).hex())
 
-    pk = PublicKey(
-        ecdsa_raw_recover(
-            bytes(messageHash),
-            (int(tx.Signature.v), int(tx.Signature.r), int(tx.Signature.s)),
-        )
-    )
-    print("Recovered Address", "0x" + pk.to_canonical_address().hex())
+    address = recover_address(messageHash, tx.v, tx.r, tx.s)
+    print("Recovered Address", "0x" + address.hex())
@@ -0,0 +1,79 @@
+RlpItem = memoryview | list
+
+
+def rlp_length_prefix(length: int, offset: int) -> bytes:
+    if length < 56:
+        return bytes([offset + length])
+    length_bytes = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([offset + 55 + len(length_bytes)]) + length_bytes
+
+
+def rlp_item_bounds(buf: memoryview, pos: int) -> tuple[bool, int, int]:
+    # Returns whether the item at `pos` is a list, and where its payload
+    # starts and ends, without looking at the payload
+    b0 = buf[pos]
+    if b0 < 0x80:
+        return False, pos, pos + 1
+    if b0 < 0xB8:
+        start, length = pos + 1, b0 - 0x80
+    elif b0 < 0xC0:
+        start = pos + 1 + b0 - 0xB7
+        length = int.from_bytes(buf[pos + 1 : start], "big")
+    elif b0 < 0xF8:
+        start, length = pos + 1, b0 - 0xC0
+    else:
+        start = pos + 1 + b0 - 0xF7
+        length = int.from_bytes(buf[pos + 1 : start], "big")
+    if start + length > len(buf):
+        raise Exception("Invalid RLP: item exceeds input length")
+    return b0 >= 0xC0, start, start + length
+
+
+def rlp_list_items(buf: memoryview, pos: int) -> list[tuple[int, int]]:
+    # (start, end) of the full encoding of every item of the list at `pos`
+    is_list, start, end = rlp_item_bounds(buf, pos)
+    if not is_list:
+        raise Exception("Invalid RLP: expected a list")
+    items = []
+    while start < end:
+        _, _, item_end = rlp_item_bounds(buf, start)
+        items.append((start, item_end))
+        start = item_end
+    if start != end:
+        raise Exception("Invalid RLP: list length mismatch")
+    return items
+
+
+def decode_rlp_item(buf: memoryview, pos: int) -> tuple[RlpItem, int]:
+    # Byte strings are returned as slices of `buf`, so nothing is copied
+    is_list, start, end = rlp_item_bounds(buf, pos)
+    if not is_list:
+        return buf[start:end], end
+    items, _ = decode_rlp_list_payload(buf, start, end)
+    return items, end
+
+
+def decode_rlp_list_payload(
+    buf: memoryview, start: int, end: int
+) -> tuple[list[RlpItem], list[int]]:
+    # Returns the list items and the offset of each one, plus the end offset
+    items = []
+    offsets = []
+    pos = start
+    while pos < end:
+        offsets.append(pos)
+        item, pos = decode_rlp_item(buf, pos)
+        items.append(item)
+    if pos != end:
+        raise Exception("Invalid RLP: list length mismatch")
+    offsets.append(end)
+    return items, offsets
+
+
+def decode_rlp_list(buf: memoryview) -> tuple[list[RlpItem], list[int]]:
+    is_list, start, end = rlp_item_bounds(buf, 0)
+    if not is_list:
+        raise Exception("Invalid RLP: expected a list")
+    if end != len(buf):
+        raise Exception("Invalid RLP: trailing bytes")
+    return decode_rlp_list_payload(buf, start, end)
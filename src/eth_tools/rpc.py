@@ -0,0 +1,164 @@
+import asyncio
+import json
+import ssl
+from typing import Any
+from urllib.parse import urlsplit
+
+# Requests sent in one JSON-RPC batch
+DEFAULT_BATCH_SIZE = 32
+
+# Batches in flight at once, one pooled connection each
+DEFAULT_MAX_IN_FLIGHT = 4
+
+
+class RpcError(Exception):
+    pass
+
+
+class HttpConnection:
+    """
+    Keep-alive HTTP/1.1 connection that posts JSON bodies. The connection is
+    opened on first use and reopened when the server closed it in between
+    requests.
+    """
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise Exception("Unsupported RPC url scheme: " + url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl
+        )
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+        self.reader = self.writer = None
+
+    async def read_body(self, headers: dict[str, str]) -> bytes:
+        assert self.reader is not None
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks: list[bytes] = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    # Trailers, up to the empty line
+                    while (await self.reader.readline()).strip():
+                        pass
+                    return b"".join(chunks)
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+        if "content-length" in headers:
+            return await self.reader.readexactly(int(headers["content-length"]))
+        # No length: the body runs until the server closes the connection
+        body = await self.reader.read()
+        headers["connection"] = "close"
+        return body
+
+    async def request(self, body: bytes) -> bytes:
+        assert self.reader is not None and self.writer is not None
+        self.writer.write(
+            (
+                f"POST {self.path} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: keep-alive\r\n\r\n"
+            ).encode()
+            + body
+        )
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the server")
+        status = status_line.split(b" ", 2)
+        headers = {}
+        while line := (await self.reader.readline()).strip():
+            k, _, v = line.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = v.strip()
+        response = await self.read_body(headers)
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        if len(status) < 2 or status[1] != b"200":
+            raise RpcError(f"HTTP {status_line.decode('latin-1').strip()}")
+        return response
+
+    async def post(self, body: bytes) -> bytes:
+        reused = self.writer is not None
+        if not reused:
+            await self.connect()
+        try:
+            return await self.request(body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+        # An idle keep-alive connection may have been dropped, retry once
+        await self.connect()
+        return await self.request(body)
+
+
+class RpcClient:
+    """
+    JSON-RPC client sending batches over a pool of keep-alive connections.
+    At most `max_in_flight` batches are outstanding, callers beyond that wait
+    for a connection to be released.
+    """
+
+    def __init__(self, url: str, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        self.connections = [HttpConnection(url) for _ in range(max_in_flight)]
+        self.pool: asyncio.Queue[HttpConnection] = asyncio.Queue()
+        for connection in self.connections:
+            self.pool.put_nowait(connection)
+        self.next_id = 0
+
+    async def close(self) -> None:
+        for connection in self.connections:
+            await connection.close()
+
+    async def batch(self, calls: list[tuple[str, list]]) -> list[Any]:
+        """
+        Results of `calls`, (method, params) pairs, in order. A call that
+        failed has an RpcError in place of its result.
+        """
+        ids = range(self.next_id, self.next_id + len(calls))
+        self.next_id += len(calls)
+        body = json.dumps(
+            [
+                {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+                for i, (method, params) in zip(ids, calls)
+            ],
+            separators=(",", ":"),
+        ).encode()
+        connection = await self.pool.get()
+        try:
+            response = json.loads(await connection.post(body))
+        finally:
+            self.pool.put_nowait(connection)
+        if type(response) is dict:
+            # Servers answer a batch they reject with a single error object
+            raise RpcError(response.get("error", response))
+        # Batch responses may come in any order
+        by_id = {r.get("id"): r for r in response}
+        results: list[Any] = []
+        for i in ids:
+            r = by_id.get(i)
+            if r is None:
+                results.append(RpcError(f"No response for request {i}"))
+            elif "error" in r:
+                results.append(RpcError(r["error"]))
+            else:
+                results.append(r.get("result"))
+        return results
@@ -0,0 +1,166 @@
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Callable
+
+from eth_tools.parse_ssz_tx import (
+    MAX_ACCESS_LIST_SIZE,
+    MAX_ACCESS_LIST_STORAGE_KEYS,
+    MAX_CALLDATA_SIZE,
+    MAX_VERSIONED_HASHES_LIST_SIZE,
+    SignedType3TxView,
+)
+
+# Roots of all-zero subtrees, ZERO_HASHES[d] having depth d
+ZERO_HASHES = [bytes(32)]
+for _ in range(64):
+    ZERO_HASHES.append(sha256(ZERO_HASHES[-1] + ZERO_HASHES[-1]).digest())
+
+
+def get_depth(limit: int) -> int:
+    return max(limit - 1, 0).bit_length()
+
+
+def merkleize(data: bytes | memoryview, limit: int) -> bytes:
+    """
+    Root of `data` packed into 32 byte chunks, padded with zero chunks up to
+    `limit` chunks. Each tree level is hashed in one pass over its
+    concatenated chunks, and the padding is taken from `ZERO_HASHES` instead
+    of being hashed.
+    """
+    depth = get_depth(limit)
+    if (len(data) + 31) // 32 > max(limit, 1):
+        raise Exception("Too many chunks for limit")
+    if len(data) == 0:
+        return ZERO_HASHES[depth]
+    if depth == 0:
+        return bytes(data) + bytes(32 - len(data))
+
+    level = data
+    for d in range(depth):
+        full = len(level) - len(level) % 64
+        nodes = [sha256(level[i : i + 64]).digest() for i in range(0, full, 64)]
+        if full < len(level):
+            tail = bytes(level[full:])
+            tail += bytes(-len(tail) % 32)
+            if len(tail) == 32:
+                tail += ZERO_HASHES[d]
+            nodes.append(sha256(tail).digest())
+        level = b"".join(nodes)
+        if len(level) == 32:
+            # Only the leftmost branch is left, the rest of it are zero subtrees
+            root = level
+            for zero_hash in ZERO_HASHES[d + 1 : depth]:
+                root = sha256(root + zero_hash).digest()
+            return root
+    return bytes(level)
+
+
+def mix_in_length(root: bytes, length: int) -> bytes:
+    return sha256(root + length.to_bytes(32, "little")).digest()
+
+
+def uint_root(value: int) -> bytes:
+    return value.to_bytes(32, "little")
+
+
+def byte_list_root(data: bytes | memoryview, limit: int) -> bytes:
+    return mix_in_length(merkleize(data, (limit + 31) // 32), len(data))
+
+
+def bytes32_list_root(data: bytes | memoryview, limit: int) -> bytes:
+    # `data` holds the concatenated items
+    return mix_in_length(merkleize(data, limit), len(data) // 32)
+
+
+def access_list_root(access_list: list[tuple[memoryview, memoryview]]) -> bytes:
+    roots = b"".join(
+        sha256(
+            merkleize(address, 1)
+            + bytes32_list_root(storage_keys, MAX_ACCESS_LIST_STORAGE_KEYS)
+        ).digest()
+        for address, storage_keys in access_list
+    )
+    return mix_in_length(merkleize(roots, MAX_ACCESS_LIST_SIZE), len(access_list))
+
+
+class RootCache:
+    """
+    Recently computed roots, looked up by the length and the first and last
+    chunk of the merkleized content so a miss costs no hashing. The content
+    is copied into the cache and compared before a root is reused. The
+    least recently used roots are dropped once more than `max_bytes` of
+    content is cached.
+    """
+
+    __slots__ = ("max_bytes", "size", "roots")
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.roots: OrderedDict[tuple, tuple[bytes, bytes]] = OrderedDict()
+
+    def get(self, content: bytes | memoryview, compute: Callable[[], bytes]) -> bytes:
+        key = (len(content), bytes(content[:32]), bytes(content[-32:]))
+        entry = self.roots.get(key)
+        # Lengths match, so startswith compares the whole content
+        if entry is not None and entry[0].startswith(content):
+            self.roots.move_to_end(key)
+            return entry[1]
+        root = compute()
+        if len(content) <= self.max_bytes:
+            if entry is not None:
+                self.size -= len(entry[0])
+            self.roots[key] = (bytes(content), root)
+            self.roots.move_to_end(key)
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, (old, _) = self.roots.popitem(last=False)
+                self.size -= len(old)
+        return root
+
+    def clear(self) -> None:
+        self.roots.clear()
+        self.size = 0
+
+
+data_roots = RootCache(64 << 20)
+access_list_roots = RootCache(1 << 20)
+
+
+def get_data_root(data: memoryview) -> bytes:
+    return data_roots.get(data, lambda: byte_list_root(data, MAX_CALLDATA_SIZE))
+
+
+def get_access_list_root(access_list: list[tuple[memoryview, memoryview]]) -> bytes:
+    # Addresses have a fixed size, the storage key count separates entries
+    content = b"".join(
+        bytes(address) + len(storage_keys).to_bytes(4, "little") + storage_keys
+        for address, storage_keys in access_list
+    )
+    return access_list_roots.get(content, lambda: access_list_root(access_list))
+
+
+def type3_tx_message_root(tx: SignedType3TxView) -> bytes:
+    """
+    hash_tree_root of the Type3TxMessage of a decoded transaction. The Data
+    and AccessList roots are cached by content, so transactions that only
+    differ in other fields do not re-merkleize them.
+    """
+    if tx.To is None:
+        to_root = ZERO_HASHES[1]
+    else:
+        to_root = sha256(merkleize(tx.To, 1) + uint_root(1)).digest()
+    field_roots = [
+        uint_root(tx.ChainID),
+        uint_root(tx.Nonce),
+        uint_root(tx.GasTipCap),
+        uint_root(tx.GasFeeCap),
+        uint_root(tx.Gas),
+        to_root,
+        uint_root(tx.Value),
+        get_data_root(tx.Data),
+        get_access_list_root(tx.AccessList),
+        uint_root(tx.MaxFeePerDataGas),
+        bytes32_list_root(tx.BlobVersionedHashes, MAX_VERSIONED_HASHES_LIST_SIZE),
+    ]
+    return merkleize(b"".join(field_roots), len(field_roots))
@@ -0,0 +1,50 @@
+from eth2spec.utils.ssz.ssz_typing import (
+    ByteList,
+    Bytes20,
+    Bytes32,
+    Container,
+    List,
+    Union,
+    uint8,
+    uint64,
+    uint256,
+)
+
+from eth_tools.parse_ssz_tx import (
+    MAX_ACCESS_LIST_SIZE,
+    MAX_ACCESS_LIST_STORAGE_KEYS,
+    MAX_CALLDATA_SIZE,
+    MAX_VERSIONED_HASHES_LIST_SIZE,
+)
+
+# Types
+
+
+class ECDSASignature(Container):
+    v: uint8
+    r: uint256
+    s: uint256
+
+
+class AccessTuple(Container):
+    Address: Bytes20
+    StorageKeys: List[Bytes32, MAX_ACCESS_LIST_STORAGE_KEYS]
+
+
+class Type3TxMessage(Container):
+    ChainID: uint256
+    Nonce: uint64
+    GasTipCap: uint256
+    GasFeeCap: uint256
+    Gas: uint64
+    To: Union[None, Bytes20]
+    Value: uint256
+    Data: ByteList[MAX_CALLDATA_SIZE]
+    AccessList: List[AccessTuple, MAX_ACCESS_LIST_SIZE]
+    MaxFeePerDataGas: uint256
+    BlobVersionedHashes: List[Bytes32, MAX_VERSIONED_HASHES_LIST_SIZE]
+
+
+class SignedType3Tx(Container):
+    Message: Type3TxMessage
+    Signature: ECDSASignature
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+import heapq
+import json
+import struct
+import sys
+import tempfile
+import time
+from typing import IO, Any, Iterable, Iterator
+
+import rlp
+
+from eth_tools.get_block_info import parse_hex, parse_int
+from eth_tools.keccak import keccak_256, keccak_many
+from eth_tools.ordered_trie import sorted_trie_root
+
+READ_CHUNK_SIZE = 1 << 16
+
+# Records sorted in memory before they are spilled to a temporary file
+DEFAULT_RUN_SIZE = 1 << 18
+
+# Spilled record header: key length, value length
+RECORD_HEADER = struct.Struct(">HI")
+
+EMPTY_CODE_HASH = keccak_256(b"")
+
+
+def print_usage():
+    print(
+        "Usage:\n{} </path/to/alloc.json|genesis.json|-> [--run-size N] "
+        "[--tmpdir /path/to/dir] [--verify]\n".format(sys.argv[0])
+    )
+    exit()
+
+
+class JsonObjectStream:
+    """
+    Reads the members of JSON objects from a text stream one at a time, so
+    an alloc is never loaded whole: only the account being decoded is kept
+    in memory.
+    """
+
+    def __init__(self, f: IO[str]):
+        self.f = f
+        self.decoder = json.JSONDecoder()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size: int = READ_CHUNK_SIZE) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(size)
+        self.eof = not chunk
+        self.text = self.text[self.pos :] + chunk
+        self.pos = 0
+        return not self.eof
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, c: str) -> None:
+        if self.peek() != c:
+            raise Exception(f"Invalid JSON: expected '{c}' at '{self.peek()}'")
+        self.pos += 1
+
+    def decode(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.text, self.pos)
+                # A number may continue past the end of the buffer
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow reads with the value, so a large value is not re-decoded
+            # once per chunk
+            self.fill(max(READ_CHUNK_SIZE, len(self.text) - self.pos))
+
+    def iter_keys(self) -> Iterator[str]:
+        """
+        Yields the keys of the object starting at the current position. The
+        caller must consume each value, with `decode` or a nested
+        `iter_keys`, before resuming the iteration.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(":")
+            yield key
+            c = self.peek()
+            self.pos += 1
+            if c == "}":
+                return
+            if c != ",":
+                raise Exception(f"Invalid JSON: expected ',' or '}}' at '{c}'")
+
+
+def is_address(key: str) -> bool:
+    if key.startswith("0x"):
+        key = key[2:]
+    return len(key) == 40
+
+
+def iter_alloc(f: IO[str]) -> Iterator[tuple[str, dict]]:
+    # Accepts an alloc object, or a genesis object containing one in `alloc`
+    stream = JsonObjectStream(f)
+    for key in stream.iter_keys():
+        if key == "alloc":
+            for address in stream.iter_keys():
+                yield address, stream.decode()
+        elif is_address(key) and stream.peek() == "{":
+            yield key, stream.decode()
+        else:
+            stream.decode()
+
+
+def iter_records(f: IO[bytes]) -> Iterator[tuple[bytes, bytes]]:
+    read = f.read
+    while header := read(RECORD_HEADER.size):
+        key_length, value_length = RECORD_HEADER.unpack(header)
+        yield read(key_length), read(value_length)
+
+
+def external_sort(
+    items: Iterable[tuple[bytes, bytes]],
+    run_size: int = DEFAULT_RUN_SIZE,
+    tmpdir: str | None = None,
+    stats: dict | None = None,
+) -> Iterator[tuple[bytes, bytes]]:
+    """
+    Yields `items` sorted by key. Items are sorted in runs of `run_size`, and
+    when there is more than one run each is spilled to a temporary file and
+    the files are merged.
+    """
+    run: list[tuple[bytes, bytes]] = []
+    runs: list[IO[bytes]] = []
+    try:
+        for item in items:
+            run.append(item)
+            if len(run) >= run_size:
+                run.sort()
+                f = tempfile.TemporaryFile(dir=tmpdir)
+                f.write(
+                    b"".join(RECORD_HEADER.pack(len(k), len(v)) + k + v for k, v in run)
+                )
+                f.seek(0)
+                runs.append(f)
+                run = []
+        run.sort()
+        if stats is not None:
+            stats["runs"] = stats.get("runs", 0) + len(runs)
+        if not runs:
+            yield from run
+            return
+        yield from heapq.merge(iter(run), *(iter_records(f) for f in runs))
+    finally:
+        for f in runs:
+            f.close()
+
+
+def get_storage_root(
+    storage: dict, run_size: int = DEFAULT_RUN_SIZE, tmpdir: str | None = None
+) -> bytes:
+    values = {}
+    for k, v in storage.items():
+        if value := parse_int(v):
+            values[parse_int(k).to_bytes(32, "big")] = rlp.encode(value)
+    slots = zip(keccak_many(values), values.values())
+    return sorted_trie_root(external_sort(slots, run_size, tmpdir))
+
+
+def get_account_rlp(
+    account: dict, run_size: int = DEFAULT_RUN_SIZE, tmpdir: str | None = None
+) -> bytes:
+    code = parse_hex(account.get("code") or "0x")
+    return rlp.encode(
+        [
+            parse_int(account.get("nonce") or 0),
+            parse_int(account.get("balance") or 0),
+            get_storage_root(account.get("storage") or {}, run_size, tmpdir),
+            keccak_256(code) if code else EMPTY_CODE_HASH,
+        ]
+    )
+
+
+def iter_account_leaves(
+    accounts: Iterable[tuple[str, dict]],
+    run_size: int = DEFAULT_RUN_SIZE,
+    tmpdir: str | None = None,
+) -> Iterator[tuple[bytes, bytes]]:
+    for address, account in accounts:
+        yield (
+            keccak_256(int(address, 16).to_bytes(20, "big")),
+            get_account_rlp(account, run_size, tmpdir),
+        )
+
+
+def get_state_root(
+    accounts: Iterable[tuple[str, dict]],
+    run_size: int = DEFAULT_RUN_SIZE,
+    tmpdir: str | None = None,
+    stats: dict | None = None,
+) -> bytes:
+    leaves = iter_account_leaves(accounts, run_size, tmpdir)
+    return sorted_trie_root(external_sort(leaves, run_size, tmpdir, stats))
+
+
+def hexary_state_root(accounts: Iterable[tuple[str, dict]]) -> bytes:
+    # Reference root built in memory with py-trie, storage tries included, for
+    # --verify
+    from trie import HexaryTrie
+
+    state = HexaryTrie(db={})
+    for address, account in accounts:
+        storage = HexaryTrie(db={})
+        for k, v in (account.get("storage") or {}).items():
+            if value := parse_int(v):
+                storage.set(
+                    keccak_256(parse_int(k).to_bytes(32, "big")), rlp.encode(value)
+                )
+        code = parse_hex(account.get("code") or "0x")
+        state.set(
+            keccak_256(int(address, 16).to_bytes(20, "big")),
+            rlp.encode(
+                [
+                    parse_int(account.get("nonce") or 0),
+                    parse_int(account.get("balance") or 0),
+                    storage.root_hash,
+                    keccak_256(code),
+                ]
+            ),
+        )
+    return state.root_hash
+
+
+def main() -> None:
+    run_size = DEFAULT_RUN_SIZE
+    tmpdir = None
+    verify = False
+    path = None
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--run-size" and args:
+            run_size = int(args.pop(0))
+        elif arg == "--tmpdir" and args:
+            tmpdir = args.pop(0)
+        elif arg == "--verify":
+            verify = True
+        elif path is None:
+            path = arg
+        else:
+            print_usage()
+    if path is None:
+        print_usage()
+        raise Exception("Missing path")
+
+    stats: dict = {}
+    f = sys.stdin if path == "-" else open(path, "r")
+    start = time.perf_counter()
+    try:
+        accounts: Iterable[tuple[str, dict]] = iter_alloc(f)
+        if verify:
+            # The reference needs the accounts a second time
+            accounts = list(accounts)
+        state_root = get_state_root(accounts, run_size, tmpdir, stats)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    elapsed = time.perf_counter() - start
+    print("state root = 0x" + state_root.hex())
+    print(
+        f"Computed in {elapsed:.2f}s, {stats.get('runs', 0)} run(s) spilled to disk",
+        file=sys.stderr,
+    )
+
+    if verify:
+        expected = hexary_state_root(accounts)
+        if expected != state_root:
+            print("Fail: py-trie state root is 0x" + expected.hex())
+            sys.exit(1)
+        print("State root matches py-trie")
+
+
+if __name__ == "__main__":
+    main()
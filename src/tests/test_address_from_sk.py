@@ -0,0 +1,97 @@
+"""Differential tests of the batched secret key range mode."""
+import json
+
+import pytest
+from eth_keys.backends.native.ecdsa import private_key_to_public_key
+from eth_keys.constants import SECPK1_N
+from eth_keys.datatypes import PublicKey
+from eth_utils import to_checksum_address
+
+from eth_tools import address_from_sk
+from eth_tools.address_from_sk import derive_public_keys, range_main
+
+
+def get_address(sk: int) -> str:
+    """Address of `sk` through the per key scalar multiplication path."""
+    pk = PublicKey(private_key_to_public_key(sk.to_bytes(32, "big")))
+    return "0x" + pk.to_canonical_address().hex()
+
+
+@pytest.fixture
+def small_windows(monkeypatch):
+    """Shrink windows and chunks so short ranges cross both boundaries."""
+    monkeypatch.setattr(address_from_sk, "RANGE_WINDOW_SIZE", 4)
+    monkeypatch.setattr(address_from_sk, "RANGE_CHUNK_SIZE", 10)
+
+
+@pytest.mark.parametrize(
+    "first,count",
+    [
+        (1, 1),
+        (1, 40),
+        # Doubling: the first window adds `first` * G to itself
+        (2, 9),
+        (3, 9),
+        (0xDEADBEEF, 23),
+        # The last keys of the curve order
+        (SECPK1_N - 23, 22),
+    ],
+)
+def test_derive_public_keys(small_windows, first, count):
+    """Public keys match the scalar multiplication of every key."""
+    public_keys = derive_public_keys(first, count)
+    assert len(public_keys) == count
+    for i, (x, y) in enumerate(public_keys):
+        sk = (first + i).to_bytes(32, "big")
+        expected = private_key_to_public_key(sk)
+        assert x.to_bytes(32, "big") + y.to_bytes(32, "big") == expected
+
+
+def run_range(capsysbinary, *args: str) -> bytes:
+    """Run range mode on one worker and return its output."""
+    range_main([*args, "--workers", "1"])
+    return capsysbinary.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "first,last", [(1, 30), (1000, 1000), (SECPK1_N - 12, SECPK1_N - 1)]
+)
+def test_range_csv(small_windows, capsysbinary, first, last):
+    """csv rows cover the range across chunk boundaries."""
+    lines = run_range(capsysbinary, str(first), hex(last)).decode().splitlines()
+    assert lines[0] == "sk,address"
+    assert lines[1:] == [
+        f"0x{sk:064x},{get_address(sk)}" for sk in range(first, last + 1)
+    ]
+
+
+def test_range_checksum(small_windows, capsysbinary):
+    """--checksum output matches eth_utils."""
+    output = run_range(capsysbinary, "1", "25", "--checksum", "--format", "jsonl")
+    rows = [json.loads(line) for line in output.decode().splitlines()]
+    assert [row["sk"] for row in rows] == [f"0x{sk:064x}" for sk in range(1, 26)]
+    assert [row["address"] for row in rows] == [
+        to_checksum_address(get_address(sk)) for sk in range(1, 26)
+    ]
+
+
+def test_range_bin(small_windows, capsysbinary):
+    """bin records hold the secret key and the address."""
+    output = run_range(capsysbinary, "5", "16", "--format", "bin")
+    assert output == b"".join(
+        sk.to_bytes(32, "big") + bytes.fromhex(get_address(sk)[2:])
+        for sk in range(5, 17)
+    )
+
+
+def test_range_verify(small_windows, capsysbinary):
+    """--verify accepts the batched output."""
+    run_range(capsysbinary, "7", "29", "--verify", "--checksum")
+
+
+def test_range_out_of_bounds():
+    """Keys outside [1, n - 1] are rejected."""
+    with pytest.raises(Exception, match="out of range"):
+        range_main(["0", "3"])
+    with pytest.raises(Exception, match="out of range"):
+        range_main(["1", str(SECPK1_N)])
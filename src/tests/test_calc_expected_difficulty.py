@@ -0,0 +1,119 @@
+"""Tests of the evm t8n checks against a stub evm executable."""
+import json
+import stat
+import sys
+
+import pytest
+
+from eth_tools.calc_expected_difficulty import (
+    batch_main,
+    check_difficulty,
+    get_expected_difficulty,
+)
+
+# Checks run by the tests, the last one answered with a wrong difficulty
+CHECKS = [
+    (0x20000, 0, 0, 10, 14_000_000, "London"),
+    (0x20000, 1, 0, 10, 13, "London"),
+    (131072, 1, 0, 5, 20_000_000, "ArrowGlacier"),
+    (0x1000000, 0, 100, 200, 15_000_000, "MuirGlacier"),
+]
+WRONG_CHECK = (0x20000, 0, 0, 30, 9_000_000, "Constantinople")
+
+STUB_EVM = """#!{python}
+import json
+import sys
+
+args = sys.argv[1:]
+expected = [
+    "t8n",
+    "--input.alloc=stdin",
+    "--input.txs=stdin",
+    "--input.env=stdin",
+    "--output.result=stdout",
+    "--output.alloc=stdout",
+]
+if args[:-1] != expected or not args[-1].startswith("--state.fork="):
+    print("unexpected arguments: " + " ".join(args), file=sys.stderr)
+    sys.exit(2)
+data = json.load(sys.stdin)
+with open({table!r}) as f:
+    table = json.load(f)
+key = args[-1].split("=", 1)[1] + ":" + data["env"]["currentNumber"]
+if key not in table:
+    print("unknown block " + key, file=sys.stderr)
+    sys.exit(3)
+print(json.dumps({{"result": {{"currentDifficulty": table[key]}}, "alloc": data["alloc"]}}))
+"""
+
+
+@pytest.fixture
+def stub_evm(tmp_path) -> str:
+    """Write a stub evm answering the difficulty of the test checks."""
+    table = {f"{c[5]}:{c[4]}": hex(get_expected_difficulty(*c)) for c in CHECKS}
+    table[f"{WRONG_CHECK[5]}:{WRONG_CHECK[4]}"] = hex(
+        get_expected_difficulty(*WRONG_CHECK) + 1
+    )
+    table_path = tmp_path / "table.json"
+    table_path.write_text(json.dumps(table))
+    evm = tmp_path / "evm"
+    evm.write_text(STUB_EVM.format(python=sys.executable, table=str(table_path)))
+    evm.chmod(evm.stat().st_mode | stat.S_IEXEC)
+    return str(evm)
+
+
+def test_check_difficulty(stub_evm):
+    """Inputs go through stdin and the result is read from stdout."""
+    ok, expected, data = check_difficulty(CHECKS[0], stub_evm)
+    assert ok
+    assert int(data["currentDifficulty"], 16) == expected
+    ok, expected, _ = check_difficulty(WRONG_CHECK, stub_evm)
+    assert not ok
+
+
+def test_check_difficulty_evm_failure(stub_evm):
+    """A failing evm raises with its stderr."""
+    with pytest.raises(Exception, match="unknown block"):
+        check_difficulty((0x20000, 0, 0, 10, 1, "London"), stub_evm)
+
+
+def write_checks(tmp_path, checks: list) -> str:
+    """Write a batch checks file mixing both line formats."""
+    path = tmp_path / "checks.txt"
+    lines = ["# parent diff, uncles, parent timestamp, timestamp, block, fork"]
+    for i, check in enumerate(checks):
+        if i % 2:
+            lines.append(json.dumps(list(check)))
+        else:
+            lines.append(" ".join(str(v) for v in check))
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_batch(stub_evm, tmp_path, monkeypatch, capsys):
+    """The thread pool reports every check in input order."""
+    checks = CHECKS * 8
+    path = write_checks(tmp_path, checks)
+    monkeypatch.setattr(sys, "argv", ["calc_expected_difficulty"])
+    batch_main([path, "--jobs", "4", "--evm", stub_evm])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[:-1] == [" ".join(str(v) for v in c) + " OK" for c in checks]
+    assert lines[-1] == f"Checked {len(checks)}: {len(checks)} ok, 0 failed"
+
+
+def test_batch_failures_from_evm_bin(stub_evm, tmp_path, monkeypatch, capsys):
+    """EVM_BIN selects the evm, and failed checks exit with an error."""
+    path = write_checks(
+        tmp_path, [WRONG_CHECK, CHECKS[0], (1 << 17, 0, 0, 1, 1, "London")]
+    )
+    monkeypatch.setenv("EVM_BIN", stub_evm)
+    monkeypatch.setattr(sys, "argv", ["calc_expected_difficulty"])
+    with pytest.raises(SystemExit) as ex:
+        batch_main([path, "--jobs", "2"])
+    assert ex.value.code == 1
+    lines = capsys.readouterr().out.splitlines()
+    expected = hex(get_expected_difficulty(*WRONG_CHECK))
+    assert lines[0].endswith("FAIL: Expected " + expected)
+    assert lines[1].endswith(" OK")
+    assert "ERROR: evm t8n failed: unknown block" in lines[2]
+    assert lines[3] == "Checked 3: 1 ok, 2 failed"
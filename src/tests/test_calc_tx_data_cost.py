@@ -0,0 +1,61 @@
+"""Tests of the intrinsic gas of blocks and fixtures."""
+import pytest
+
+from eth_tools.calc_tx_data_cost import is_istanbul, measure_block
+
+
+def make_block(number: int, gas_used: int, **fields) -> dict:
+    """Block with one call carrying four non-zero calldata bytes."""
+    tx = {"gas": hex(gas_used), "to": "0x" + "11" * 20, "input": "0x01020304"}
+    return {
+        "number": hex(number),
+        "gasUsed": hex(gas_used),
+        "transactions": [tx],
+        **fields,
+    }
+
+
+def test_low_numbered_post_london_block():
+    """Devnet blocks with London fields are charged the Istanbul cost."""
+    block = make_block(5, 21064, baseFeePerGas="0x7", withdrawals=[])
+    result, gas = measure_block(block)
+    assert result["ok"], result
+    assert gas == [21000 + 4 * 16]
+
+
+def test_mainnet_pre_istanbul_block():
+    """With --mainnet, older mainnet blocks are charged 68 per byte."""
+    block = make_block(9068999, 21272)
+    result, gas = measure_block(block, mainnet=True)
+    assert result["ok"], result
+    assert gas == [21000 + 4 * 68]
+    assert measure_block(make_block(9069000, 21064), mainnet=True)[1] == [21064]
+    # Without --mainnet the number says nothing about the fork
+    assert measure_block(make_block(5, 21064))[1] == [21064]
+
+
+@pytest.mark.parametrize(
+    "network,number,expected",
+    [
+        ("Byzantium", 1, False),
+        ("ConstantinopleFix", 100, False),
+        ("Istanbul", 1, True),
+        ("PetersburgToIstanbulAt5", 4, False),
+        ("PetersburgToIstanbulAt5", 5, True),
+        ("Cancun", 0, True),
+        ("ShanghaiToCancunAtTime15k", 1, True),
+    ],
+)
+def test_fixture_networks(network, number, expected):
+    """Fixture networks decide the fork, including block transitions."""
+    assert is_istanbul({"number": hex(number)}, network, False) is expected
+
+
+@pytest.mark.parametrize("timestamp", [14999, 15000])
+def test_timestamp_transition(timestamp):
+    """AtTime transitions compare the timestamp, in thousands with k."""
+    header = {"number": "0x1", "timestamp": hex(timestamp)}
+    assert is_istanbul(header, "ShanghaiToCancunAtTime15k", False)
+    assert is_istanbul(header, "ByzantiumToIstanbulAtTime15k", False) is (
+        timestamp >= 15000
+    )
@@ -0,0 +1,50 @@
+"""Tests of the eth_tools server mode."""
+import base64
+import json
+
+from eth_tools.cli import handle_request
+from eth_tools.create import get_create_address
+
+DEPLOYER = bytes.fromhex("aa" * 20)
+
+
+def request(command: str, *args: str, stdin: str = "") -> dict:
+    """Run one server request."""
+    return handle_request(
+        json.dumps({"command": command, "args": list(args), "stdin": stdin, "id": 7})
+    )
+
+
+def test_text_output():
+    """Text output is returned in `stdout`."""
+    response = request("create", "0x" + DEPLOYER.hex(), "1")
+    assert response["id"] == 7
+    assert response["exit_code"] == 0
+    assert response["stdout"] == "0x" + get_create_address(DEPLOYER, 1).hex() + "\n"
+
+
+def test_binary_output():
+    """Tools writing to `sys.stdout.buffer` return their output in base64."""
+    response = request(
+        "create", "--range", "0", "3", "0x" + DEPLOYER.hex(), "--format", "bin"
+    )
+    assert response["exit_code"] == 0, response["stderr"]
+    output = base64.b64decode(response["stdout_base64"])
+    assert output == b"".join(
+        DEPLOYER + nonce.to_bytes(8, "big") + get_create_address(DEPLOYER, nonce)
+        for nonce in range(4)
+    )
+
+
+def test_stdin():
+    """Each request reads its own stdin."""
+    response = request("calc_tx_data_cost", "-f", "-", stdin="0x0001ff")
+    assert response["exit_code"] == 0
+    assert "Zero bytes = 1\nNon zero bytes = 2\n" in response["stdout"]
+
+
+def test_failure():
+    """Errors are reported in `stderr` with a non zero exit code."""
+    response = request("unknown_command")
+    assert response["exit_code"] == 1
+    assert "Unknown command" in response["stderr"]
@@ -0,0 +1,73 @@
+"""Tests of the signed tx generator."""
+import json
+
+import pytest
+from eth_keys import keys
+
+from eth_tools.get_tx_info import decode_raw_tx, generate_main
+
+SECRET_KEY = "0x45a915e4d060149eb4365960e6a7a45f334393093061116b197e3240065ff2d8"
+
+TEMPLATE = {
+    "nonce": "0x5",
+    "gasLimit": "0x5208",
+    "to": "0x000000000000000000000000000000000000ff0c",
+    "value": "0x1",
+    "data": "0x1234",
+    "secretKey": SECRET_KEY,
+}
+
+ACCESS_LIST = [{"address": "0x" + "0d" * 20, "storageKeys": ["0x" + "00" * 31 + "01"]}]
+
+TEMPLATES = {
+    "legacy": {"gasPrice": "0x10"},
+    "eip155": {"gasPrice": "0x10", "chainId": 1},
+    "type1": {"type": "0x1", "chainId": "0x1", "gasPrice": "0x10", "accessList": []},
+    "type2": {
+        "type": "0x2",
+        "chainId": "0x1",
+        "maxPriorityFeePerGas": "0x1",
+        "maxFeePerGas": "0x10",
+        "accessList": ACCESS_LIST,
+    },
+    "type3": {
+        "type": "0x3",
+        "chainId": "0x1",
+        "maxPriorityFeePerGas": "0x1",
+        "maxFeePerGas": "0x10",
+        "accessList": ACCESS_LIST,
+        "maxFeePerBlobGas": "0x2",
+        "blobVersionedHashes": ["0x01" + "ab" * 31],
+    },
+}
+
+
+@pytest.mark.parametrize("name", TEMPLATES)
+def test_generate(tmp_path, capsys, name):
+    """Generated txs are signed by the template key with varied fields."""
+    template_path = tmp_path / "template.json"
+    template_path.write_text(json.dumps({**TEMPLATE, **TEMPLATES[name]}))
+    output_path = tmp_path / "txs.jsonl"
+    generate_main(
+        [str(template_path), "--count", "5", "--vary", "nonce,to,value"]
+        + ["--workers", "1", "--output", str(output_path)]
+    )
+    sender = keys.PrivateKey(bytes.fromhex(SECRET_KEY[2:])).public_key
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [r["index"] for r in records] == list(range(5))
+    for i, record in enumerate(records):
+        tx = decode_raw_tx(bytes.fromhex(record["rlp"][2:]))
+        assert tx["hash"] == record["hash"]
+        assert tx["sender"] == "0x" + sender.to_canonical_address().hex()
+        assert int(tx["nonce"], 16) == 5 + i
+        assert int(tx["value"], 16) == 1 + i
+        assert int(tx["to"], 16) == 0xFF0C + i
+    assert "Signed 5 txs" in capsys.readouterr().err
+
+
+def test_generate_rejects_unknown_type(tmp_path):
+    """Templates of unsupported tx types are rejected."""
+    template_path = tmp_path / "template.json"
+    template_path.write_text(json.dumps({**TEMPLATE, "type": "0x7"}))
+    with pytest.raises(Exception, match="Unsupported tx type"):
+        generate_main([str(template_path), "--workers", "1"])
@@ -0,0 +1,12 @@
+"""Tests of the chunked process pool map."""
+import pytest
+
+from eth_tools.parallel import iter_chunk_results
+
+
+@pytest.mark.parametrize("workers,count", [(1, 20), (2, 2), (2, 20), (3, 61)])
+def test_iter_chunk_results_order(workers, count):
+    """Results follow the input order, with or without the pool."""
+    items = (-i for i in range(count))
+    results = list(iter_chunk_results(abs, items, workers, 4))
+    assert results == [(-i, i) for i in range(count)]
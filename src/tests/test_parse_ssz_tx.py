@@ -0,0 +1,64 @@
+"""Differential tests of the native SSZ decoder against eth2spec."""
+import pytest
+
+from eth_tools.parse_ssz_tx import (
+    decode_eth2spec,
+    decode_signed_type3_tx,
+    generate_ssz_txs,
+)
+from eth_tools.ssz_merkle import RootCache, type3_tx_message_root
+
+# The differential tests need the eth2spec SSZ types
+pytest.importorskip("eth2spec")
+from eth_tools.ssz_tx_types import SignedType3Tx  # noqa: E402
+
+
+@pytest.mark.parametrize("calldata_size", [0, 1, 31, 32, 33, 1 << 10, 1 << 17])
+def test_decode_matches_eth2spec(calldata_size):
+    """Fields, signing hash and message root match the eth2spec decoder."""
+    for ssz_bytes in generate_ssz_txs(20, calldata_size):
+        fields, message_hash = decode_eth2spec(ssz_bytes)
+        tx = decode_signed_type3_tx(ssz_bytes)
+        assert tx.to_dict() == fields
+        assert tx.signing_hash() == message_hash
+        expected_root = SignedType3Tx.decode_bytes(ssz_bytes).Message.hash_tree_root()
+        assert type3_tx_message_root(tx) == bytes(expected_root)
+
+
+def test_decode_memoryview():
+    """Decoding a slice of a larger buffer gives the same transaction."""
+    ssz_bytes = generate_ssz_txs(1, 100)[0]
+    buf = memoryview(b"\x03" + ssz_bytes)
+    assert decode_signed_type3_tx(buf[1:]).to_dict() == decode_eth2spec(ssz_bytes)[0]
+
+
+def test_invalid_offsets():
+    """Truncated transactions are rejected."""
+    ssz_bytes = generate_ssz_txs(1, 100)[0]
+    with pytest.raises(Exception):
+        decode_signed_type3_tx(ssz_bytes[:-150])
+
+
+def test_message_root_cache():
+    """Cached roots match across buffers, including writable ones."""
+    txs = generate_ssz_txs(4, 300)
+    expected = [
+        bytes(SignedType3Tx.decode_bytes(ssz_bytes).Message.hash_tree_root())
+        for ssz_bytes in txs
+    ]
+    for _ in range(2):
+        for ssz_bytes, root in zip(txs, expected):
+            tx = decode_signed_type3_tx(memoryview(bytearray(ssz_bytes)))
+            assert type3_tx_message_root(tx) == root
+
+
+def test_root_cache_compares_content():
+    """Content sharing its length and end chunks is not given a cached root."""
+    cache = RootCache(1 << 10)
+    content = bytes(100)
+    other = bytes(50) + b"\x01" + bytes(49)
+    assert cache.get(content, lambda: b"a") == b"a"
+    assert cache.get(memoryview(other), lambda: b"b") == b"b"
+    assert cache.get(memoryview(bytearray(other)), lambda: b"c") == b"b"
+    assert cache.get(bytes(2000), lambda: b"d") == b"d"
+    assert cache.size == 100
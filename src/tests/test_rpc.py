@@ -0,0 +1,266 @@
+"""Tests of the JSON-RPC client against a local stub server."""
+import asyncio
+import json
+import random
+
+import pytest
+
+from eth_tools.benchmarks import generate_block
+from eth_tools.get_block_info import (
+    fetch_and_verify_blocks,
+    format_value_for_rlp,
+    get_block_hash,
+    to_hex,
+)
+from eth_tools.get_tx_info import decode_raw_tx, encode_unsigned_tx, sign_tx
+from eth_tools.ordered_trie import ordered_trie_root
+from eth_tools.rpc import RpcClient, RpcError
+
+# Unsigned legacy, EIP-1559 and EIP-4844 txs, as JSON-RPC returns them
+FULL_TXS: list[dict] = [
+    {
+        "nonce": "0x0",
+        "gasPrice": "0x3b9aca00",
+        "gas": "0x5208",
+        "to": "0x" + "11" * 20,
+        "value": "0x1",
+        "input": "0x",
+    },
+    {
+        "type": "0x2",
+        "chainId": "0x1",
+        "nonce": "0x1",
+        "maxPriorityFeePerGas": "0x1",
+        "maxFeePerGas": "0x3b9aca00",
+        "gas": "0x7530",
+        "to": "0x" + "22" * 20,
+        "value": "0x0",
+        "input": "0x01020304",
+        "accessList": [
+            {"address": "0x" + "33" * 20, "storageKeys": ["0x" + "00" * 32]}
+        ],
+    },
+    {
+        "type": "0x3",
+        "chainId": "0x1",
+        "nonce": "0x2",
+        "maxPriorityFeePerGas": "0x1",
+        "maxFeePerGas": "0x3b9aca00",
+        "gas": "0x5208",
+        "to": "0x" + "44" * 20,
+        "value": "0x0",
+        "input": "0x",
+        "accessList": [],
+        "maxFeePerBlobGas": "0x1",
+        "blobVersionedHashes": ["0x01" + "55" * 31],
+    },
+]
+
+
+def generate_chain(count: int) -> list[dict]:
+    """Blocks 0 to `count - 1` linked by their parent hashes."""
+    rng = random.Random(1)
+    blocks = []
+    parent = "0x" + bytes(32).hex()
+    for n in range(count):
+        block = generate_block(rng, 0, rng.randint(0, 3))
+        block["number"] = hex(n)
+        block["parentHash"] = parent
+        block["hash"] = parent = to_hex(get_block_hash(block))
+        block["transactionsRoot"] = to_hex(
+            format_value_for_rlp("transactions", block["transactions"])
+        )
+        block["withdrawalsRoot"] = to_hex(
+            format_value_for_rlp("withdrawals", block["withdrawals"])
+        )
+        block["uncles"] = []
+        blocks.append(block)
+    return blocks
+
+
+def generate_full_tx_block() -> dict:
+    """Block whose transactions are the signed `FULL_TXS` as JSON-RPC objects."""
+    block = generate_chain(1)[0]
+    raw_txs = []
+    for tx in FULL_TXS:
+        tx_type, items = encode_unsigned_tx(tx)
+        chain_id = 1 if tx_type else None
+        raw_txs.append(sign_tx(tx_type, items, chain_id, bytes([1] * 32)))
+    block["transactionsRoot"] = to_hex(ordered_trie_root(raw_txs))
+    block["hash"] = to_hex(get_block_hash(block))
+    block["transactions"] = []
+    for raw in raw_txs:
+        tx = decode_raw_tx(raw, False)
+        tx["gas"] = tx.pop("gasLimit")
+        tx["input"] = tx.pop("data")
+        if tx["type"] != "0x0":
+            tx["yParity"] = tx["v"]
+        block["transactions"].append(tx)
+    return block
+
+
+class StubServer:
+    """
+    HTTP/1.1 JSON-RPC server answering `eth_getBlockByNumber` from `blocks`,
+    in reverse order. With `chunked` the responses use chunked transfer
+    encoding, with `close_after` connections are dropped silently after that
+    many responses.
+    """
+
+    def __init__(self, blocks: list[dict], chunked=False, close_after=None):
+        self.blocks = blocks
+        self.chunked = chunked
+        self.close_after = close_after
+        self.connections = 0
+        self.batch_sizes: list[int] = []
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/"
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    def answer(self, request: dict) -> dict:
+        n = int(request["params"][0], 16)
+        block = self.blocks[n] if n < len(self.blocks) else None
+        return {"jsonrpc": "2.0", "id": request["id"], "result": block}
+
+    async def handle(self, reader, writer) -> None:
+        self.connections += 1
+        served = 0
+        while await reader.readline():
+            headers = {}
+            while line := (await reader.readline()).strip():
+                k, _, v = line.decode().partition(":")
+                headers[k.strip().lower()] = v.strip()
+            body = await reader.readexactly(int(headers["content-length"]))
+            batch = json.loads(body)
+            self.batch_sizes.append(len(batch))
+            data = json.dumps([self.answer(r) for r in reversed(batch)]).encode()
+            head = "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            if self.chunked:
+                writer.write(f"{head}Transfer-Encoding: chunked\r\n\r\n".encode())
+                for i in range(0, len(data), 1000):
+                    chunk = data[i : i + 1000]
+                    writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                writer.write(b"0\r\n\r\n")
+            else:
+                writer.write(f"{head}Content-Length: {len(data)}\r\n\r\n".encode())
+                writer.write(data)
+            await writer.drain()
+            served += 1
+            if served == self.close_after:
+                break
+        writer.close()
+
+
+def run_client(server: StubServer, max_in_flight: int, batches: list[list[int]]):
+    """Results of fetching each batch of block numbers in turn."""
+
+    async def run():
+        url = await server.start()
+        client = RpcClient(url, max_in_flight)
+        try:
+            results = []
+            for numbers in batches:
+                calls = [("eth_getBlockByNumber", [hex(n), False]) for n in numbers]
+                results.append(await client.batch(calls))
+                # Lets the server drop the connection before the next request
+                await asyncio.sleep(0.01)
+            return results
+        finally:
+            await client.close()
+            await server.stop()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_keep_alive(chunked):
+    """Sequential batches reuse one connection and keep the call order."""
+    blocks = generate_chain(12)
+    server = StubServer(blocks, chunked=chunked)
+    results = run_client(server, 1, [[0, 1, 2], [5, 4], [11, 12]])
+    assert results == [blocks[0:3], [blocks[5], blocks[4]], [blocks[11], None]]
+    assert server.connections == 1
+    assert server.batch_sizes == [3, 2, 2]
+
+
+def test_retry_dropped_connection():
+    """A request on a connection the server dropped is retried once."""
+    blocks = generate_chain(4)
+    server = StubServer(blocks, close_after=1)
+    results = run_client(server, 1, [[0], [1], [2, 3]])
+    assert results == [[blocks[0]], [blocks[1]], blocks[2:4]]
+    assert server.connections == 3
+
+
+def test_error_response():
+    """Failed calls get an RpcError in place of their result."""
+
+    class ErrorServer(StubServer):
+        def answer(self, request):
+            if request["params"][0] == "0x1":
+                error = {"code": -32000, "message": "unavailable"}
+                return {"jsonrpc": "2.0", "id": request["id"], "error": error}
+            return super().answer(request)
+
+    blocks = generate_chain(3)
+    (results,) = run_client(ErrorServer(blocks), 1, [[0, 1, 2]])
+    assert results[0] == blocks[0] and results[2] == blocks[2]
+    assert isinstance(results[1], RpcError)
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_fetch_and_verify_blocks(capsys, chunked):
+    """Blocks are split in batches over the pool and verified."""
+    blocks = generate_chain(10)
+    server = StubServer(blocks, chunked=chunked)
+
+    async def run():
+        url = await server.start()
+        try:
+            return await fetch_and_verify_blocks(url, 0, 10, False, 3, 2)
+        finally:
+            await server.stop()
+
+    ok, failed, links = asyncio.run(run())
+    assert (ok, failed) == (10, 1)
+    assert sorted(server.batch_sizes) == [2, 3, 3, 3]
+    assert server.connections == 2
+    for n in range(1, 10):
+        assert links[n][1] == links[n - 1][0]
+
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sorted(r["number"] for r in results) == list(range(11))
+    assert all(r["ok"] for r in results if r["number"] < 10)
+    assert [r["error"] for r in results if r["number"] == 10] == ["block not found"]
+
+
+@pytest.mark.parametrize("tampered", [False, True])
+def test_fetch_and_verify_full_transactions(capsys, tampered):
+    """Full legacy, 1559 and 4844 txs are re-encoded and checked."""
+    block = generate_full_tx_block()
+    if tampered:
+        block["transactions"][1]["value"] = "0x1234"
+    server = StubServer([block])
+
+    async def run():
+        url = await server.start()
+        try:
+            return await fetch_and_verify_blocks(url, 0, 0, True, 1, 1)
+        finally:
+            await server.stop()
+
+    ok, failed, _ = asyncio.run(run())
+    (result,) = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert "error" not in result and result["hash_ok"]
+    if tampered:
+        assert (ok, failed) == (0, 1)
+        assert not result["tx_hashes_ok"] and not result["transactions_root_ok"]
+    else:
+        assert (ok, failed) == (1, 0)
+        assert result["tx_hashes_ok"] and result["transactions_root_ok"]